@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import sys
+from pathlib import Path
+
+from benchmarks import harness
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+# The amount of runs of which the noise is measured when saving the baseline
+BASELINE_ROUNDS = 7
+
+# The amount of runs which must all regress before a regression is reported
+CONFIRM_ROUNDS = 2
+
+
+def main(argv=None) -> int:
+    """Run the benchmarks and compare them with the baseline.
+
+    Returns:
+        The exit code, 1 if a metric regressed beyond its threshold.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark the MediaHaven client offline, against the fake.",
+    )
+    parser.add_argument(
+        "names",
+        nargs="*",
+        metavar="name",
+        help="The benchmarks to run, by default all. "
+        f"One of: {', '.join(sorted(harness.load_benchmarks()))}.",
+    )
+    parser.add_argument("--quick", action="store_true", help="Use small inputs.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store the results as the new baseline, with the threshold of each "
+        "metric measured from its noise over several runs.",
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=BASELINE_ROUNDS,
+        help="The amount of runs, each in a new process, when saving the baseline.",
+    )
+    parser.add_argument(
+        "--output", type=Path, help="Only save the results to this JSON file."
+    )
+    args = parser.parse_args(argv)
+    unknown = sorted(set(args.names) - set(harness.load_benchmarks()))
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    metrics = harness.run(args.names, quick=args.quick)
+    if args.output:
+        harness.save_metrics(args.output, metrics)
+        return 0
+    baseline = harness.load_baseline(args.baseline)
+
+    runs = [metrics]
+    comparison = list(harness.compare(metrics, baseline))
+    while not args.save_baseline and len(runs) < CONFIRM_ROUNDS:
+        if all(
+            regression is None or harness.is_informational(baseline, metric.name)
+            for metric, _, regression in comparison
+        ):
+            break
+        # Confirm the regressions with another run, in a new process
+        runs.append(harness.run_isolated(args.names, quick=args.quick))
+        comparison = harness.best_comparison(runs, baseline)
+
+    regressions = 0
+    for metric, base, regression in comparison:
+        line = f"{metric.name:<36} {metric.value:>14.6g} {metric.unit:<10}"
+        if base is not None:
+            line += f" baseline {base:.6g}"
+        if regression is not None and harness.is_informational(baseline, metric.name):
+            line += f"  regression +{regression:.0%} (informational)"
+        elif regression is not None:
+            regressions += 1
+            line += f"  REGRESSION +{regression:.0%}"
+        print(line)
+
+    if args.save_baseline:
+        rounds = [metrics]
+        for _ in range(args.rounds - 1):
+            rounds.append(harness.run_isolated(args.names, quick=args.quick))
+        metrics, metric_thresholds, informational = harness.noise_thresholds(rounds)
+        thresholds = baseline.get("thresholds", harness.DEFAULT_THRESHOLDS)
+        harness.save_baseline(
+            args.baseline, metrics, thresholds, metric_thresholds, informational
+        )
+        print(f"Saved the baseline to {args.baseline}")
+        return 0
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
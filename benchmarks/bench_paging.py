@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from typing import Iterator
+
+from benchmarks.harness import Metric, benchmark, measure, offline_client
+from mediahaven.mocks.backend import FakeMediaHaven
+from mediahaven.simulator.dataset import SyntheticDataset
+from mediahaven.transport import (
+    InMemoryTransport,
+    RecordingTransport,
+    ReplayTransport,
+)
+
+TOTAL_RECORDS = 50_000
+PAGE_SIZE = 1000
+
+
+def _recorded_search(total: int, page_size: int) -> list:
+    """Record the exchanges of paging through all the records of a fake."""
+    fake = FakeMediaHaven(dataset=SyntheticDataset(total))
+    recorder = RecordingTransport(fake.transport())
+    client = offline_client(recorder)
+    page = client.records.search(q="*", nrOfResults=page_size)
+    for _ in page.as_generator():
+        pass
+    return recorder.recordings
+
+
+@benchmark("as_generator")
+def bench_as_generator(quick: bool) -> Iterator[Metric]:
+    """Iterate over all the results of a search spread over many pages.
+
+    The pages are replayed, so only the client is measured: sending the
+    requests, decoding and parsing the pages and yielding the results.
+    """
+    total = 2000 if quick else TOTAL_RECORDS
+    page_size = 100 if quick else PAGE_SIZE
+    client = offline_client(ReplayTransport(_recorded_search(total, page_size)))
+
+    def iterate():
+        page = client.records.search(q="*", nrOfResults=page_size)
+        count = sum(1 for _ in page.as_generator())
+        assert count == total, count
+
+    seconds = measure(iterate, number=1, repeat=5)
+    yield Metric(
+        f"as_generator[{total}/{page_size}]",
+        total / seconds,
+        "records/s",
+        higher_is_better=True,
+    )
+
+
+def _memoized(handler):
+    """Answer the repeated searches with the response of the first one."""
+    responses = {}
+
+    def memoized(method, url, headers, body):
+        if method != "GET" or "/records" not in url:
+            return handler(method, url, headers, body)
+        if url not in responses:
+            responses[url] = handler(method, url, headers, body)
+        return responses[url]
+
+    return memoized
+
+
+@benchmark("streamed_page")
+def bench_streamed_page(quick: bool) -> Iterator[Metric]:
+    """Get the first result of a large page, parsed in full or while streamed.
+
+    Also the throughput of iterating over all the results of the streamed page.
+    """
+    page_size = 1000 if quick else 10_000
+    fake = FakeMediaHaven(dataset=SyntheticDataset(page_size))
+    client = offline_client(InMemoryTransport(_memoized(fake)))
+
+    for stream in (False, True):
+        label = "stream" if stream else "full"
+
+        def first_result():
+            page = client.records.search(q="*", nrOfResults=page_size, stream=stream)
+            next(iter(page.as_generator()))
+
+        seconds = measure(first_result, number=1, repeat=7)
+        yield Metric(f"first_result_{label}[{page_size}]", seconds, "s")
+
+    def iterate():
+        page = client.records.search(q="*", nrOfResults=page_size, stream=True)
+        count = sum(1 for _ in page.as_generator())
+        assert count == page_size, count
+
+    seconds = measure(iterate, number=1, repeat=5)
+    yield Metric(
+        f"as_generator_stream[{page_size}]",
+        page_size / seconds,
+        "records/s",
+        higher_is_better=True,
+    )
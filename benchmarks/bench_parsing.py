@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+from typing import Iterator, List
+
+from requests.models import Response
+
+from benchmarks.harness import (
+    Metric,
+    benchmark,
+    calibration_time,
+    measure,
+    retained_memory,
+)
+from mediahaven.json_decoder import DECODER_ATTRIBUTE, available_decoders, get_decoder
+from mediahaven.mediahaven import RAW_RESPONSE_ATTRIBUTE
+from mediahaven.resources.base_resource import (
+    MediaHavenPageObjectJSON,
+    MediaHavenSingleObjectJSON,
+)
+from mediahaven.simulator.dataset import SyntheticDataset
+
+PAGE_SIZES = (10, 100, 1000, 10_000)
+DECODER_PAGE_SIZE = 1000
+MEMORY_PAGE_SIZE = 1000
+
+
+def json_response(payload) -> Response:
+    """Return a response with the payload as JSON body, as read from the wire."""
+    response = Response()
+    response.status_code = 200
+    response.headers["Content-Type"] = "application/json"
+    response.encoding = "utf-8"
+    response._content = json.dumps(payload).encode("utf-8")
+    return response
+
+
+def page_response(records: List[dict], total: int = None) -> Response:
+    return json_response(
+        {
+            "NrOfResults": len(records),
+            "StartIndex": 0,
+            "TotalNrOfResults": len(records) if total is None else total,
+            "Results": records,
+        }
+    )
+
+
+@benchmark("page_object_json")
+def bench_page_object_json(quick: bool) -> Iterator[Metric]:
+    """Parse a search page into a MediaHavenPageObjectJSON."""
+    sizes = PAGE_SIZES[:2] if quick else PAGE_SIZES
+    dataset = SyntheticDataset(max(sizes))
+    for size in sizes:
+        response = page_response(dataset[:size])
+        seconds = measure(
+            lambda: MediaHavenPageObjectJSON(response, None),
+            min_time=calibration_time(quick),
+        )
+        yield Metric(f"page_object_json[{size}]", seconds, "s")
+
+
+@benchmark("json_decoder")
+def bench_json_decoder(quick: bool) -> Iterator[Metric]:
+    """Parse a large search page with each of the installed JSON decoders."""
+    size = 100 if quick else DECODER_PAGE_SIZE
+    response = page_response(SyntheticDataset(size)[:])
+    for name in available_decoders():
+        setattr(response, DECODER_ATTRIBUTE, get_decoder(name))
+        seconds = measure(
+            lambda: MediaHavenPageObjectJSON(response, None),
+            min_time=calibration_time(quick),
+        )
+        yield Metric(f"json_decoder[{name}]", seconds, "s")
+
+
+@benchmark("single_object_json")
+def bench_single_object_json(quick: bool) -> Iterator[Metric]:
+    """Parse a record into a MediaHavenSingleObjectJSON."""
+    response = json_response(SyntheticDataset(1)[0])
+    seconds = measure(
+        lambda: MediaHavenSingleObjectJSON(response), min_time=calibration_time(quick)
+    )
+    yield Metric("single_object_json", seconds, "s")
+
+
+@benchmark("memory_per_record")
+def bench_memory_per_record(quick: bool) -> Iterator[Metric]:
+    """Memory retained per record of a parsed page, with and without the raw body."""
+    size = 100 if quick else MEMORY_PAGE_SIZE
+    records = SyntheticDataset(size)[:]
+    retained = retained_memory(
+        lambda: MediaHavenPageObjectJSON(page_response(records), None)
+    )
+    yield Metric("memory_per_record", retained / size, "bytes")
+
+    def without_raw_body():
+        response = page_response(records)
+        setattr(response, RAW_RESPONSE_ATTRIBUTE, False)
+        return MediaHavenPageObjectJSON(response, None)
+
+    retained = retained_memory(without_raw_body)
+    yield Metric("memory_per_record[no_raw]", retained / size, "bytes")
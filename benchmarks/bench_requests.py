@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from typing import Iterator
+from urllib.parse import urljoin
+
+from benchmarks.harness import (
+    Metric,
+    benchmark,
+    calibration_time,
+    measure,
+    offline_client,
+)
+from mediahaven.mocks.backend import FakeMediaHaven
+from mediahaven.simulator.dataset import SyntheticDataset
+
+QUERY_PARAMS = {
+    "q": '+(batch_id:"BATCH000001") -(Title:"archive news")',
+    "startIndex": 1000,
+    "nrOfResults": 100,
+}
+
+
+@benchmark("request_preparation")
+def bench_request_preparation(quick: bool) -> Iterator[Metric]:
+    """Build the URL of a search: encode the query parameters and join the path."""
+    client = offline_client(FakeMediaHaven().transport())
+    min_time = calibration_time(quick)
+
+    yield Metric(
+        "encode_query_params",
+        measure(lambda: client._encode_query_params(**QUERY_PARAMS), min_time=min_time),
+        "s",
+    )
+    yield Metric(
+        "urljoin",
+        measure(lambda: urljoin(client.mh_api_url, "records/abc"), min_time=min_time),
+        "s",
+    )
+
+
+@benchmark("request_roundtrip")
+def bench_request_roundtrip(quick: bool) -> Iterator[Metric]:
+    """Get a record via the full client stack, answered in-process."""
+    fake = FakeMediaHaven(dataset=SyntheticDataset(10))
+    client = offline_client(fake.transport())
+    record_id = fake.dataset.record_id(0)
+
+    seconds = measure(
+        lambda: client.records.get(record_id), min_time=calibration_time(quick)
+    )
+    yield Metric("request_roundtrip", seconds, "s")
+
+
+@benchmark("token_refresh")
+def bench_token_refresh(quick: bool) -> Iterator[Metric]:
+    """Refresh the token of a grant, the token endpoint is answered in-process."""
+    client = offline_client(FakeMediaHaven().transport())
+    grant = client.grant
+
+    seconds = measure(grant.refresh_token, min_time=calibration_time(quick))
+    yield Metric("token_refresh", seconds, "s")
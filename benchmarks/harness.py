@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from mediahaven import MediaHaven
+from mediahaven.oauth2 import ROPCGrant
+
+URL = "https://mediahaven.bench/"
+
+# The default allowed relative regression per unit, if the baseline sets none
+DEFAULT_THRESHOLDS = {"s": 0.3, "records/s": 0.3, "bytes": 0.1}
+
+# The lowest allowed relative regression of a metric, see `noise_thresholds`
+MIN_THRESHOLD = 0.1
+
+# The allowed relative regression of a metric in multiples of its measured noise
+NOISE_MARGIN = 2
+
+# The highest useful allowed relative regression of a metric, a metric which is
+# noisier only informs, see `noise_thresholds`
+MAX_THRESHOLD = 0.5
+
+# The name of the metric of the reference workload, see `reference_time`
+REFERENCE = "reference"
+
+# The amount of times the reference workload is measured, see `reference_time`
+REFERENCE_ROUNDS = 7
+
+# A benchmark yields its metrics, in quick mode it uses smaller inputs
+Benchmark = Callable[[bool], Iterable["Metric"]]
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+class Metric:
+    """A measured value of a benchmark.
+
+    Attributes:
+        name: The unique name of the metric.
+        value: The measured value.
+        unit: "s", "records/s" or "bytes".
+        higher_is_better: If true, a lower value is a regression.
+        reference: The reference duration measured right before the benchmark,
+            if any, see `run`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        value: float,
+        unit: str,
+        higher_is_better=False,
+        reference: Optional[float] = None,
+    ):
+        self.name = name
+        self.value = value
+        self.unit = unit
+        self.higher_is_better = higher_is_better
+        self.reference = reference
+
+    def regression(self, baseline: float, threshold: float) -> Optional[float]:
+        """Return the relative regression against the baseline, if above threshold.
+
+        Args:
+            baseline: The baseline value of the metric.
+            threshold: The allowed relative regression, e.g. 0.3 for 30%.
+
+        Returns:
+            The relative regression or None if within the threshold.
+        """
+        if baseline <= 0 or self.value <= 0:
+            return None
+        if self.higher_is_better:
+            change = baseline / self.value - 1
+        else:
+            change = self.value / baseline - 1
+        return change if change > threshold else None
+
+
+def benchmark(name: str) -> Callable[[Benchmark], Benchmark]:
+    """Register a benchmark under a name."""
+
+    def register(function: Benchmark) -> Benchmark:
+        BENCHMARKS[name] = function
+        return function
+
+    return register
+
+
+def measure(
+    operation: Callable[[], object],
+    number: Optional[int] = None,
+    repeat: int = 7,
+    min_time: float = 0.2,
+) -> float:
+    """Return the CPU time in seconds of one call of the operation.
+
+    The benchmarks run offline, so their CPU time is their duration, without
+    the time the process waited while other processes ran. The best of the
+    repeats is used, as it is the least disturbed by other processes. The
+    garbage collector is disabled while timing, like `timeit`.
+
+    Args:
+        operation: The operation to time.
+        number: The amount of calls per repeat, by default the amount which takes
+            at least `min_time` seconds.
+        repeat: The amount of repeats.
+        min_time: The minimum duration of a repeat when calibrating the number.
+    """
+
+    def timed(calls: int) -> float:
+        start = time.process_time()
+        for _ in range(calls):
+            operation()
+        return time.process_time() - start
+
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        if number is None:
+            # Calibrate, which also warms up the caches
+            number = 1
+            while timed(number) < min_time:
+                number *= 2
+        else:
+            timed(1)
+        durations = [timed(number) / number for _ in range(repeat)]
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return min(durations)
+
+
+def calibration_time(quick: bool) -> float:
+    """Return the minimum duration of a repeat, shorter in quick mode."""
+    return 0.01 if quick else 0.2
+
+
+def _reference_workload():
+    document = json.dumps(
+        {"Results": [{"Id": i, "Title": f"Title {i}"} for i in range(500)]}
+    )
+    json.loads(document, object_hook=lambda d: SimpleNamespace(**d))
+
+
+def reference_time(quick: bool = False) -> float:
+    """Return the duration of a fixed pure Python workload.
+
+    The durations are compared with the baseline relative to this reference,
+    so a slower or faster machine does not show up as a change. A single
+    measurement varies too much to scale all the others by, so the median of
+    several rounds is used.
+    """
+    return statistics.median(
+        measure(_reference_workload, repeat=3, min_time=calibration_time(quick) / 4)
+        for _ in range(REFERENCE_ROUNDS)
+    )
+
+
+def retained_memory(create: Callable[[], object]) -> int:
+    """Return the amount of bytes still allocated by the object that was created."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        created = create()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del created
+    return after - before
+
+
+def offline_client(transport) -> MediaHaven:
+    """Return a client with a valid token which sends its requests via the transport."""
+    grant = ROPCGrant(URL, "client-id", "client-secret", transport=transport)
+    grant.request_token("user", "password")
+    return MediaHaven(URL, grant)
+
+
+def load_benchmarks() -> Dict[str, Benchmark]:
+    """Return the benchmarks of the suites by name."""
+    # Importing the suites registers their benchmarks
+    from benchmarks import bench_paging, bench_parsing, bench_requests  # noqa: F401
+
+    return BENCHMARKS
+
+
+def run(names: Optional[Iterable[str]] = None, quick: bool = False) -> List[Metric]:
+    """Run the benchmarks, all of them by default.
+
+    The speed of a machine drifts during a run, so the reference is measured
+    again before each benchmark and its metrics are compared relative to it.
+    The reference metric is the median of those.
+
+    Raises:
+        ValueError: If a benchmark is unknown.
+    """
+    benchmarks = load_benchmarks()
+    names = list(names or benchmarks)
+    unknown = [name for name in names if name not in benchmarks]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(unknown)}")
+    metrics = []
+    references = []
+    for name in names:
+        references.append(reference_time(quick))
+        for metric in benchmarks[name](quick):
+            metric.reference = references[-1]
+            metrics.append(metric)
+    return [Metric(REFERENCE, statistics.median(references), "s")] + metrics
+
+
+def _normalize(value: float, unit: str, reference: float) -> float:
+    """Return the value relative to the reference duration, by its unit."""
+    if unit == "s":
+        return value / reference
+    if unit == "records/s":
+        return value * reference
+    return value
+
+
+def _denormalize(value: float, unit: str, reference: float) -> float:
+    if unit == "s":
+        return value * reference
+    if unit == "records/s":
+        return value / reference
+    return value
+
+
+def noise_thresholds(
+    rounds: List[List[Metric]],
+) -> Tuple[List[Metric], Dict[str, float], List[str]]:
+    """Combine several runs of the benchmarks into a baseline.
+
+    The value of a metric is its median relative to its reference in each run.
+    Its threshold is `NOISE_MARGIN` times the largest regression of a run from
+    that median, at least `MIN_THRESHOLD`, so a stable metric catches a smaller
+    regression than a noisy one. A metric which needs a threshold above
+    `MAX_THRESHOLD` would miss any real regression, so it gets that threshold but
+    is informational: its regressions are reported without failing.
+
+    Args:
+        rounds: The metrics of each run, all with the same metrics.
+
+    Returns:
+        The combined metrics, the threshold by metric name and the names of the
+        informational metrics.
+    """
+    runs = [{metric.name: metric for metric in metrics} for metrics in rounds]
+    reference = statistics.median(run[REFERENCE].value for run in runs)
+    combined = [Metric(REFERENCE, reference, "s")]
+    thresholds = {}
+    informational = []
+    for metric in rounds[0]:
+        if metric.name == REFERENCE:
+            continue
+        # The metric relative to its reference in each run
+        samples = [
+            Metric(
+                metric.name,
+                _normalize(
+                    run[metric.name].value,
+                    metric.unit,
+                    run[metric.name].reference or run[REFERENCE].value,
+                ),
+                metric.unit,
+                metric.higher_is_better,
+            )
+            for run in runs
+        ]
+        median = statistics.median(sample.value for sample in samples)
+        value = _denormalize(median, metric.unit, reference)
+        combined.append(
+            Metric(metric.name, value, metric.unit, metric.higher_is_better)
+        )
+        # The worst run, relative to the median, in the direction of a regression
+        noise = max(sample.regression(median, 0.0) or 0.0 for sample in samples)
+        threshold = round(max(MIN_THRESHOLD, NOISE_MARGIN * noise), 2)
+        if threshold > MAX_THRESHOLD:
+            informational.append(metric.name)
+        thresholds[metric.name] = min(threshold, MAX_THRESHOLD)
+    return combined, thresholds, informational
+
+
+def run_isolated(names: Iterable[str] = (), quick: bool = False) -> List[Metric]:
+    """Run the benchmarks in a new Python process.
+
+    A new process has another hash seed and memory layout, which changes some
+    durations, so the noise between runs is only measured in separate processes.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "metrics.json"
+        command = [sys.executable, "-m", "benchmarks", *names, "--output", str(path)]
+        if quick:
+            command.append("--quick")
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        return load_metrics(path)
+
+
+def save_metrics(path: Union[str, Path], metrics: List[Metric]):
+    """Save the measured metrics, as read by `load_metrics`."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([vars(metric) for metric in metrics], f)
+
+
+def load_metrics(path: Union[str, Path]) -> List[Metric]:
+    with open(path, encoding="utf-8") as f:
+        return [Metric(**metric) for metric in json.load(f)]
+
+
+def load_baseline(path: Union[str, Path]) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(
+    path: Union[str, Path],
+    metrics: List[Metric],
+    thresholds: dict,
+    metric_thresholds: Optional[Dict[str, float]] = None,
+    informational: Iterable[str] = (),
+):
+    """Save the metrics as the baseline, together with the thresholds.
+
+    Args:
+        path: The path of the baseline file.
+        metrics: The metrics to save.
+        thresholds: The allowed relative regression by unit.
+        metric_thresholds: The allowed relative regression by metric name, which
+            takes precedence over the one of its unit.
+        informational: The names of the metrics which do not fail the comparison.
+    """
+    metric_thresholds = metric_thresholds or {}
+    informational = set(informational)
+    baseline = {
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": sys.implementation.name,
+            "machine": platform.machine(),
+            "system": platform.system(),
+        },
+        "thresholds": thresholds,
+        "metrics": {
+            metric.name: _baseline_entry(
+                metric,
+                metric_thresholds.get(metric.name),
+                metric.name in informational,
+            )
+            for metric in metrics
+        },
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def _baseline_entry(
+    metric: Metric, threshold: Optional[float], informational: bool
+) -> dict:
+    entry = {"value": metric.value, "unit": metric.unit}
+    if threshold is not None:
+        entry["threshold"] = threshold
+    if informational:
+        entry["informational"] = True
+    return entry
+
+
+def is_informational(baseline: dict, name: str) -> bool:
+    """Check if a regression of the metric is reported without failing."""
+    return bool(baseline.get("metrics", {}).get(name, {}).get("informational"))
+
+
+def compare(metrics: List[Metric], baseline: dict) -> Iterator[tuple]:
+    """Compare the metrics with the baseline.
+
+    The baseline durations and throughputs are first scaled by the speed of this
+    machine relative to the machine of the baseline, as measured by the reference
+    of the metric, else by the reference metric.
+    A metric is compared with its own threshold if the baseline has one, else with
+    the threshold of its unit.
+
+    Yields:
+        The metric, its (scaled) baseline value or None, and its regression or None.
+    """
+    thresholds = {**DEFAULT_THRESHOLDS, **baseline.get("thresholds", {})}
+    entries = baseline.get("metrics", {})
+    current = {metric.name: metric.value for metric in metrics}
+    for metric in metrics:
+        entry = entries.get(metric.name)
+        if entry is None or metric.name == REFERENCE:
+            yield metric, entry and entry["value"], None
+            continue
+        value = entry["value"]
+        reference = metric.reference or current.get(REFERENCE)
+        if REFERENCE in entries and reference:
+            value = _denormalize(
+                _normalize(value, metric.unit, entries[REFERENCE]["value"]),
+                metric.unit,
+                reference,
+            )
+        threshold = entry.get(
+            "threshold", thresholds.get(metric.unit, DEFAULT_THRESHOLDS["s"])
+        )
+        yield metric, value, metric.regression(value, threshold)
+
+
+def best_comparison(runs: List[List[Metric]], baseline: dict) -> List[tuple]:
+    """Compare several runs with the baseline, keeping the best run of each metric.
+
+    A metric only regressed if it regressed in every run, so a run disturbed by
+    another process does not fail the comparison.
+
+    Returns:
+        The comparisons of the metrics of the first run, as yielded by `compare`.
+    """
+    best = {}
+    for metrics in runs:
+        for metric, value, regression in compare(metrics, baseline):
+            previous = best.get(metric.name)
+            if previous is None or (previous[2] or 0) > (regression or 0):
+                best[metric.name] = (metric, value, regression)
+    return [best[metric.name] for metric in runs[0]]
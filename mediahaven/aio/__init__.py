@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+try:
+    import httpx  # noqa: F401
+except ImportError as e:  # pragma: no cover
+    raise ImportError(
+        "The async client requires httpx, install it via 'mediahaven[async]'"
+    ) from e
+
+from mediahaven.aio.mediahaven import AsyncMediaHavenClient
+
+# Records
+from mediahaven.aio.resources.records import AsyncRecords
+from mediahaven.aio.resources.field_definitions import AsyncFieldDefinitions
+from mediahaven.aio.resources.organisations import AsyncOrganisations
+
+
+class AsyncMediaHaven(AsyncMediaHavenClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.records = AsyncRecords(self)
+        self.fields = AsyncFieldDefinitions(self)
+        self.organisations = AsyncOrganisations(self)
+
+    async def aclose(self):
+        """Close the connections of the grant."""
+        await self.grant.aclose()
@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json as jsonlib
+import time
+from typing import Optional, Union
+from urllib.parse import urljoin
+
+import httpx
+from oauthlib.oauth2.rfc6749.errors import (
+    TokenExpiredError,
+    InvalidGrantError,
+    InvalidClientIdError,
+)
+
+from mediahaven.aio.oauth2 import AsyncOAuth2Grant
+from mediahaven.compression import CompressionPolicy, CompressionStats
+from mediahaven.concurrency import AIMDLimiter, latency_key
+from mediahaven.hooks import (
+    REQUEST_END,
+    REQUEST_START,
+    RESPONSE_ATTRIBUTE,
+    Hooks,
+    RequestEvent,
+    current_request_event,
+    record_phase,
+    use_request_event,
+)
+from mediahaven.json_decoder import JSONDecoder, get_decoder
+from mediahaven.http2 import to_httpx_timeout, to_requests_exception
+from mediahaven.metrics import ClientMetrics
+from mediahaven.deadline import (
+    DEFAULT_TIMEOUT,
+    Timeout as RequestTimeout,
+    bound_timeout,
+    current_deadline,
+)
+from mediahaven.mediahaven import (
+    API_PATH,
+    AcceptFormat,
+    MediaHavenClient,
+)
+from mediahaven.oauth2 import RefreshTokenError
+from mediahaven.rate_limit import RateLimiter
+from mediahaven.retry import RetryPolicy, RetryStats
+from mediahaven.tracing import Tracing
+
+
+class AsyncMediaHavenClient:
+    """The asyncio MediaHaven client class to communicate with MediaHaven.
+
+    It mirrors the MediaHavenClient, but the requests are executed via the pooled
+    `httpx.AsyncClient` of the grant and need to be awaited. The circuit breakers,
+    the hedging, the validator cache and the transports of the MediaHavenClient
+    are not supported, nor is a token store by the async grants.
+    """
+
+    def __init__(
+        self,
+        mh_base_url: str,
+        grant: AsyncOAuth2Grant,
+        timeout: RequestTimeout = DEFAULT_TIMEOUT,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        concurrency_limiter: Optional[AIMDLimiter] = None,
+        http2: Optional[bool] = None,
+        request_compression: Optional[CompressionPolicy] = None,
+        hooks: Optional[Hooks] = None,
+        metrics: Optional[ClientMetrics] = None,
+        tracing: Optional[Tracing] = None,
+        json_decoder: Union[str, JSONDecoder, None] = None,
+        keep_raw_response: bool = True,
+    ):
+        """Initialize an async MediaHaven client.
+
+        Args:
+            mh_base_url: The base URL of MediaHaven.
+            grant: The async OAuth2 grant used to authorize the requests.
+            timeout: The default timeout of a request in seconds, either a number
+                or a (connect, read) tuple.
+            retry_policy: If set, retry the requests which failed due to a
+                transient error according to this policy.
+            rate_limiter: If set, every request waits until it is allowed by the
+                rate limiter.
+            concurrency_limiter: If set, limit the amount of in-flight requests.
+            http2: If set, enable or disable HTTP/2 on the grant, see
+                `MediaHavenClient`.
+            request_compression: If set, gzip the JSON and XML bodies of the POST
+                and PUT requests according to this policy.
+            hooks: The callbacks of the lifecycle events of the requests, see
+                `MediaHavenClient`. The "ttfb" phase includes the download, as the
+                body is read together with the response.
+            metrics: The metrics of the requests, see `MediaHavenClient`.
+            tracing: If set, open OpenTelemetry spans for the operations and
+                requests, see `MediaHavenClient`.
+            json_decoder: The decoder of the JSON bodies of the result objects,
+                see `MediaHavenClient`.
+            keep_raw_response: If false, the result objects don't keep the raw
+                body of the response, see `MediaHavenClient`.
+        """
+        self.grant = grant
+        if http2 is not None:
+            self.grant.use_http2(http2)
+        self.mh_base_url = mh_base_url
+        self.mh_api_url = urljoin(self.mh_base_url, API_PATH)
+        self.timeout = timeout
+        self.retry_policy = retry_policy
+        self.retry_stats = RetryStats()
+        self.rate_limiter = rate_limiter
+        self.concurrency_limiter = concurrency_limiter
+        self.request_compression = request_compression
+        self.compression_stats = CompressionStats()
+        self.hooks = hooks if hooks is not None else Hooks()
+        self.metrics = metrics if metrics is not None else ClientMetrics()
+        self.metrics.attach(self.hooks)
+        self.metrics.track_grant(self.grant)
+        self.metrics.track_client(self)
+        self.tracing = tracing
+        self.json_decoder = get_decoder(json_decoder)
+        self.keep_raw_response = keep_raw_response
+        if tracing is not None and getattr(self.grant, "tracing", None) is None:
+            self.grant.tracing = tracing
+
+    # The helpers which don't execute requests are shared with the sync client
+    _raise_mediahaven_exception_if_needed = (
+        MediaHavenClient._raise_mediahaven_exception_if_needed
+    )
+    _build_headers = MediaHavenClient._build_headers
+    _encode_query_params = MediaHavenClient._encode_query_params
+    _set_result_options = MediaHavenClient._set_result_options
+
+    def _build_url(self, resource_path: str, params: Optional[str] = None) -> str:
+        """Build the request URL with the already encoded query parameters."""
+        resource_url = urljoin(self.mh_api_url, resource_path)
+        return f"{resource_url}?{params}" if params else resource_url
+
+    async def _execute_request(self, **kwargs) -> httpx.Response:
+        """Execute an authorized request and emit its lifecycle events.
+
+        See MediaHavenClient._execute_request.
+        """
+        hooks = self.hooks
+        if not hooks:
+            response = await self._retry_request(**kwargs)
+            self._set_result_options(response)
+            return response
+
+        event = RequestEvent(
+            hooks, kwargs.get("method", ""), kwargs.get("url", ""), self.mh_api_url
+        )
+        hooks.emit(REQUEST_START, event)
+        try:
+            with use_request_event(event):
+                response = await self._retry_request(**kwargs)
+        except Exception as e:
+            event.error = e
+            event.finish()
+            hooks.emit(REQUEST_END, event)
+            raise
+        event.status_code = response.status_code
+        try:
+            event.request_bytes = len(response.request.content)
+        except httpx.RequestNotRead:
+            # A streamed (multipart) body
+            pass
+        event.response_bytes = len(response.content)
+        event.wire_bytes = response.num_bytes_downloaded
+        setattr(response, RESPONSE_ATTRIBUTE, event)
+        self._set_result_options(response)
+        event.finish()
+        hooks.emit(REQUEST_END, event)
+        return response
+
+    async def _retry_request(self, **kwargs) -> httpx.Response:
+        """Execute an authorized request, retrying it according to the retry policy.
+
+        Args:
+            **kwargs: the kwargs to pass to the request.
+        Returns:
+            The response object.
+        Raises:
+            NoTokenError: If a token has not yet been requested.
+            RefreshTokenError: If an error occurred when refreshing the token.
+            DeadlineExceededError: If the deadline of the request has passed.
+            httpx.HTTPError: Reraise if an HTTP error happen.
+        """
+        policy = self.retry_policy
+        if policy is None or not policy.is_retryable_method(kwargs.get("method", "")):
+            return await self._send_request(**kwargs)
+
+        event = current_request_event()
+        start = time.monotonic()
+        retries = 0
+        while True:
+            response = None
+            try:
+                response = await self._send_request(**kwargs)
+            except httpx.HTTPError as e:
+                # The policy decides on the requests exception of the same failure,
+                # so the sync and async clients retry the same errors
+                if not policy.is_retryable_exception(to_requests_exception(e)):
+                    self.retry_stats.record(retries)
+                    raise
+                error = e
+            else:
+                if not policy.is_retryable_response(response):
+                    self.retry_stats.record(retries)
+                    return response
+
+            # The attempt failed with a transient error
+            retries += 1
+            delay = policy.get_backoff(retries, response)
+            elapsed = time.monotonic() - start
+            active_deadline = current_deadline()
+            if (
+                retries > policy.max_retries
+                or policy.exceeds_max_backoff(delay)
+                or (
+                    policy.total_timeout is not None
+                    and elapsed + delay > policy.total_timeout
+                )
+                or (
+                    active_deadline is not None and delay >= active_deadline.remaining()
+                )
+            ):
+                self.retry_stats.record(retries - 1, exhausted=True)
+                if response is None:
+                    raise error
+                return response
+
+            if response is not None:
+                await response.aclose()
+            if event is not None:
+                event.retries = retries
+            backoff_start = time.perf_counter()
+            await asyncio.sleep(delay)
+            record_phase("backoff", backoff_start)
+
+    async def _send_request(self, **kwargs) -> httpx.Response:
+        """Execute one attempt of a request within the rate and concurrency limits.
+
+        Args:
+            **kwargs: the kwargs to pass to the request.
+        Returns:
+            The response object.
+        Raises:
+            DeadlineExceededError: If the deadline passes while the request waits
+                for the rate or concurrency limiter.
+        """
+        request = self._authorized_request
+        if self.tracing is not None:
+            request = self._traced_request
+
+        wait_start = time.perf_counter()
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async(kwargs.get("method", ""))
+
+        limiter = self.concurrency_limiter
+        if limiter is None:
+            record_phase("wait", wait_start)
+            return await request(**kwargs)
+
+        await limiter.acquire_async()
+        record_phase("wait", wait_start)
+        url = kwargs.get("url", "")
+        key = latency_key(
+            kwargs.get("method", ""),
+            url[len(self.mh_api_url) :] if url.startswith(self.mh_api_url) else "",
+        )
+        start = time.monotonic()
+        try:
+            response = await request(**kwargs)
+        except httpx.TimeoutException:
+            limiter.release(time.monotonic() - start, overloaded=True, key=key)
+            raise
+        except BaseException:
+            limiter.release()
+            raise
+        limiter.release(
+            time.monotonic() - start,
+            overloaded=response.status_code in limiter.overload_statuses,
+            key=key,
+        )
+        return response
+
+    async def _traced_request(
+        self, method: str, url: str, headers: dict = None, **kwargs
+    ) -> httpx.Response:
+        """Execute an authorized request within the client span of the request.
+
+        See MediaHavenClient._traced_request.
+        """
+        event = current_request_event()
+        with self.tracing.request_span(
+            method, url, event.retries if event is not None else 0
+        ) as span:
+            headers = self.tracing.inject(dict(headers or {}))
+            response = await self._authorized_request(method, url, headers, **kwargs)
+            self.tracing.set_response(span, response.status_code)
+            return response
+
+    async def _authorized_request(
+        self, method: str, url: str, headers: dict = None, **kwargs
+    ) -> httpx.Response:
+        """Execute an authorized request.
+
+        If the token is expired, a new token will be issued via the refresh token.
+        If it is not possible to refresh the token for example due to an expired
+        refresh token, raise a RefreshTokenError as manual action is required.
+
+        Args:
+            method: The HTTP method.
+            url: The request URL.
+            headers: The request headers.
+            **kwargs: the kwargs to pass to the request.
+        Returns:
+            The response object.
+        """
+        timeout = to_httpx_timeout(bound_timeout(kwargs.pop("timeout", self.timeout)))
+        auth_start = time.perf_counter()
+        http_client = await self.grant._get_session()
+
+        # Keep the token used for this request so concurrent refreshes are
+        # only executed once.
+        token = self.grant.token
+        try:
+            auth_headers = self.grant._add_token(method, url, dict(headers or {}))
+        except TokenExpiredError:
+            # There is a token but expired, try to refresh the token.
+            try:
+                await self.grant.refresh_token(token)
+            except (InvalidGrantError, InvalidClientIdError) as e:
+                # Refresh token invalid / revoked
+                raise RefreshTokenError from e
+            auth_headers = self.grant._add_token(method, url, dict(headers or {}))
+        record_phase("auth", auth_start)
+
+        request_start = time.perf_counter()
+        response = await http_client.request(
+            method, url, headers=auth_headers, timeout=timeout, **kwargs
+        )
+        record_phase("ttfb", request_start)
+        self.compression_stats.record_response(
+            len(response.content), response.num_bytes_downloaded
+        )
+        return response
+
+    def _compress_request_body(self, kwargs: dict) -> dict:
+        """Gzip the JSON or XML body of a request according to the compression policy.
+
+        See MediaHavenClient._compress_request_body.
+        """
+        policy = self.request_compression
+        if policy is None:
+            return kwargs
+
+        kwargs = dict(kwargs)
+        headers = dict(kwargs.get("headers") or {})
+        if "json" in kwargs:
+            body = jsonlib.dumps(kwargs.pop("json"))
+            headers["content-type"] = "application/json"
+        else:
+            body = kwargs["content"]
+        size = len(body.encode("utf-8") if isinstance(body, str) else body)
+        content, compressed = policy.encode(body)
+        self.compression_stats.record_request(size, len(content))
+        if compressed:
+            headers["Content-Encoding"] = "gzip"
+        kwargs.update(content=content, headers=headers)
+        return kwargs
+
+    async def _head(self, resource_path: str, **query_params) -> int:
+        """Execute a HEAD request and return the "Result-Count" header.
+
+        Raises:
+            MediaHavenException: If the response has a status >= 400.
+        """
+        url = self._build_url(resource_path, self._encode_query_params(**query_params))
+        response = await self._execute_request(
+            method="HEAD", url=url, headers=self._build_headers()
+        )
+        self._raise_mediahaven_exception_if_needed(response)
+        return int(response.headers["Result-Count"])
+
+    async def _get(
+        self, resource_path: str, accept_format: AcceptFormat, **query_params
+    ) -> httpx.Response:
+        """Execute a GET request and return the HTTP response.
+
+        Raises:
+            MediaHavenException: If the response has a status >= 400.
+        """
+        url = self._build_url(resource_path, self._encode_query_params(**query_params))
+        response = await self._execute_request(
+            method="GET", url=url, headers=self._build_headers(accept_format)
+        )
+        self._raise_mediahaven_exception_if_needed(response)
+        return response
+
+    async def _delete(self, resource_path: str, **body) -> bool:
+        """Execute a DELETE request.
+
+        Raises:
+            MediaHavenException: If the response has a status >= 400.
+        """
+        response = await self._execute_request(
+            method="DELETE", url=self._build_url(resource_path), json=body
+        )
+        self._raise_mediahaven_exception_if_needed(response)
+        return response.status_code == 204
+
+    async def _post(
+        self,
+        resource_path: str,
+        json: dict = None,
+        xml: str = None,
+        files: dict = None,
+        **form_data,
+    ) -> Union[dict, bool]:
+        """Execute a POST request.
+
+        See MediaHavenClient._post.
+
+        Raises:
+            MediaHavenException: If the response has a status >= 400.
+            ValueError: If multiple payload values are passed (json, xml or form_data).
+        """
+        if bool(json) + bool(xml) + (bool(files) or bool(form_data)) != 1:
+            raise ValueError(
+                "Only one payload value is allowed (json, xml or form_data)"
+            )
+        url = self._build_url(resource_path)
+
+        if json:
+            response = await self._execute_request(
+                **self._compress_request_body(dict(method="POST", url=url, json=json))
+            )
+        elif xml:
+            headers = {"content-type": "application/xml"}
+            response = await self._execute_request(
+                **self._compress_request_body(
+                    dict(method="POST", url=url, headers=headers, content=xml)
+                )
+            )
+        else:
+            response = await self._execute_request(
+                method="POST",
+                url=url,
+                files=_encode_files(files) or None,
+                data={key: str(val) for key, val in form_data.items()},
+            )
+
+        self._raise_mediahaven_exception_if_needed(response)
+
+        if response.status_code in (range(200, 207)):
+            try:
+                return response.json()
+            except ValueError:
+                return True
+
+        return False
+
+    async def _put(
+        self, resource_path: str, json: dict = None, xml: str = None, **form_data
+    ) -> bool:
+        """Execute a PUT request.
+
+        See MediaHavenClient._put.
+
+        Raises:
+            MediaHavenException: If the response has a status >= 400.
+            ValueError: If multiple payload values are passed (json or xml).
+        """
+        if bool(json) + bool(xml) != 1:
+            raise ValueError("Only one payload value is allowed (json or xml)")
+        url = self._build_url(resource_path)
+
+        if json:
+            response = await self._execute_request(
+                **self._compress_request_body(dict(method="PUT", url=url, json=json))
+            )
+        else:
+            headers = {"content-type": "application/xml"}
+            response = await self._execute_request(
+                **self._compress_request_body(
+                    dict(method="PUT", url=url, headers=headers, content=xml)
+                )
+            )
+
+        self._raise_mediahaven_exception_if_needed(response)
+
+        return response.status_code in (200, 204)
+
+
+def _encode_files(files: Optional[dict]) -> dict:
+    """Encode the values of the multipart parts as text, like requests does."""
+    encoded = {}
+    for name, part in (files or {}).items():
+        if isinstance(part, tuple):
+            filename, content, *rest = part
+            if not isinstance(content, (str, bytes)) and not hasattr(content, "read"):
+                content = str(content)
+            part = (filename, content, *rest)
+        encoded[name] = part
+    return encoded
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+from urllib.parse import urljoin
+
+import httpx
+from oauthlib.oauth2 import LegacyApplicationClient, WebApplicationClient
+from oauthlib.oauth2.rfc6749.errors import (
+    CustomOAuth2Error,
+    InvalidClientError,
+)
+
+from mediahaven.deadline import DEFAULT_TIMEOUT, Timeout, bound_timeout
+from mediahaven.http2 import to_httpx_timeout
+from mediahaven.oauth2 import (
+    DEFAULT_POOL_MAXSIZE,
+    NoTokenError,
+    RequestTokenError,
+    refresh_cooldown,
+    token_refresh_margin,
+)
+from mediahaven.tracing import span
+
+# Seconds an idle connection is kept alive in the pool.
+DEFAULT_KEEPALIVE_EXPIRY = 5.0
+
+logger = logging.getLogger(__name__)
+
+TOKEN_REQUEST_HEADERS = {
+    "Accept": "application/json",
+    "Content-Type": "application/x-www-form-urlencoded;charset=UTF-8",
+}
+
+
+class AsyncOAuth2Grant(ABC):
+    """Abstract class representing an OAuth2 grant used by the async client.
+
+    The grant owns one pooled `httpx.AsyncClient`, which is shared by all the
+    requests of the clients using this grant.
+    """
+
+    def __init__(
+        self,
+        mh_base_url: str,
+        client_id: str,
+        client_secret: str,
+        max_connections: Optional[int] = 100,
+        max_keepalive_connections: Optional[int] = DEFAULT_POOL_MAXSIZE,
+        keepalive_expiry: Optional[float] = DEFAULT_KEEPALIVE_EXPIRY,
+        refresh_margin: Optional[float] = None,
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        http2: bool = False,
+    ):
+        """Initialize an async grant.
+
+        Args:
+            mh_base_url: The URL of MH auth server.
+            client_id: The ID of the client.
+            client_secret: The secret of the client.
+            max_connections: The maximum amount of connections.
+            max_keepalive_connections: The maximum amount of idle connections.
+            keepalive_expiry: The seconds an idle connection is kept alive.
+            refresh_margin: If set, renew the token when a session is requested
+                less than this amount of seconds before the token expires.
+            timeout: The timeout of the token requests in seconds, bounded by the
+                current deadline, if any.
+            http2: If true, send the HTTPS requests over HTTP/2, multiplexed over
+                at most `max_connections` connections. Requires the "http2" extra.
+        """
+        self.mh_base_url = mh_base_url
+        self.client = None
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.refresh_margin = refresh_margin
+        self.timeout = timeout
+        self.http2 = http2
+        self.token: Optional[dict] = None
+        # The amount of refreshes of the token by this grant
+        self.refresh_count = 0
+        # The monotonic time before which a failed ahead-of-expiry refresh is
+        # not retried
+        self._refresh_retry_at = 0.0
+        # The tracing of the token refreshes, set by the client if enabled
+        self.tracing = None
+        self.refresh_url = urljoin(self.mh_base_url, "/auth/oauth2/token")
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        """The lock guarding the refresh, created in the running event loop."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """The pooled HTTP client, created on first use."""
+        if self._http_client is None:
+            self._http_client = self._create_http_client()
+        return self._http_client
+
+    def _create_http_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(limits=self.limits, http2=self.http2)
+
+    def use_http2(self, enabled: bool = True):
+        """Enable or disable HTTP/2 for the requests sent via this grant.
+
+        Args:
+            enabled: If true, send the HTTPS requests over HTTP/2.
+
+        Raises:
+            RuntimeError: If the HTTP client has already been created.
+        """
+        if enabled == self.http2:
+            return
+        if self._http_client is not None:
+            raise RuntimeError(
+                "HTTP/2 must be configured before the first request of the grant."
+            )
+        self.http2 = enabled
+
+    @property
+    def oauth_client(self):
+        """The OAuthlib client which holds the token attributes."""
+        if self.client is None:
+            self.client = WebApplicationClient(self.client_id)
+        return self.client
+
+    def _set_token(self, token: dict):
+        """Set the token and populate the OAuthlib client with it."""
+        self.oauth_client.token = token
+        self.oauth_client.populate_token_attributes(token)
+        self.token = token
+
+    def _expires_within(self, margin: float) -> bool:
+        """Check if the access token expires within the margin for this token."""
+        expires_at = (self.token or {}).get("expires_at")
+        margin = token_refresh_margin(self.token, margin)
+        return expires_at is not None and time.time() >= expires_at - margin
+
+    @abstractmethod
+    async def request_token(self):
+        pass
+
+    async def _post_token_request(self, url: str, body: str) -> dict:
+        """Send a token request and parse the token from the response."""
+        response = await self.http_client.post(
+            url,
+            content=body,
+            headers=TOKEN_REQUEST_HEADERS,
+            timeout=to_httpx_timeout(bound_timeout(self.timeout)),
+        )
+        return self.oauth_client.parse_request_body_response(response.text)
+
+    async def refresh_token(self, expired_token: Optional[dict] = None):
+        """Refresh the OAuth2 token with the saved refresh token.
+
+        The refresh is single-flight: only one task refreshes at a time while the
+        other tasks wait for the result. When the expired token is passed and it
+        has already been replaced by the time the lock is acquired, the refresh is
+        skipped.
+
+        Args:
+            expired_token: The token that was found to be expired.
+        """
+        async with self.lock:
+            if expired_token is not None and self.token is not expired_token:
+                # Another task already refreshed the token
+                return
+            body = self.oauth_client.prepare_refresh_body(
+                refresh_token=self.token["refresh_token"],
+                client_id=self.client_id,
+                client_secret=self.client_secret,
+            )
+            with span(self.tracing, "mediahaven.token_refresh"):
+                token = await self._post_token_request(self.refresh_url, body)
+            self._set_token(token)
+            self.refresh_count += 1
+
+    async def _get_session(self) -> httpx.AsyncClient:
+        """Return the pooled HTTP client, renewing the token if needed.
+
+        A failed ahead-of-expiry renewal is only retried after a cooldown, see
+        `OAuth2Grant._get_session`.
+
+        Returns:
+            The pooled HTTP client.
+
+        Raises:
+            NoTokenError: When a token has not yet been requested.
+        """
+        if not self.token:
+            raise NoTokenError
+        if (
+            self.refresh_margin is not None
+            and self._expires_within(self.refresh_margin)
+            and time.monotonic() >= self._refresh_retry_at
+        ):
+            try:
+                await self.refresh_token(self.token)
+            except Exception:
+                # The token is still valid, the refresh on expiry will take over
+                logger.warning("Ahead-of-expiry token refresh failed", exc_info=True)
+                self._refresh_retry_at = time.monotonic() + refresh_cooldown(
+                    self.refresh_margin
+                )
+        return self.http_client
+
+    def _add_token(self, method: str, url: str, headers: dict) -> dict:
+        """Add the access token to the headers of a request.
+
+        Raises:
+            TokenExpiredError: If the access token has expired.
+        """
+        _, headers, _ = self.oauth_client.add_token(
+            url, http_method=method, headers=headers
+        )
+        return headers
+
+    async def aclose(self):
+        """Close the pooled HTTP client and its connections."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+
+class AsyncROPCGrant(AsyncOAuth2Grant):
+    """Represents a "Resource Owner Password Credential" grant."""
+
+    def __init__(self, mh_base_url: str, client_id: str, client_secret: str, **kwargs):
+        super().__init__(mh_base_url, client_id, client_secret, **kwargs)
+        self.token_url = urljoin(self.mh_base_url, "/auth/ropc.php")
+        self.client = LegacyApplicationClient(self.client_id)
+
+    async def request_token(self, username: str, password: str):
+        """Request an OAuth2 token.
+
+        Args:
+            username: The username of the resource owner.
+            password: The password of the resource owner.
+
+        Raises:
+            RequestTokenException: When an error occurred when requesting the token.
+        """
+        body = self.client.prepare_request_body(
+            username=username,
+            password=password,
+            client_id=self.client_id,
+            client_secret=self.client_secret,
+            include_client_id=True,
+        )
+        async with self.lock:
+            try:
+                token = await self._post_token_request(self.token_url, body)
+            except (CustomOAuth2Error, InvalidClientError) as err:
+                raise RequestTokenError from err
+            self._set_token(token)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+import xml.etree.ElementTree as ET
+from typing import AsyncGenerator, Iterator, Optional, Union
+
+import httpx
+
+from mediahaven.deadline import Deadline, use_deadline
+from mediahaven.mediahaven import AcceptFormat
+from mediahaven.resources.base_resource import (
+    BaseResource,
+    MediaHavenPageObject,
+    MediaHavenPageObjectJSON,
+    MediaHavenPageObjectXML,
+    NoMorePagesException,
+    _emit_object_created,
+    _record_yielded,
+)
+from mediahaven.resources.streaming import CHUNK_SIZE
+from mediahaven.resources.views import DictView
+from mediahaven.tracing import end_scan_span, start_scan_span, use_span
+
+
+class AsyncMediaHavenPageObjectJSON(MediaHavenPageObjectJSON):
+    """A paged JSON result of which the subsequent pages are fetched async."""
+
+    async def next_page(self) -> AsyncMediaHavenPageObjectJSON:
+        if self.has_more:
+            params = self._query_params.copy()
+            params["startIndex"] = self.start_index + self.nr_of_results
+            return await self._resource.search(
+                accept_format=AcceptFormat.JSON, **params
+            )
+        else:
+            raise NoMorePagesException
+
+    def as_generator(
+        self, deadline: Optional[float] = None
+    ) -> AsyncGenerator[DictView, None]:
+        """Returns an async generator for all the result items over all the pages.
+
+        Args:
+            deadline: The optional time budget in seconds for fetching all the
+                subsequent pages, counting from the creation of the generator.
+
+        Returns:
+            An async generator.
+        """
+        return _aiter_pages(self, deadline)
+
+
+class AsyncMediaHavenPageObjectXML(MediaHavenPageObjectXML):
+    """A paged XML result of the async client, see MediaHavenPageObjectXML.
+
+    The body of the response has been read already, it is still parsed
+    incrementally so the processed elements are released during a scan.
+    """
+
+    def _chunks(self, response: httpx.Response) -> Iterator[bytes]:
+        return response.iter_bytes(CHUNK_SIZE)
+
+    def close(self):
+        """The body of the response has been read already."""
+        pass
+
+    async def next_page(self) -> AsyncMediaHavenPageObjectXML:
+        if self.has_more:
+            return await self._resource.search(
+                accept_format=self._accept_format, **self._next_page_params()
+            )
+        else:
+            raise NoMorePagesException
+
+    def as_generator(
+        self, deadline: Optional[float] = None
+    ) -> AsyncGenerator[ET.Element, None]:
+        """See AsyncMediaHavenPageObjectJSON.as_generator."""
+        return _aiter_pages(self, deadline)
+
+
+def _aiter_pages(
+    first_page: MediaHavenPageObject, deadline: Optional[float] = None
+) -> AsyncGenerator[Union[DictView, ET.Element], None]:
+    """Return an async generator of the results of the page and the next pages.
+
+    The deadline starts now rather than on the first `__anext__()`.
+    """
+    budget = Deadline(deadline) if deadline is not None else None
+    return _aiter_pages_within(first_page, budget)
+
+
+async def _aiter_pages_within(
+    first_page: MediaHavenPageObject, budget: Optional[Deadline]
+) -> AsyncGenerator[Union[DictView, ET.Element], None]:
+    page = first_page
+    yielded = 0
+    # The span of the scan, the subsequent pages are fetched within it
+    scan_span = start_scan_span(first_page._resource)
+    try:
+        while True:
+            for result in page._results():
+                yielded += 1
+                yield result
+
+            try:
+                with use_deadline(budget), use_span(scan_span):
+                    page = await page.next_page()
+            except NoMorePagesException:
+                break
+    finally:
+        _record_yielded(first_page._resource, yielded)
+        end_scan_span(scan_span, yielded)
+
+
+class AsyncMediaHavenPageObjectCreator:
+    """Factory class for creating a paged result of the async client."""
+
+    @staticmethod
+    def create_object(
+        response: httpx.Response,
+        accept_format: AcceptFormat,
+        resource: BaseResource,
+        **query_params,
+    ) -> MediaHavenPageObject:
+        """Create an AsyncMediaHavenPageObjectJSON or AsyncMediaHavenPageObjectXML.
+
+        Args:
+            response: The HTTP response.
+            accept_format: To determine the format of the result (XML/JSON).
+            resource: The resource that executed the initial request.
+            **query_params: The optional query parameters.
+        Returns:
+            The paged result.
+        """
+        if accept_format == AcceptFormat.JSON:
+            page = AsyncMediaHavenPageObjectJSON(response, resource, **query_params)
+            _emit_object_created(response, page, page.nr_of_results)
+            return page
+        else:
+            page = AsyncMediaHavenPageObjectXML(
+                response, resource, accept_format, **query_params
+            )
+            _emit_object_created(response, page, page._parser.fields.get("NrOfResults"))
+            return page
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from mediahaven.aio.resources.base_resource import (
+    AsyncMediaHavenPageObjectCreator,
+    AsyncMediaHavenPageObjectJSON,
+)
+from mediahaven.mediahaven import DEFAULT_ACCEPT_FORMAT
+from mediahaven.resources.base_resource import (
+    MediaHavenSingleObject,
+    MediaHavenSingleObjectCreator,
+)
+from mediahaven.resources.field_definitions import FieldDefinitions
+from mediahaven.tracing import traced
+
+
+class AsyncFieldDefinitions(FieldDefinitions):
+    """Public API endpoint of MediaHaven field definitions for the async client."""
+
+    @traced("get")
+    async def get(
+        self,
+        field: str = None,
+        accept_format=DEFAULT_ACCEPT_FORMAT,
+    ) -> MediaHavenSingleObject:
+        """Get a single field definition.
+
+        See FieldDefinitions.get.
+        """
+        response = await self.mh_client._get(
+            self._construct_path(field),
+            accept_format,
+        )
+        return MediaHavenSingleObjectCreator.create_object(response, accept_format)
+
+    @traced("search")
+    async def search(
+        self, accept_format=DEFAULT_ACCEPT_FORMAT, **query_params
+    ) -> AsyncMediaHavenPageObjectJSON:
+        """Search all field definitions.
+
+        See FieldDefinitions.search.
+        """
+        response = await self.mh_client._get(
+            self._construct_path(),
+            accept_format,
+            **query_params,
+        )
+        return AsyncMediaHavenPageObjectCreator.create_object(
+            response, accept_format, self, **query_params
+        )
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from mediahaven.aio.resources.base_resource import (
+    AsyncMediaHavenPageObjectCreator,
+    AsyncMediaHavenPageObjectJSON,
+)
+from mediahaven.mediahaven import DEFAULT_ACCEPT_FORMAT
+from mediahaven.resources.base_resource import (
+    MediaHavenSingleObject,
+    MediaHavenSingleObjectCreator,
+)
+from mediahaven.resources.organisations import Organisations
+from mediahaven.tracing import traced
+
+
+class AsyncOrganisations(Organisations):
+    """Public API endpoint of MediaHaven tenants for the async client."""
+
+    @traced("get")
+    async def get(
+        self,
+        organisation_id: str,
+        accept_format=DEFAULT_ACCEPT_FORMAT,
+    ) -> MediaHavenSingleObject:
+        """Get a single organisation.
+
+        See Organisations.get.
+        """
+        response = await self.mh_client._get(
+            self._construct_path(organisation_id),
+            accept_format,
+        )
+        return MediaHavenSingleObjectCreator.create_object(response, accept_format)
+
+    @traced("get_by_external_id")
+    async def get_by_external_id(
+        self,
+        external_id: str,
+        accept_format=DEFAULT_ACCEPT_FORMAT,
+    ) -> MediaHavenSingleObject:
+        """Get a single organisation by its ExternalId.
+
+        See Organisations.get_by_external_id.
+        """
+        response = await self.mh_client._get(
+            self._construct_path(f"ExternalId:{external_id}"),
+            accept_format,
+        )
+        return MediaHavenSingleObjectCreator.create_object(response, accept_format)
+
+    @traced("search")
+    async def search(
+        self, accept_format=DEFAULT_ACCEPT_FORMAT, **query_params
+    ) -> AsyncMediaHavenPageObjectJSON:
+        """Search all organisations.
+
+        See Organisations.search.
+        """
+        response = await self.mh_client._get(
+            self._construct_path(),
+            accept_format,
+            **query_params,
+        )
+        return AsyncMediaHavenPageObjectCreator.create_object(
+            response, accept_format, self, **query_params
+        )
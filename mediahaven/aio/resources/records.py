@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from mediahaven.aio.resources.base_resource import (
+    AsyncMediaHavenPageObjectCreator,
+    AsyncMediaHavenPageObjectJSON,
+)
+from mediahaven.mediahaven import DEFAULT_ACCEPT_FORMAT
+from mediahaven.resources.base_resource import (
+    MediaHavenSingleObject,
+    MediaHavenSingleObjectCreator,
+)
+from mediahaven.resources.records import Records
+from mediahaven.tracing import traced
+
+
+class AsyncRecords(Records):
+    """Public API endpoint of a MediaHaven record for the async client.
+
+    All the methods return an awaitable. The methods which only pass the result of
+    the client through (count, delete, update, publish, ...) are inherited, as the
+    async client returns a coroutine for them.
+    """
+
+    @traced("get")
+    async def get(
+        self,
+        record_id: str,
+        accept_format=DEFAULT_ACCEPT_FORMAT,
+        include_deleted=False,
+        **query_params,
+    ) -> MediaHavenSingleObject:
+        """Get a single record.
+
+        See Records.get.
+        """
+        response = await self.mh_client._get(
+            self._construct_path(record_id),
+            accept_format,
+            includeDeleted=str(include_deleted).lower(),
+            **query_params,
+        )
+        return MediaHavenSingleObjectCreator.create_object(response, accept_format)
+
+    @traced("search")
+    async def search(
+        self, accept_format=DEFAULT_ACCEPT_FORMAT, **query_params
+    ) -> AsyncMediaHavenPageObjectJSON:
+        """Search for multiple records.
+
+        See Records.search.
+        """
+        response = await self.mh_client._get(
+            self._construct_path(),
+            accept_format,
+            **query_params,
+        )
+        return AsyncMediaHavenPageObjectCreator.create_object(
+            response, accept_format, self, **query_params
+        )
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+# The prefix of the names of the attributes which the client sets on a response.
+ATTRIBUTE_PREFIX = "mediahaven_"
+
+# Response headers which describe the body of a 304 response, not the cached one.
+_BODY_HEADERS = frozenset({"content-length", "content-encoding", "transfer-encoding"})
+
+CacheKey = Tuple[str, str]
+
+
+class CachedResponse:
+    """A response body stored together with its validators."""
+
+    def __init__(self, response: Response):
+        self.status_code = response.status_code
+        self.reason = response.reason
+        self.headers = CaseInsensitiveDict(response.headers)
+        self.encoding = response.encoding
+        self.content = response.content
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+
+    def conditional_headers(self) -> dict:
+        """Return the headers to revalidate the response with."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self, not_modified: Response) -> Response:
+        """Build a full response out of the cached one and a 304 response.
+
+        Args:
+            not_modified: The 304 response which revalidated the cached response.
+
+        Returns:
+            A response with the cached body and the updated headers.
+        """
+        headers = CaseInsensitiveDict(self.headers)
+        for name, value in not_modified.headers.items():
+            if name.lower() not in _BODY_HEADERS:
+                headers[name] = value
+        response = Response()
+        response.status_code = self.status_code
+        response.reason = self.reason
+        response.headers = headers
+        response.encoding = self.encoding
+        response._content = self.content
+        response._content_consumed = True
+        response.url = not_modified.url
+        response.request = not_modified.request
+        response.elapsed = not_modified.elapsed
+        response.from_cache = True
+        # The attributes set by the client, e.g. the RequestEvent of the request
+        for attribute, value in vars(not_modified).items():
+            if attribute.startswith(ATTRIBUTE_PREFIX):
+                setattr(response, attribute, value)
+        return response
+
+
+class ValidatorCache:
+    """Thread-safe LRU cache of responses which carry an ETag or Last-Modified.
+
+    The client revalidates a cached response with a conditional request. If
+    MediaHaven answers "304 Not Modified", the cached body is used instead of
+    downloading it again. Responses are cached per URL and "Accept" format.
+
+    Attributes:
+        max_entries: The maximum amount of cached responses.
+        hits: The amount of requests answered with a 304.
+        misses: The amount of requests which downloaded the body.
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[CacheKey, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def store(self, key: CacheKey, response: Response):
+        """Cache the response if it carries a validator, else forget the key."""
+        if "ETag" not in response.headers and "Last-Modified" not in response.headers:
+            self.discard(key)
+            return
+        entry = CachedResponse(response)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: CacheKey):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Dict, Iterable, Optional, Tuple
+
+# Statuses indicating that MediaHaven is degraded.
+DEFAULT_FAILURE_STATUSES = frozenset({500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """Raised when a request is refused because the circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(
+            f"Circuit '{name}' is open, retry after {retry_after:.1f} seconds."
+        )
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Circuit breaker which stops sending requests to a degraded backend.
+
+    The outcomes of the last `window_size` requests are kept. Once at least
+    `minimum_calls` outcomes are known and the failure rate reaches the threshold,
+    the circuit opens and requests fail fast with a CircuitOpenError. After
+    `open_duration` seconds, the circuit half-opens and lets through at most
+    `half_open_max_calls` probe requests at a time. A successful probe closes the
+    circuit, a failed probe opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str = "",
+        failure_rate_threshold: float = 0.5,
+        minimum_calls: int = 20,
+        window_size: int = 100,
+        open_duration: float = 30,
+        half_open_max_calls: int = 1,
+        failure_statuses: Iterable[int] = DEFAULT_FAILURE_STATUSES,
+    ):
+        """Initialize a CircuitBreaker.
+
+        Args:
+            name: The name of the circuit, used in the CircuitOpenError.
+            failure_rate_threshold: The failure rate (0-1) which opens the circuit.
+            minimum_calls: The minimum amount of outcomes before the circuit opens.
+            window_size: The amount of last outcomes to calculate the rate with.
+            open_duration: The seconds the circuit stays open before half-opening.
+            half_open_max_calls: The maximum amount of concurrent probe requests.
+            failure_statuses: The response statuses which count as a failure.
+        """
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.open_duration = open_duration
+        self.half_open_max_calls = half_open_max_calls
+        self.failure_statuses = frozenset(failure_statuses)
+        self._outcomes: deque = deque(maxlen=window_size)
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> CircuitState:
+        if (
+            self._state == CircuitState.OPEN
+            and time.monotonic() - self._opened_at >= self.open_duration
+        ):
+            self._state = CircuitState.HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    @property
+    def failure_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+    def before_request(self):
+        """Check if a request is allowed.
+
+        Raises:
+            CircuitOpenError: If the circuit is open or all probes are in flight.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CircuitState.CLOSED:
+                return
+            if (
+                state == CircuitState.HALF_OPEN
+                and self._probes < self.half_open_max_calls
+            ):
+                self._probes += 1
+                return
+            retry_after = max(
+                self._opened_at + self.open_duration - time.monotonic(), 0
+            )
+            raise CircuitOpenError(self.name, retry_after)
+
+    def record(self, success: Optional[bool]):
+        """Record the outcome of an allowed request.
+
+        Args:
+            success: If the request succeeded. None if the request did not reach
+                MediaHaven, which only releases a probe slot.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CircuitState.HALF_OPEN:
+                self._probes = max(self._probes - 1, 0)
+                if success is True:
+                    self._outcomes.clear()
+                    self._state = CircuitState.CLOSED
+                elif success is False:
+                    self._open()
+                return
+            if success is None or state == CircuitState.OPEN:
+                return
+            self._outcomes.append(success)
+            if len(self._outcomes) >= self.minimum_calls:
+                failure_rate = self._outcomes.count(False) / len(self._outcomes)
+                if failure_rate >= self.failure_rate_threshold:
+                    self._open()
+
+    def is_failure_status(self, status_code: int) -> bool:
+        return status_code in self.failure_statuses
+
+    def _open(self):
+        self._state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+
+class CircuitBreakerRegistry:
+    """The circuit breakers of a client, one per base URL and optionally resource.
+
+    The registry can be shared between clients, so all the clients talking to the
+    same MediaHaven base URL share its circuit.
+    """
+
+    def __init__(self, per_resource: bool = False, **breaker_kwargs):
+        """Initialize a CircuitBreakerRegistry.
+
+        Args:
+            per_resource: If true, use a separate circuit per resource name.
+            **breaker_kwargs: The kwargs to create the circuit breakers with.
+        """
+        self.per_resource = per_resource
+        self.breaker_kwargs = breaker_kwargs
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, base_url: str, resource_name: str = "") -> CircuitBreaker:
+        """Return the circuit breaker for the base URL (and resource)."""
+        key = (base_url, resource_name if self.per_resource else "")
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                name = base_url
+                if key[1]:
+                    name = f"{base_url.rstrip('/')}/{key[1]}"
+                breaker = CircuitBreaker(name, **self.breaker_kwargs)
+                self._breakers[key] = breaker
+            return breaker
+
+    def states(self) -> Dict[str, str]:
+        """Return the state of every circuit by name."""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.state.value for breaker in breakers}
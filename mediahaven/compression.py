@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import gzip
+import threading
+from typing import Optional, Tuple, Union
+
+from requests.models import Response
+from urllib3.util.request import ACCEPT_ENCODING as _URLLIB3_ACCEPT_ENCODING
+
+# The content codings which can be decoded with the installed packages: gzip and
+# deflate, brotli if "brotli" is installed and zstd if "zstandard" is installed.
+ACCEPT_ENCODING = ", ".join(_URLLIB3_ACCEPT_ENCODING.split(","))
+
+# Minimum size in bytes of a request body before it is compressed.
+DEFAULT_MIN_SIZE = 1024
+
+
+class CompressionPolicy:
+    """Policy to gzip the request bodies sent to MediaHaven.
+
+    Small bodies are sent as is, as the gzip header and the CPU time outweigh the
+    savings. A body which does not get smaller is sent uncompressed as well.
+
+    Attributes:
+        min_size: The minimum size in bytes of a body before it is compressed.
+        level: The gzip compression level, from 1 (fast) to 9 (small).
+    """
+
+    def __init__(self, min_size: int = DEFAULT_MIN_SIZE, level: int = 6):
+        self.min_size = min_size
+        self.level = level
+
+    def encode(self, body: Union[str, bytes]) -> Tuple[bytes, bool]:
+        """Encode the request body, compressing it if worthwhile.
+
+        Args:
+            body: The request body. Text is encoded as UTF-8.
+
+        Returns:
+            The body to send and whether it is gzipped.
+        """
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        if len(data) < self.min_size:
+            return data, False
+        compressed = gzip.compress(data, compresslevel=self.level)
+        if len(compressed) >= len(data):
+            return data, False
+        return compressed, True
+
+
+class CompressionStats:
+    """Thread-safe counters of the body sizes, before and on the wire.
+
+    Only the request bodies passed through a compression policy are counted.
+
+    Attributes:
+        request_bytes: The size of the request bodies before compression.
+        request_wire_bytes: The size of the request bodies as sent.
+        compressed_requests: The amount of request bodies which were gzipped.
+        response_bytes: The size of the decoded response bodies.
+        response_wire_bytes: The size of the response bodies as received.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_bytes = 0
+        self.request_wire_bytes = 0
+        self.compressed_requests = 0
+        self.response_bytes = 0
+        self.response_wire_bytes = 0
+
+    def record_request(self, size: int, wire_size: int):
+        with self._lock:
+            self.request_bytes += size
+            self.request_wire_bytes += wire_size
+            if wire_size != size:
+                self.compressed_requests += 1
+
+    def record_response(self, size: int, wire_size: int):
+        with self._lock:
+            self.response_bytes += size
+            self.response_wire_bytes += wire_size
+
+    @property
+    def saved_bytes(self) -> int:
+        """The amount of bytes which did not need to be transferred."""
+        with self._lock:
+            return (
+                self.request_bytes
+                - self.request_wire_bytes
+                + self.response_bytes
+                - self.response_wire_bytes
+            )
+
+    def as_dict(self) -> dict:
+        saved_bytes = self.saved_bytes
+        with self._lock:
+            return {
+                "request_bytes": self.request_bytes,
+                "request_wire_bytes": self.request_wire_bytes,
+                "compressed_requests": self.compressed_requests,
+                "response_bytes": self.response_bytes,
+                "response_wire_bytes": self.response_wire_bytes,
+                "saved_bytes": saved_bytes,
+            }
+
+
+def response_wire_size(response: Response) -> Optional[int]:
+    """Return the size of the body of a requests response as received.
+
+    Args:
+        response: A response of which the body has been read.
+
+    Returns:
+        The amount of bytes read from the connection, the "Content-Length" header
+        if that is not known or None if neither is known.
+    """
+    tell = getattr(response.raw, "tell", None)
+    if tell is not None:
+        try:
+            position = tell()
+        except (OSError, ValueError):
+            position = None
+        if isinstance(position, int):
+            return position
+    content_length = response.headers.get("Content-Length")
+    return int(content_length) if content_length and content_length.isdigit() else None
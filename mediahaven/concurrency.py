@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from mediahaven.deadline import DeadlineExceededError, current_deadline
+
+# Statuses indicating that MediaHaven is overloaded.
+DEFAULT_OVERLOAD_STATUSES = frozenset({429, 503})
+# Seconds between the checks for a free slot in async code.
+ASYNC_POLL_INTERVAL = 0.005
+
+
+def latency_key(method: str, path: str) -> str:
+    """Return the key of the baseline latency of a request, e.g. "GET records/*".
+
+    Searching a resource and getting one of its items have separate baselines.
+
+    Args:
+        method: The HTTP method.
+        path: The path of the request relative to the API, e.g. "records/1".
+    """
+    resource, _, item = path.split("?", 1)[0].partition("/")
+    return f"{method.upper()} {resource}/*" if item else f"{method.upper()} {resource}"
+
+
+class AIMDLimiter:
+    """Adaptive limit on the amount of in-flight requests.
+
+    The limit is adapted via "additive increase, multiplicative decrease" (AIMD):
+    while the latency is stable, the limit grows with `increase` per window of
+    `limit` successful requests. On an overload status (429/503), a timeout or a
+    latency spike, the limit is multiplied by `decrease_factor`. To react only once
+    per congestion event, the limit is not decreased again within one smoothed
+    latency after the previous decrease.
+
+    A latency spike is a latency larger than `latency_tolerance` times the baseline
+    latency. A baseline is kept per key, e.g. per endpoint, as the latency of a
+    search page differs from the latency of a single record. The baseline is a
+    moving average of the latencies with weight `smoothing`, or `spike_smoothing`
+    for a spike. That way a lasting shift in latency is learned.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 100,
+        increase: float = 1,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+        smoothing: float = 0.1,
+        spike_smoothing: float = 0.01,
+        overload_statuses: Iterable[int] = DEFAULT_OVERLOAD_STATUSES,
+        history_size: int = 1000,
+    ):
+        """Initialize an AIMDLimiter.
+
+        Args:
+            initial_limit: The initial amount of in-flight requests.
+            min_limit: The minimum limit.
+            max_limit: The maximum limit.
+            increase: The increase of the limit per window of successful requests.
+            decrease_factor: The factor to multiply the limit with on overload.
+            latency_tolerance: The factor of the baseline latency from which a
+                latency is considered a spike.
+            smoothing: The weight of a new latency in the moving average.
+            spike_smoothing: The weight of a latency spike in the moving average.
+            overload_statuses: The response statuses indicating an overload.
+            history_size: The amount of limit changes to keep in the history.
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("Expected 1 <= min_limit <= initial_limit <= max_limit")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.spike_smoothing = spike_smoothing
+        self.overload_statuses = frozenset(overload_statuses)
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._baselines: Dict[str, float] = {}
+        self._last_decrease = 0.0
+        self._history: deque = deque(maxlen=history_size)
+        self._history.append((time.time(), initial_limit))
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """The current maximum amount of in-flight requests."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """The current amount of in-flight requests."""
+        return self._in_flight
+
+    @property
+    def baseline_latencies(self) -> Dict[str, float]:
+        """The baseline latency per key."""
+        with self._condition:
+            return dict(self._baselines)
+
+    @property
+    def history(self) -> List[Tuple[float, int]]:
+        """The changes of the limit as (timestamp, limit) tuples."""
+        with self._condition:
+            return list(self._history)
+
+    def try_acquire(self) -> bool:
+        """Take a slot if one is available.
+
+        Returns:
+            True if a slot was taken.
+        """
+        with self._condition:
+            if self._in_flight < self.limit:
+                self._in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        """Take a slot, blocking until one is available.
+
+        Raises:
+            DeadlineExceededError: If no slot became available before the current
+                deadline.
+        """
+        active = current_deadline()
+        with self._condition:
+            while self._in_flight >= self.limit:
+                if active is None:
+                    self._condition.wait()
+                    continue
+                remaining = active.remaining()
+                if not remaining:
+                    raise DeadlineExceededError
+                self._condition.wait(remaining)
+            self._in_flight += 1
+
+    async def acquire_async(self):
+        """Take a slot, awaiting until one is available.
+
+        Raises:
+            DeadlineExceededError: If no slot became available before the current
+                deadline.
+        """
+        active = current_deadline()
+        while not self.try_acquire():
+            if active is not None and active.expired:
+                raise DeadlineExceededError
+            await asyncio.sleep(ASYNC_POLL_INTERVAL)
+
+    def release(
+        self,
+        latency: Optional[float] = None,
+        overloaded: bool = False,
+        key: str = "",
+    ):
+        """Release a slot and adapt the limit to the outcome of the request.
+
+        Args:
+            latency: The latency of the request in seconds. If None, the request
+                did not complete and the limit is not adapted.
+            overloaded: If MediaHaven signalled an overload.
+            key: The key of the baseline latency of the request, e.g. the
+                endpoint.
+        """
+        with self._condition:
+            self._in_flight -= 1
+            baseline = self._baselines.get(key)
+            if overloaded:
+                self._decrease(baseline)
+            elif latency is not None:
+                if baseline is None:
+                    self._baselines[key] = latency
+                    self._increase()
+                elif latency > baseline * self.latency_tolerance:
+                    self._baselines[key] = baseline + self.spike_smoothing * (
+                        latency - baseline
+                    )
+                    self._decrease(baseline)
+                else:
+                    self._baselines[key] = baseline + self.smoothing * (
+                        latency - baseline
+                    )
+                    self._increase()
+            self._condition.notify_all()
+
+    def _increase(self):
+        previous = self.limit
+        self._limit = min(self._limit + self.increase / self._limit, self.max_limit)
+        if self.limit != previous:
+            self._history.append((time.time(), self.limit))
+
+    def _decrease(self, baseline: Optional[float]):
+        now = time.monotonic()
+        if now - self._last_decrease < (baseline or 0):
+            # Already reacted to this congestion event
+            return
+        self._last_decrease = now
+        previous = self.limit
+        self._limit = max(self._limit * self.decrease_factor, self.min_limit)
+        if self.limit != previous:
+            self._history.append((time.time(), self.limit))
+
+    def as_dict(self) -> dict:
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "baseline_latencies": dict(self._baselines),
+                "history": list(self._history),
+            }
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Tuple, Union
+
+# A timeout as accepted by requests: a number or a (connect, read) tuple.
+Timeout = Optional[Union[float, Tuple[Optional[float], Optional[float]]]]
+
+# Default (connect, read) timeout in seconds.
+DEFAULT_TIMEOUT = (10, 120)
+
+
+class DeadlineExceededError(Exception):
+    """Raised when the time budget of an operation has been exhausted."""
+
+    def __init__(self):
+        super().__init__("The deadline of the operation has been exceeded.")
+
+
+class Deadline:
+    """A point in time by which an operation needs to be finished."""
+
+    def __init__(self, timeout: float):
+        """Initialize a Deadline.
+
+        Args:
+            timeout: The time budget in seconds, starting from now.
+        """
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        """The remaining time budget in seconds, never negative."""
+        return max(self.expires_at - time.monotonic(), 0)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self):
+        """Raise a DeadlineExceededError if the deadline has passed."""
+        if self.expired:
+            raise DeadlineExceededError
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar(
+    "mediahaven_deadline", default=None
+)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Return the deadline which applies to the current context, if any."""
+    return _current_deadline.get()
+
+
+@contextmanager
+def use_deadline(new_deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Apply the deadline to all the requests executed within the context.
+
+    When nested, the earliest deadline applies.
+
+    Args:
+        new_deadline: The deadline to apply. If None, the current one is kept.
+    """
+    active = current_deadline()
+    if new_deadline is not None and (
+        active is None or new_deadline.expires_at < active.expires_at
+    ):
+        active = new_deadline
+    token = _current_deadline.set(active)
+    try:
+        yield active
+    finally:
+        _current_deadline.reset(token)
+
+
+@contextmanager
+def deadline(timeout: float) -> Iterator[Optional[Deadline]]:
+    """Give all the requests executed within the context a time budget.
+
+    The budget covers the retries, token refreshes and subsequent page requests.
+
+    Example:
+        >>> with deadline(5):
+        ...     record = client.records.get(record_id)
+
+    Args:
+        timeout: The time budget in seconds.
+    """
+    with use_deadline(Deadline(timeout)) as active:
+        yield active
+
+
+def bound_timeout(timeout: Timeout) -> Timeout:
+    """Bound the timeout of a request to the remaining time of the deadline.
+
+    Args:
+        timeout: The timeout of the request.
+
+    Returns:
+        The timeout bounded by the current deadline, if any.
+
+    Raises:
+        DeadlineExceededError: If the current deadline has passed.
+    """
+    active = current_deadline()
+    if active is None:
+        return timeout
+    active.check()
+    remaining = active.remaining()
+    if timeout is None:
+        return remaining
+    if isinstance(timeout, tuple):
+        return tuple(
+            remaining if part is None else min(part, remaining) for part in timeout
+        )
+    return min(timeout, remaining)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import math
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+# HTTP methods which are safe to hedge.
+DEFAULT_HEDGE_METHODS = frozenset({"GET", "HEAD"})
+
+
+class HedgingPolicy:
+    """Policy to hedge slow idempotent requests.
+
+    If a request did not complete within the hedge delay, a second, identical
+    request is sent and the response which arrives first is used. The hedge delay
+    is the given percentile of the latencies of the recent requests, bounded by
+    `min_delay` and `max_delay`. Until `min_samples` latencies are known, the
+    `initial_delay` is used.
+
+    To limit the extra load on MediaHaven, at most `max_hedge_rate` of the recent
+    requests are hedged.
+
+    The requests are executed by a thread pool owned by the policy. The losing
+    request cannot be aborted once it has been sent, so its response is closed as
+    soon as it arrives to release the connection.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        initial_delay: float = 1.0,
+        min_delay: float = 0.01,
+        max_delay: Optional[float] = None,
+        max_hedge_rate: float = 0.1,
+        window_size: int = 1000,
+        min_samples: int = 20,
+        max_workers: int = 32,
+        methods: Iterable[str] = DEFAULT_HEDGE_METHODS,
+    ):
+        """Initialize a HedgingPolicy.
+
+        Args:
+            percentile: The percentile (0-100) of the latencies used as hedge delay.
+            initial_delay: The hedge delay until enough latencies are known.
+            min_delay: The minimum hedge delay in seconds.
+            max_delay: The optional maximum hedge delay in seconds.
+            max_hedge_rate: The maximum fraction (0-1) of requests to hedge.
+            window_size: The amount of recent requests to take into account.
+            min_samples: The minimum amount of latencies to calculate the delay.
+            max_workers: The size of the thread pool executing the requests.
+            methods: The HTTP methods which are hedged.
+        """
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_hedge_rate = max_hedge_rate
+        self.min_samples = min_samples
+        self.methods = frozenset(m.upper() for m in methods)
+        self._latencies: deque = deque(maxlen=window_size)
+        self._hedged: deque = deque(maxlen=window_size)
+        self._delay: Optional[float] = None
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="mediahaven-hedge"
+        )
+
+    def is_hedgeable_method(self, method: str) -> bool:
+        return method.upper() in self.methods
+
+    def record_latency(self, latency: float):
+        """Record the latency of a (non-hedge) request."""
+        with self._lock:
+            self._latencies.append(latency)
+            # The delay is recalculated lazily
+            self._delay = None
+
+    def hedge_delay(self) -> float:
+        """The time to wait for a response before hedging the request."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                delay = self.initial_delay
+            elif self._delay is not None:
+                delay = self._delay
+            else:
+                latencies = sorted(self._latencies)
+                index = math.ceil(self.percentile / 100 * len(latencies)) - 1
+                delay = self._delay = latencies[min(max(index, 0), len(latencies) - 1)]
+        delay = max(delay, self.min_delay)
+        if self.max_delay is not None:
+            delay = min(delay, self.max_delay)
+        return delay
+
+    def try_hedge(self) -> bool:
+        """Check if a request may be hedged within the maximum hedge rate.
+
+        Every call counts as a request which needed a hedge. The outcome is
+        recorded, so the call should only be made for requests that are slow.
+        """
+        with self._lock:
+            hedged = sum(self._hedged)
+            allowed = hedged + 1 <= self.max_hedge_rate * (len(self._hedged) + 1)
+            self._hedged.append(allowed)
+            return allowed
+
+    def record_request(self):
+        """Record a request which completed without needing a hedge."""
+        with self._lock:
+            self._hedged.append(False)
+
+    @property
+    def hedge_rate(self) -> float:
+        """The fraction of the recent requests which were hedged."""
+        with self._lock:
+            return sum(self._hedged) / len(self._hedged) if self._hedged else 0.0
+
+    def shutdown(self):
+        """Shut down the thread pool of the policy."""
+        self.executor.shutdown(wait=False)
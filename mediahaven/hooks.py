@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Emitted before the first attempt of a request.
+REQUEST_START = "request_start"
+# Emitted once a request is done, after the retries, with its status or error.
+REQUEST_END = "request_end"
+# Emitted once the result object of a response has been created.
+OBJECT_CREATED = "object_created"
+
+EVENTS = (REQUEST_START, REQUEST_END, OBJECT_CREATED)
+
+# The name of the attribute of a response which holds its RequestEvent.
+RESPONSE_ATTRIBUTE = "mediahaven_event"
+
+Hook = Callable[["RequestEvent"], None]
+
+_current_event: ContextVar[Optional["RequestEvent"]] = ContextVar(
+    "mediahaven_request_event", default=None
+)
+
+
+class RequestEvent:
+    """The structured lifecycle event of a request.
+
+    The same event is passed to all the hooks of a request, it is completed as the
+    request progresses. The phases are timed in seconds and don't overlap:
+
+    - "wait": waiting for the rate limiter and a free concurrency slot.
+    - "auth": getting an authorized session, including a token refresh.
+    - "ttfb": sending the request until the response headers were received, which
+      includes connecting and the time spent by MediaHaven.
+    - "download": reading the response body.
+    - "backoff": sleeping between the retries.
+    - "decode": decoding the JSON body.
+    - "build": constructing the lazy `DictView` of the decoded JSON body.
+
+    The phases of all the attempts of a request are summed. Of a hedged attempt,
+    only the phases of the request of which the result is used are recorded.
+
+    Attributes:
+        method: The HTTP method.
+        url: The request URL, without the query string.
+        resource: The name of the resource, e.g. "records".
+        path: The path of the resource, e.g. "records/1".
+        status_code: The status of the (last) response, if any.
+        error: The exception raised by the request, if any.
+        retries: The amount of retries.
+        request_bytes: The size of the request body.
+        response_bytes: The size of the decoded response body, if read.
+        wire_bytes: The size of the response body on the wire, if known.
+        phases: The duration of the phases, by name.
+        duration: The total duration of the request in seconds, once done.
+        object_type: The name of the class of the created result object.
+        results: The amount of results of the created result object.
+    """
+
+    def __init__(self, hooks: "Hooks", method: str, url: str, api_url: str = ""):
+        self.hooks = hooks
+        self.method = method
+        self.url = url.split("?", 1)[0]
+        self.path = self.url[len(api_url) :] if self.url.startswith(api_url) else ""
+        self.resource = self.path.split("/", 1)[0]
+        self.status_code: Optional[int] = None
+        self.error: Optional[BaseException] = None
+        self.retries = 0
+        self.request_bytes: Optional[int] = None
+        self.response_bytes: Optional[int] = None
+        self.wire_bytes: Optional[int] = None
+        self.phases: Dict[str, float] = {}
+        self.duration: Optional[float] = None
+        self.object_type: Optional[str] = None
+        self.results: Optional[int] = None
+        self._start = time.perf_counter()
+
+    def add_phase(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def concurrent_attempt(self) -> "RequestEvent":
+        """Return an event for the phases of one of the concurrent requests.
+
+        The requests of a hedged attempt run at the same time, so their phases
+        would overlap. Each request records them on its own event instead, of
+        which the phases are added with `add_phases` if its result is used.
+        """
+        attempt = RequestEvent(self.hooks, self.method, self.url)
+        attempt.path = self.path
+        attempt.resource = self.resource
+        attempt.retries = self.retries
+        return attempt
+
+    def add_phases(self, phases: Dict[str, float]):
+        for name, seconds in phases.items():
+            self.add_phase(name, seconds)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+
+    def as_dict(self) -> dict:
+        return {
+            "method": self.method,
+            "url": self.url,
+            "resource": self.resource,
+            "path": self.path,
+            "status_code": self.status_code,
+            "error": repr(self.error) if self.error is not None else None,
+            "retries": self.retries,
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "wire_bytes": self.wire_bytes,
+            "phases": dict(self.phases),
+            "duration": self.duration,
+            "object_type": self.object_type,
+            "results": self.results,
+        }
+
+
+class Hooks:
+    """Registry of the callbacks of the lifecycle events of a client's requests.
+
+    A callback is called with the RequestEvent in the thread (or task) of the
+    request, so it should be fast. An exception raised by a callback is logged and
+    does not affect the request. Without callbacks, no events are created.
+
+    Example:
+        >>> client.hooks.register(REQUEST_END, lambda event: print(event.as_dict()))
+    """
+
+    def __init__(self):
+        self._callbacks: Dict[str, List[Hook]] = {event: [] for event in EVENTS}
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return any(self._callbacks.values())
+
+    def register(self, event: str, callback: Hook) -> Hook:
+        """Call the callback on every event of the type.
+
+        Args:
+            event: One of REQUEST_START, REQUEST_END or OBJECT_CREATED.
+            callback: Called with the RequestEvent.
+
+        Returns:
+            The callback.
+
+        Raises:
+            ValueError: If the event type is unknown.
+        """
+        if event not in self._callbacks:
+            raise ValueError(f"Unknown event: {event}")
+        with self._lock:
+            # Copy on write, so emitting needs no lock
+            self._callbacks[event] = self._callbacks[event] + [callback]
+        return callback
+
+    def unregister(self, event: str, callback: Hook):
+        if event not in self._callbacks:
+            raise ValueError(f"Unknown event: {event}")
+        with self._lock:
+            self._callbacks[event] = [
+                registered
+                for registered in self._callbacks[event]
+                if registered is not callback
+            ]
+
+    def emit(self, event: str, request_event: "RequestEvent"):
+        for callback in self._callbacks[event]:
+            try:
+                callback(request_event)
+            except Exception:
+                logger.exception("The %s hook %r failed", event, callback)
+
+
+def current_request_event() -> Optional[RequestEvent]:
+    """Return the event of the request being executed in this context, if any."""
+    return _current_event.get()
+
+
+def record_phase(name: str, start: float):
+    """Add the time since start (a `time.perf_counter` value) to the current event."""
+    event = _current_event.get()
+    if event is not None:
+        event.add_phase(name, time.perf_counter() - start)
+
+
+@contextmanager
+def use_request_event(event: RequestEvent) -> Iterator[RequestEvent]:
+    """Record the phases of the requests executed within the context on the event."""
+    token = _current_event.set(event)
+    try:
+        yield event
+    finally:
+        _current_event.reset(token)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import inspect
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, Iterator, Optional, Tuple
+
+import httpx
+from requests.adapters import BaseAdapter
+from requests.exceptions import (
+    ConnectionError,
+    ConnectTimeout,
+    InvalidSchema,
+    ProxyError,
+    ReadTimeout,
+    RequestException,
+)
+from requests.models import PreparedRequest, Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, select_proxy
+
+from mediahaven.deadline import Timeout
+
+# The keyword of the proxy of an httpx client, "proxies" before httpx 0.26.
+_PROXY_KWARG = (
+    "proxy" if "proxy" in inspect.signature(httpx.Client).parameters else "proxies"
+)
+
+
+def to_httpx_timeout(timeout: Timeout) -> httpx.Timeout:
+    """Convert a requests style timeout to an httpx timeout.
+
+    Args:
+        timeout: A number or a (connect, read) tuple.
+
+    Returns:
+        The httpx timeout.
+    """
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+
+def to_requests_exception(
+    error: httpx.HTTPError, request: Optional[PreparedRequest] = None
+) -> RequestException:
+    """Convert an httpx error to the requests exception of the same failure.
+
+    The errors are mapped like requests maps the urllib3 errors, so the same
+    `RetryPolicy` retries the same failures of the sync and async clients.
+
+    Args:
+        error: The httpx error.
+        request: The request which failed, if any.
+
+    Returns:
+        The requests exception.
+    """
+    if isinstance(error, httpx.ConnectTimeout):
+        return ConnectTimeout(error, request=request)
+    if isinstance(error, httpx.TimeoutException):
+        return ReadTimeout(error, request=request)
+    if isinstance(error, httpx.ProxyError):
+        return ProxyError(error, request=request)
+    if isinstance(error, httpx.UnsupportedProtocol):
+        return InvalidSchema(error, request=request)
+    if isinstance(error, (httpx.NetworkError, httpx.RemoteProtocolError)):
+        return ConnectionError(error, request=request)
+    return RequestException(error, request=request)
+
+
+class _StreamedBody:
+    """File-like view on the body of a streamed httpx response.
+
+    The httpx errors while reading the body are raised as requests exceptions.
+    """
+
+    def __init__(self, response: httpx.Response):
+        self._response = response
+        self._chunks: Iterator[bytes] = response.iter_bytes()
+        self._buffer = b""
+
+    def _next_chunk(self) -> Optional[bytes]:
+        try:
+            return next(self._chunks, None)
+        except httpx.HTTPError as e:
+            raise to_requests_exception(e)
+
+    def read(self, amt: Optional[int] = None, **kwargs) -> bytes:
+        while amt is None or len(self._buffer) < amt:
+            chunk = self._next_chunk()
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if amt is None:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    def close(self):
+        self._response.close()
+
+    def release_conn(self):
+        self._response.close()
+
+
+class HTTP2Adapter(BaseAdapter):
+    """Requests transport adapter which sends the requests via httpx over HTTP/2.
+
+    Many requests are multiplexed over a few connections. When the server does
+    not negotiate HTTP/2 via ALPN, httpx falls back to HTTP/1.1. Mounting this
+    adapter on a session keeps the rest of the requests stack (OAuth2 signing,
+    retries, ...) unchanged.
+
+    Requires the "h2" package, available via the `mediahaven[http2]` extra.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = 10,
+        max_keepalive_connections: Optional[int] = 10,
+        **client_kwargs,
+    ):
+        """Initialize an HTTP2Adapter.
+
+        Args:
+            max_connections: The maximum amount of connections.
+            max_keepalive_connections: The maximum amount of idle connections.
+            **client_kwargs: Extra kwargs to create the `httpx.Client` with.
+        """
+        super().__init__()
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.client_kwargs = client_kwargs
+        # One client per TLS configuration as httpx configures it per client
+        self._clients: Dict[Tuple, httpx.Client] = {}
+        self._lock = threading.Lock()
+
+    def _get_client(self, verify, cert, proxy: Optional[str] = None) -> httpx.Client:
+        key = (verify, cert if not isinstance(cert, list) else tuple(cert), proxy)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                kwargs = dict(http2=True, limits=self.limits, verify=verify)
+                if cert:
+                    kwargs["cert"] = cert
+                if proxy:
+                    kwargs[_PROXY_KWARG] = proxy
+                kwargs.update(self.client_kwargs)
+                client = self._clients[key] = httpx.Client(**kwargs)
+            return client
+
+    def send(
+        self,
+        request: PreparedRequest,
+        stream: bool = False,
+        timeout: Timeout = None,
+        verify=True,
+        cert=None,
+        proxies=None,
+    ) -> Response:
+        """Send the request via httpx.
+
+        Like the default adapter, the body is not read yet, even without `stream`;
+        the session reads it. The `elapsed` time of the response is the time until
+        its headers were received.
+
+        Args:
+            request: The prepared request.
+            stream: If true, the session does not read the body.
+            timeout: The timeout of the request.
+            verify: Whether to verify the TLS certificate, or a CA bundle path.
+            cert: The client certificate.
+            proxies: The proxies by scheme or URL, as configured on the session.
+
+        Returns:
+            The requests response.
+        """
+        proxy = select_proxy(request.url, proxies) if proxies else None
+        client = self._get_client(verify, cert, proxy)
+        httpx_request = client.build_request(
+            request.method,
+            request.url,
+            headers=dict(request.headers),
+            content=request.body,
+            timeout=to_httpx_timeout(timeout),
+        )
+        start = time.perf_counter()
+        try:
+            httpx_response = client.send(httpx_request, stream=True)
+        except httpx.HTTPError as e:
+            raise to_requests_exception(e, request)
+        elapsed = timedelta(seconds=time.perf_counter() - start)
+        return self.build_response(request, httpx_response, elapsed)
+
+    def build_response(
+        self,
+        request: PreparedRequest,
+        httpx_response: httpx.Response,
+        elapsed: timedelta,
+    ) -> Response:
+        """Build a requests response from the streamed httpx response."""
+        response = Response()
+        response.status_code = httpx_response.status_code
+        response.reason = httpx_response.reason_phrase
+        response.headers = CaseInsensitiveDict(httpx_response.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = str(httpx_response.url)
+        response.request = request
+        response.connection = self
+        response.http_version = httpx_response.http_version
+        response.elapsed = elapsed
+        # httpx decodes the content encoding while the body is read
+        response.raw = _StreamedBody(httpx_response)
+        return response
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
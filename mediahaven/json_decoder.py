@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+# Decodes a JSON document from its UTF-8 encoded bytes.
+JSONDecoder = Callable[[bytes], Any]
+
+# The name of the attribute of a response which holds the JSON decoder of the
+# client which executed the request.
+DECODER_ATTRIBUTE = "mediahaven_json_decoder"
+
+
+def _stdlib_loads(data: bytes) -> Any:
+    return json.loads(data)
+
+
+if msgspec is not None:  # pragma: no branch
+    _msgspec_decoder = msgspec.json.Decoder()
+
+    def _msgspec_loads(data: bytes) -> Any:
+        try:
+            return _msgspec_decoder.decode(data)
+        except msgspec.DecodeError as e:
+            # Raise a ValueError, like the other decoders
+            raise ValueError(str(e)) from e
+
+
+# The decoders by name, the fastest first. None if the package is not installed.
+DECODERS: Dict[str, Optional[JSONDecoder]] = {
+    "orjson": orjson.loads if orjson is not None else None,
+    "msgspec": _msgspec_loads if msgspec is not None else None,
+    "ujson": ujson.loads if ujson is not None else None,
+    "json": _stdlib_loads,
+}
+
+
+def available_decoders() -> List[str]:
+    """Return the names of the installed decoders, the fastest first."""
+    return [name for name, decoder in DECODERS.items() if decoder is not None]
+
+
+def get_decoder(decoder: Union[str, JSONDecoder, None] = None) -> JSONDecoder:
+    """Return a JSON decoder.
+
+    Args:
+        decoder: The name of a decoder ("orjson", "msgspec", "ujson" or "json"), a
+            callable decoding the bytes of a JSON document or None for the fastest
+            installed decoder.
+
+    Returns:
+        The decoder. It raises a ValueError when decoding an invalid document.
+
+    Raises:
+        ValueError: If the decoder name is unknown.
+        ImportError: If the package of the decoder is not installed.
+    """
+    if decoder is None:
+        return DECODERS[available_decoders()[0]]
+    if callable(decoder):
+        return decoder
+    if decoder not in DECODERS:
+        raise ValueError(f"Unknown JSON decoder: {decoder}")
+    if DECODERS[decoder] is None:
+        raise ImportError(f"The {decoder} JSON decoder requires '{decoder}'")
+    return DECODERS[decoder]
+
+
+# The decoder of the responses which weren't executed by a client.
+DEFAULT_DECODER = get_decoder()
+
+
+def decode_json(response) -> Any:
+    """Decode the JSON body of a response from its bytes.
+
+    The decoder of the client which executed the request is used, else the
+    fastest installed one. The body is not decoded to text first.
+
+    Args:
+        response: A requests or httpx response.
+
+    Returns:
+        The decoded body.
+
+    Raises:
+        ValueError: If the body is not valid JSON.
+    """
+    decoder = getattr(response, DECODER_ATTRIBUTE, None) or DEFAULT_DECODER
+    return decoder(response.content)
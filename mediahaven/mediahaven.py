@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 from enum import Enum
-from typing import Optional, Union
+from typing import Dict, Optional, Union
 
 from requests import RequestException
-from requests.exceptions import JSONDecodeError
+from requests.adapters import BaseAdapter
+from requests.compat import json as complexjson
+from requests.exceptions import JSONDecodeError, Timeout
 from requests.models import Response
 from oauthlib.oauth2.rfc6749.errors import (
     TokenExpiredError,
@@ -14,14 +19,49 @@ from oauthlib.oauth2.rfc6749.errors import (
 )
 from urllib.parse import urlencode, urljoin, quote as urlquote
 
+from mediahaven.cache import ValidatorCache
+from mediahaven.circuit_breaker import CircuitBreaker, CircuitBreakerRegistry
+from mediahaven.compression import (
+    CompressionPolicy,
+    CompressionStats,
+    response_wire_size,
+)
+from mediahaven.concurrency import AIMDLimiter, latency_key
+from mediahaven.deadline import (
+    DEFAULT_TIMEOUT,
+    DeadlineExceededError,
+    Timeout as RequestTimeout,
+    bound_timeout,
+    current_deadline,
+)
+from mediahaven.hedging import HedgingPolicy
+from mediahaven.hooks import (
+    REQUEST_END,
+    REQUEST_START,
+    RESPONSE_ATTRIBUTE,
+    Hooks,
+    RequestEvent,
+    current_request_event,
+    record_phase,
+    use_request_event,
+)
+from mediahaven.json_decoder import DECODER_ATTRIBUTE, JSONDecoder, get_decoder
+from mediahaven.metrics import ClientMetrics
 from mediahaven.oauth2 import (
     NoTokenError,
     OAuth2Grant,
     RefreshTokenError,
 )
+from mediahaven.rate_limit import RateLimiter
+from mediahaven.retry import RetryPolicy, RetryStats
+from mediahaven.tracing import Tracing
 
 API_PATH = "/mediahaven-rest-api/v2/"
 
+# The name of the attribute of a response which tells the result object whether to
+# keep the raw body.
+RAW_RESPONSE_ATTRIBUTE = "mediahaven_keep_raw_response"
+
 
 class MediaHavenException(Exception):
     def __init__(self, message: str, status_code: int = None):
@@ -45,13 +85,113 @@ class ContentType(Enum):
 DEFAULT_ACCEPT_FORMAT = AcceptFormat.JSON
 
 
+def _close_response(future: Future):
+    """Close the response of a finished request, if any."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
 class MediaHavenClient:
     """The MediaHaven client class to communicate with MediaHaven."""
 
-    def __init__(self, mh_base_url: str, grant: OAuth2Grant):
+    def __init__(
+        self,
+        mh_base_url: str,
+        grant: OAuth2Grant,
+        timeout: RequestTimeout = DEFAULT_TIMEOUT,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        concurrency_limiter: Optional[AIMDLimiter] = None,
+        circuit_breakers: Optional[CircuitBreakerRegistry] = None,
+        hedging_policy: Optional[HedgingPolicy] = None,
+        http2: Optional[bool] = None,
+        request_compression: Optional[CompressionPolicy] = None,
+        validator_cache: Optional[ValidatorCache] = None,
+        transport: Optional[BaseAdapter] = None,
+        hooks: Optional[Hooks] = None,
+        metrics: Optional[ClientMetrics] = None,
+        tracing: Optional[Tracing] = None,
+        json_decoder: Union[str, JSONDecoder, None] = None,
+        keep_raw_response: bool = True,
+    ):
+        """Initialize a MediaHaven client.
+
+        Args:
+            mh_base_url: The base URL of MediaHaven.
+            grant: The OAuth2 grant used to authorize the requests.
+            timeout: The default timeout of a request in seconds, either a number
+                or a (connect, read) tuple. The timeout is bounded by the deadline
+                set via `mediahaven.deadline.deadline`, if any.
+            retry_policy: If set, retry the requests which failed due to a
+                transient error according to this policy.
+            rate_limiter: If set, every request (including retries) waits until it
+                is allowed by the rate limiter. The rate limiter can be shared
+                between clients to limit their combined rate.
+            concurrency_limiter: If set, limit the amount of in-flight requests
+                of all the threads using this client. The limit adapts to the
+                observed latency and overload responses.
+            circuit_breakers: If set, stop sending requests to MediaHaven while it
+                is degraded. The circuit is per base URL, or per resource name if
+                the registry is configured so.
+            hedging_policy: If set, hedge slow GET and HEAD requests by sending a
+                second, identical request and using the first response.
+            http2: If set, enable or disable HTTP/2 on the grant. Over HTTP/2, the
+                concurrent requests are multiplexed over a few connections. When
+                the server does not negotiate HTTP/2, HTTP/1.1 is used.
+            request_compression: If set, gzip the JSON and XML bodies of the POST
+                and PUT requests according to this policy. The responses are
+                always negotiated compressed, see `compression_stats` for the
+                savings.
+            validator_cache: If set, cache the GET responses with an ETag or
+                Last-Modified header and revalidate them with a conditional
+                request. On "304 Not Modified", the cached body is used.
+            transport: If set, mount this transport adapter for the base URL on the
+                session of the grant. Besides the default HTTP transport, an
+                `InMemoryTransport` answers the requests in-process and a
+                `RecordingTransport` / `ReplayTransport` records and replays them.
+            hooks: The callbacks of the lifecycle events of the requests, with
+                their phase timings. By default, an empty `Hooks` registry to
+                which callbacks can be registered.
+            metrics: The metrics of the requests, maintained via the hooks. By
+                default, the client has its own. Pass the same ClientMetrics to
+                several clients to aggregate their metrics.
+            tracing: If set, open OpenTelemetry spans for the operations of the
+                resources, with a child span per HTTP request and token refresh.
+                The trace context is propagated to MediaHaven in the headers.
+            json_decoder: The decoder of the JSON bodies of the result objects:
+                "orjson", "msgspec", "ujson", "json" (the standard library) or a
+                callable decoding bytes. By default, the fastest installed one.
+            keep_raw_response: If false, the result objects don't keep the raw
+                body of the response and their `raw_response` is None. Else the
+                body is kept as bytes and only decoded to text when accessed.
+        """
         self.grant = grant
+        if http2 is not None:
+            self.grant.use_http2(http2)
+        if transport is not None:
+            self.grant.mount(mh_base_url, transport)
         self.mh_base_url = mh_base_url
         self.mh_api_url = urljoin(self.mh_base_url, API_PATH)
+        self.timeout = timeout
+        self.retry_policy = retry_policy
+        self.retry_stats = RetryStats()
+        self.rate_limiter = rate_limiter
+        self.concurrency_limiter = concurrency_limiter
+        self.circuit_breakers = circuit_breakers
+        self.hedging_policy = hedging_policy
+        self.request_compression = request_compression
+        self.compression_stats = CompressionStats()
+        self.validator_cache = validator_cache
+        self.hooks = hooks if hooks is not None else Hooks()
+        self.metrics = metrics if metrics is not None else ClientMetrics()
+        self.metrics.attach(self.hooks)
+        self.metrics.track_grant(self.grant)
+        self.metrics.track_client(self)
+        self.tracing = tracing
+        self.json_decoder = get_decoder(json_decoder)
+        self.keep_raw_response = keep_raw_response
+        if tracing is not None and getattr(self.grant, "tracing", None) is None:
+            self.grant.tracing = tracing
 
     def _raise_mediahaven_exception_if_needed(self, response):
         """Raise a MediaHaven exception if the response status >= 400.
@@ -71,6 +211,345 @@ class MediaHavenClient:
             raise MediaHavenException(error_message, status_code=response.status_code)
 
     def _execute_request(self, **kwargs):
+        """Execute an authorized request and emit its lifecycle events.
+
+        If hooks are registered, a RequestEvent is emitted before and after the
+        request. The event is also set as the "mediahaven_event" attribute of the
+        response, so the created result object can add its phases to it. The JSON
+        decoder of the client is set as the "mediahaven_json_decoder" attribute, see
+        `_set_result_options`.
+
+        Args:
+            **kwargs: the kwargs to pass to the request.
+        Returns:
+            The response object.
+        Raises:
+            See `_retry_request`.
+        """
+        hooks = self.hooks
+        if not hooks:
+            response = self._retry_request(**kwargs)
+            if isinstance(response, Response):
+                self._set_result_options(response)
+            return response
+
+        event = RequestEvent(
+            hooks, kwargs.get("method", ""), kwargs.get("url", ""), self.mh_api_url
+        )
+        hooks.emit(REQUEST_START, event)
+        try:
+            with use_request_event(event):
+                response = self._retry_request(**kwargs)
+        except Exception as e:
+            event.error = e
+            event.finish()
+            hooks.emit(REQUEST_END, event)
+            raise
+        if isinstance(response, Response):
+            self._complete_event(event, response, kwargs.get("stream", False))
+            setattr(response, RESPONSE_ATTRIBUTE, event)
+            self._set_result_options(response)
+        event.finish()
+        hooks.emit(REQUEST_END, event)
+        return response
+
+    def _set_result_options(self, response):
+        """Set the options of the result object of the response on the response."""
+        setattr(response, DECODER_ATTRIBUTE, self.json_decoder)
+        setattr(response, RAW_RESPONSE_ATTRIBUTE, self.keep_raw_response)
+
+    def _complete_event(self, event: RequestEvent, response: Response, stream: bool):
+        """Add the status and the sizes of the response to the event."""
+        event.status_code = response.status_code
+        body = response.request.body if response.request is not None else None
+        if isinstance(body, (bytes, str)):
+            event.request_bytes = len(body)
+        if not stream:
+            event.response_bytes = len(response.content or b"")
+            event.wire_bytes = response_wire_size(response)
+
+    def _retry_request(self, **kwargs):
+        """Execute an authorized request, retrying it according to the retry policy.
+
+        Without a retry policy, the request is executed once. Otherwise, requests
+        failing with a retryable status or a connection error / timeout are retried
+        with a backoff as long as the policy and the deadline allow. The response of
+        the last attempt is returned, so a remaining error status is raised by the
+        caller.
+
+        Args:
+            **kwargs: the kwargs to pass to the request.
+        Returns:
+            The response object.
+        Raises:
+            NoTokenError: If a token has not yet been requested.
+            RefreshTokenError: If an error occurred when refreshing the token.
+            DeadlineExceededError: If the deadline of the request has passed.
+            CircuitOpenError: If the circuit of the request is open.
+            requests.RequestException: Reraise if a RequestException happen.
+        """
+        method = kwargs.get("method", "")
+        send_request = self._send_request
+        if self.hedging_policy is not None and self.hedging_policy.is_hedgeable_method(
+            method
+        ):
+            send_request = self._send_hedged_request
+
+        policy = self.retry_policy
+        if policy is None or not policy.is_retryable_method(method):
+            return send_request(**kwargs)
+
+        event = current_request_event()
+        start = time.monotonic()
+        retries = 0
+        while True:
+            response = None
+            try:
+                response = send_request(**kwargs)
+            except RequestException as e:
+                if not policy.is_retryable_exception(e):
+                    self.retry_stats.record(retries)
+                    raise
+                error = e
+            else:
+                if not policy.is_retryable_response(response):
+                    self.retry_stats.record(retries)
+                    return response
+
+            # The attempt failed with a transient error
+            retries += 1
+            delay = policy.get_backoff(retries, response)
+            elapsed = time.monotonic() - start
+            active_deadline = current_deadline()
+            if (
+                retries > policy.max_retries
+                or policy.exceeds_max_backoff(delay)
+                or (
+                    policy.total_timeout is not None
+                    and elapsed + delay > policy.total_timeout
+                )
+                or (
+                    active_deadline is not None and delay >= active_deadline.remaining()
+                )
+            ):
+                self.retry_stats.record(retries - 1, exhausted=True)
+                if response is None:
+                    raise error
+                return response
+
+            if response is not None:
+                # Release the connection back to the pool
+                response.close()
+            if event is not None:
+                event.retries = retries
+            backoff_start = time.perf_counter()
+            time.sleep(delay)
+            record_phase("backoff", backoff_start)
+
+    def _send_hedged_request(self, **kwargs):
+        """Execute one attempt of a request, hedging it if it is slow.
+
+        The request is executed in the thread pool of the hedging policy. If no
+        response arrived within the hedge delay and the hedge rate allows it, a
+        second request is sent. The first response is returned and the other one is
+        closed when it arrives. If the first request to complete failed, the result
+        of the other request is used. Only the phases of the request of which the
+        result is used are recorded on the event of the request.
+
+        Args:
+            **kwargs: the kwargs to pass to the request.
+        Returns:
+            The response object.
+        """
+        policy = self.hedging_policy
+        start = time.monotonic()
+        event = current_request_event()
+        # The event on which each request records its phases
+        attempts: Dict[Future, RequestEvent] = {}
+
+        def send_attempt(attempt: Optional[RequestEvent]):
+            if attempt is None:
+                return self._send_request(**kwargs)
+            with use_request_event(attempt):
+                return self._send_request(**kwargs)
+
+        def submit() -> Future:
+            # Run in a copy of the context so the deadline applies to the request
+            context = contextvars.copy_context()
+            attempt = event.concurrent_attempt() if event is not None else None
+            future = policy.executor.submit(context.run, send_attempt, attempt)
+            attempts[future] = attempt
+            return future
+
+        def result(future: Future):
+            try:
+                return future.result()
+            finally:
+                if event is not None:
+                    event.add_phases(attempts[future].phases)
+
+        def record_latency(future: Future):
+            if not future.cancelled() and future.exception() is None:
+                policy.record_latency(time.monotonic() - start)
+
+        primary = submit()
+        primary.add_done_callback(record_latency)
+        done, _ = wait([primary], timeout=policy.hedge_delay())
+        if done or not policy.try_hedge():
+            if done:
+                policy.record_request()
+            return result(primary)
+
+        hedge = submit()
+        done, _ = wait([primary, hedge], return_when=FIRST_COMPLETED)
+        winner = primary if primary in done else hedge
+        loser = hedge if winner is primary else primary
+        if winner.exception() is not None:
+            winner, loser = loser, winner
+
+        # The loser can't be aborted once sent, release its connection instead
+        if not loser.cancel():
+            loser.add_done_callback(_close_response)
+        return result(winner)
+
+    def _send_request(self, **kwargs):
+        """Execute one attempt of a request within the rate and concurrency limits.
+
+        If the circuit of the request is open, fail fast. The outcome of the
+        attempt is reported to the circuit breaker and the concurrency limiter,
+        which adapts the amount of in-flight requests accordingly.
+
+        Args:
+            **kwargs: the kwargs to pass to the request.
+        Returns:
+            The response object.
+        Raises:
+            CircuitOpenError: If the circuit of the request is open.
+            DeadlineExceededError: If the deadline passes while the request waits
+                for the rate or concurrency limiter.
+        """
+        breaker = self._get_circuit_breaker(kwargs.get("url", ""))
+        if breaker is not None:
+            breaker.before_request()
+
+        wait_start = time.perf_counter()
+        limiter = self.concurrency_limiter
+        try:
+            # Wait until the request is allowed by the rate limiter
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(kwargs.get("method", ""))
+
+            # Wait for a free slot
+            if limiter is not None:
+                limiter.acquire()
+        except DeadlineExceededError:
+            # The request is not sent, only release the probe slot, if any
+            if breaker is not None:
+                breaker.record(None)
+            raise
+        record_phase("wait", wait_start)
+
+        start = time.monotonic()
+        latency = None
+        overloaded = False
+        success = None
+        try:
+            if self.tracing is not None:
+                response = self._traced_request(**kwargs)
+            else:
+                response = self._authorized_request(**kwargs)
+        except Timeout:
+            latency = time.monotonic() - start
+            overloaded = True
+            success = False
+            raise
+        except RequestException:
+            success = False
+            raise
+        else:
+            latency = time.monotonic() - start
+            if isinstance(response, Response) and not kwargs.get("stream"):
+                self._record_response_size(response)
+            if limiter is not None:
+                overloaded = response.status_code in limiter.overload_statuses
+            if breaker is not None:
+                success = not breaker.is_failure_status(response.status_code)
+            return response
+        finally:
+            if limiter is not None:
+                limiter.release(latency, overloaded, self._latency_key(kwargs))
+            if breaker is not None:
+                breaker.record(success)
+
+    def _record_response_size(self, response: Response):
+        """Record the size of the response body, decoded and on the wire."""
+        size = len(response.content or b"")
+        wire_size = response_wire_size(response)
+        self.compression_stats.record_response(
+            size, size if wire_size is None else wire_size
+        )
+
+    def _compress_request_body(self, kwargs: dict) -> dict:
+        """Gzip the JSON or XML body of a request according to the compression policy.
+
+        Args:
+            kwargs: The kwargs of the request, with a "json" or "data" body.
+
+        Returns:
+            The kwargs of the request with the encoded body.
+        """
+        policy = self.request_compression
+        if policy is None:
+            return kwargs
+
+        kwargs = dict(kwargs)
+        headers = dict(kwargs.get("headers") or {})
+        if "json" in kwargs:
+            # Serialize like requests does
+            body = complexjson.dumps(kwargs.pop("json"), allow_nan=False)
+            headers["content-type"] = "application/json"
+        else:
+            body = kwargs["data"]
+        size = len(body.encode("utf-8") if isinstance(body, str) else body)
+        data, compressed = policy.encode(body)
+        self.compression_stats.record_request(size, len(data))
+        if compressed:
+            headers["Content-Encoding"] = "gzip"
+        kwargs.update(data=data, headers=headers)
+        return kwargs
+
+    def _latency_key(self, kwargs: dict) -> str:
+        """Return the key of the baseline latency of the request, see AIMDLimiter."""
+        url = kwargs.get("url", "")
+        path = url[len(self.mh_api_url) :] if url.startswith(self.mh_api_url) else ""
+        return latency_key(kwargs.get("method", ""), path)
+
+    def _get_circuit_breaker(self, url: str) -> Optional[CircuitBreaker]:
+        """Return the circuit breaker for the request URL, if enabled."""
+        if self.circuit_breakers is None:
+            return None
+        resource_name = ""
+        if url.startswith(self.mh_api_url):
+            resource_name = url[len(self.mh_api_url) :].split("/", 1)[0]
+        return self.circuit_breakers.get(self.mh_base_url, resource_name)
+
+    def _traced_request(self, **kwargs):
+        """Execute an authorized request within the client span of the request.
+
+        The trace context of the span is added to the request headers.
+        """
+        event = current_request_event()
+        with self.tracing.request_span(
+            kwargs.get("method", ""),
+            kwargs.get("url", ""),
+            event.retries if event is not None else 0,
+        ) as span:
+            kwargs["headers"] = self.tracing.inject(dict(kwargs.get("headers") or {}))
+            response = self._authorized_request(**kwargs)
+            self.tracing.set_response(span, response.status_code)
+            return response
+
+    def _authorized_request(self, **kwargs):
         """Execute an authorized request.
 
         In order to do so, a token needs to have been requested at this point.
@@ -86,34 +565,61 @@ class MediaHavenClient:
         Raises:
             NoTokenError: If a token has not yet been requested.
             RefreshTokenError: If an error occurred when refreshing the token.
+            DeadlineExceededError: If the deadline of the request has passed.
             requests.RequestException: Reraise if a RequestException happen.
         """
+        # Bound the timeout by the deadline, failing fast if it has passed
+        kwargs["timeout"] = bound_timeout(kwargs.get("timeout", self.timeout))
+
         # Get a session with a valid auth
+        auth_start = time.perf_counter()
         try:
             session = self.grant._get_session()
         except NoTokenError:
             raise
+        record_phase("auth", auth_start)
+
+        # Keep the token used for this request so concurrent refreshes are
+        # only executed once.
+        token = self.grant.token
 
         # Execute request
+        request_start = time.perf_counter()
         try:
             response = session.request(**kwargs)
         except TokenExpiredError:
             # There is a token but expired, try to refresh the token.
             try:
-                self.grant.refresh_token()
+                auth_start = time.perf_counter()
+                self.grant.refresh_token(token)
                 session = self.grant._get_session()
+                record_phase("auth", auth_start)
+                request_start = time.perf_counter()
                 response = session.request(**kwargs)
             except (InvalidGrantError, InvalidClientIdError) as e:
                 # Refresh token invalid / revoked
                 # Depending on grant, different action is needed
                 raise RefreshTokenError from e
             else:
+                self._record_transfer_phases(response, request_start)
                 return response
         except RequestException:
             raise
         else:
+            self._record_transfer_phases(response, request_start)
             return response
 
+    def _record_transfer_phases(self, response: Response, start: float):
+        """Split the duration of a request in the "ttfb" and "download" phases."""
+        event = current_request_event()
+        if event is None or not isinstance(response, Response):
+            return
+        duration = time.perf_counter() - start
+        # The elapsed time of requests stops once the headers are parsed
+        ttfb = min(response.elapsed.total_seconds(), duration)
+        event.add_phase("ttfb", ttfb)
+        event.add_phase("download", duration - ttfb)
+
     def _build_headers(self, accept_format: AcceptFormat = None) -> dict:
         headers = {}
         if accept_format:
@@ -169,13 +675,19 @@ class MediaHavenClient:
         return int(response.headers["Result-Count"])
 
     def _get(
-        self, resource_path: str, accept_format: AcceptFormat, **query_params
+        self,
+        resource_path: str,
+        accept_format: AcceptFormat,
+        stream: bool = False,
+        **query_params,
     ) -> Response:
         """Execute a GET request and return the HTTP response.
 
         Args:
             resource_path: The path of the resource.
             accept_format: The "Accept" request header.
+            stream: If true, don't read the body of a successful response yet. The
+                response is not cached then.
             **query_params: The query string parameters.
 
         Returns:
@@ -193,10 +705,29 @@ class MediaHavenClient:
         # Construct the request headers
         headers = self._build_headers(accept_format)
 
+        # Revalidate the cached response, if any
+        cache = self.validator_cache if not stream else None
+        cached = None
+        if cache is not None:
+            cache_key = (f"{resource_url}?{params or ''}", headers.get("Accept", ""))
+            cached = cache.get(cache_key)
+            if cached is not None:
+                headers.update(cached.conditional_headers())
+
         # Execute the request
-        response = self._execute_request(
-            **dict(method="GET", url=resource_url, headers=headers, params=params)
-        )
+        kwargs = dict(method="GET", url=resource_url, headers=headers, params=params)
+        if stream:
+            kwargs["stream"] = True
+        response = self._execute_request(**kwargs)
+
+        if cache is not None:
+            if response.status_code == 304 and cached is not None:
+                cache.record(hit=True)
+                response.close()
+                response = cached.to_response(response)
+            elif response.status_code == 200:
+                cache.record(hit=False)
+                cache.store(cache_key, response)
 
         # Raise exception if the response state code >= 400
         self._raise_mediahaven_exception_if_needed(response)
@@ -279,13 +810,17 @@ class MediaHavenClient:
         if json:
             # Execute the request
             response = self._execute_request(
-                **dict(method="POST", url=resource_url, json=json)
+                **self._compress_request_body(
+                    dict(method="POST", url=resource_url, json=json)
+                )
             )
         elif xml:
             headers = {"content-type": "application/xml"}
             # Execute the request
             response = self._execute_request(
-                **dict(method="POST", url=resource_url, headers=headers, data=xml)
+                **self._compress_request_body(
+                    dict(method="POST", url=resource_url, headers=headers, data=xml)
+                )
             )
         else:
             # Execute the request - Form
@@ -338,13 +873,17 @@ class MediaHavenClient:
         if json:
             # Execute the request
             response = self._execute_request(
-                **dict(method="PUT", url=resource_url, json=json)
+                **self._compress_request_body(
+                    dict(method="PUT", url=resource_url, json=json)
+                )
             )
         elif xml:
             headers = {"content-type": "application/xml"}
             # Execute the request
             response = self._execute_request(
-                **dict(method="PUT", url=resource_url, headers=headers, data=xml)
+                **self._compress_request_body(
+                    dict(method="PUT", url=resource_url, headers=headers, data=xml)
+                )
             )
 
         # Raise appropriate exception if HTTPError occurred
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import weakref
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from mediahaven.hooks import OBJECT_CREATED, REQUEST_END, Hooks, RequestEvent
+
+# The default buckets of the latency histograms, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# The default buckets of the size histograms, in bytes.
+SIZE_BUCKETS = tuple(256 * 4**i for i in range(10))
+
+Labels = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """A monotonically increasing value per combination of label values."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Labels = (), amount: float = 1):
+        """Increase the value of the labels, given in the order of the labelnames."""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        """Return the (suffix, labels, value) samples of the counter."""
+        with self._lock:
+            return [("", labels, value) for labels, value in self._values.items()]
+
+    def snapshot(self) -> list:
+        return [
+            {"labels": dict(zip(self.labelnames, labels)), "value": value}
+            for _, labels, value in self.samples()
+        ]
+
+
+class Gauge(Counter):
+    """A value which can go up and down per combination of label values."""
+
+    type = "gauge"
+
+    def set(self, labels: Labels = (), value: float = 0):
+        """Set the value of the labels, given in the order of the labelnames."""
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram:
+    """The distribution of observed values per combination of label values."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per labels: the (non-cumulative) count per bucket, the +Inf one last,
+        # and the sum of the observed values
+        self._counts: Dict[Labels, List[int]] = {}
+        self._sums: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Labels = ()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(labels)
+            if counts is None:
+                counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+                self._sums[labels] = 0.0
+            counts[index] += 1
+            self._sums[labels] += value
+
+    def count(self, labels: Labels = ()) -> int:
+        return sum(self._counts.get(labels, ()))
+
+    def _cumulative(self, labels: Labels) -> Tuple[List[int], float]:
+        total = 0
+        cumulative = []
+        for count in self._counts[labels]:
+            total += count
+            cumulative.append(total)
+        return cumulative, self._sums[labels]
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        """Return the (suffix, labels, value) samples, "le" is the last label."""
+        samples = []
+        with self._lock:
+            for labels in self._counts:
+                cumulative, total = self._cumulative(labels)
+                bounds = self.buckets + (float("inf"),)
+                for bound, count in zip(bounds, cumulative):
+                    samples.append(("_bucket", labels + (_format_value(bound),), count))
+                samples.append(("_sum", labels, total))
+                samples.append(("_count", labels, cumulative[-1]))
+        return samples
+
+    def snapshot(self) -> list:
+        snapshot = []
+        with self._lock:
+            for labels in self._counts:
+                cumulative, total = self._cumulative(labels)
+                snapshot.append(
+                    {
+                        "labels": dict(zip(self.labelnames, labels)),
+                        "count": cumulative[-1],
+                        "sum": total,
+                        "buckets": dict(zip(self.buckets, cumulative)),
+                    }
+                )
+        return snapshot
+
+
+class MetricsRegistry:
+    """A set of metrics, exportable in the Prometheus text format or as a dict.
+
+    Besides the metrics, collectors can be registered. A collector is called on
+    export and returns the metrics of which the value is only known then.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Callable[[], Iterable[Counter]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} is already registered")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        """Return the counter with the name, registering it if new."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        """Return the gauge with the name, registering it if new."""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Return the histogram with the name, registering it if new."""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[Counter]]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def collect(self) -> list:
+        """Return all the metrics, the ones of the collectors included."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for collector in collectors:
+            metrics.extend(collector())
+        return metrics
+
+    def to_prometheus(self) -> str:
+        """Return the metrics in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for metric in self.collect():
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, value in metric.samples():
+                names = metric.labelnames
+                if suffix == "_bucket":
+                    names += ("le",)
+                lines.append(
+                    f"{metric.name}{suffix}{_format_labels(names, labels)} "
+                    f"{_format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """Return the values of the metrics by name, e.g. for a dashboard."""
+        return {metric.name: metric.snapshot() for metric in self.collect()}
+
+
+class ClientMetrics:
+    """The metrics of the requests of MediaHaven clients.
+
+    The metrics are maintained via the hooks of the clients, which use them by
+    default. A ClientMetrics can be shared by several clients.
+
+    Attributes:
+        registry: The registry of the metrics.
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        """Initialize ClientMetrics.
+
+        Args:
+            registry: The registry to register the metrics in, by default a new
+                one. Other metrics can be registered in the same registry.
+        """
+        self.registry = registry if registry is not None else MetricsRegistry()
+        request_labels = ("resource", "method")
+        self.requests = self.registry.counter(
+            "mediahaven_requests_total",
+            "The amount of requests by status, or exception if failed.",
+            request_labels + ("status",),
+        )
+        self.errors = self.registry.counter(
+            "mediahaven_request_errors_total",
+            "The amount of requests which failed or had an error status.",
+            request_labels + ("status",),
+        )
+        self.retries = self.registry.counter(
+            "mediahaven_request_retries_total",
+            "The amount of retried request attempts.",
+            request_labels,
+        )
+        self.latency = self.registry.histogram(
+            "mediahaven_request_duration_seconds",
+            "The duration of the requests, including the retries.",
+            request_labels,
+            LATENCY_BUCKETS,
+        )
+        self.response_size = self.registry.histogram(
+            "mediahaven_response_size_bytes",
+            "The size of the decoded response bodies.",
+            request_labels,
+            SIZE_BUCKETS,
+        )
+        self.phases = self.registry.counter(
+            "mediahaven_request_phase_seconds_total",
+            "The time spent per phase of the requests.",
+            ("resource", "phase"),
+        )
+        self.pages = self.registry.counter(
+            "mediahaven_pages_fetched_total",
+            "The amount of fetched pages of search results.",
+            ("resource",),
+        )
+        self.records_yielded = self.registry.counter(
+            "mediahaven_records_yielded_total",
+            "The amount of results yielded by the page generators.",
+            ("resource",),
+        )
+        # Weakly referenced, so the metrics shared by clients do not keep them
+        # and their sessions alive
+        self._grants: "weakref.WeakSet" = weakref.WeakSet()
+        self._clients: "weakref.WeakSet" = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self.registry.register_collector(self._collect_token_refreshes)
+        self.registry.register_collector(self._collect_concurrency)
+        self.registry.register_collector(self._collect_compression)
+
+    def attach(self, hooks: Hooks):
+        """Maintain the metrics with the events of the hooks of a client."""
+        hooks.register(REQUEST_END, self._on_request_end)
+        hooks.register(OBJECT_CREATED, self._on_object_created)
+
+    def track_grant(self, grant):
+        """Count the token refreshes of the grant, as long as it is in use."""
+        with self._lock:
+            self._grants.add(grant)
+
+    def track_client(self, client):
+        """Export the concurrency limiter and the compression savings of the client.
+
+        The client is exported as long as it is in use.
+        """
+        with self._lock:
+            self._clients.add(client)
+
+    def record_yielded(self, resource: str, count: int):
+        if count:
+            self.records_yielded.inc((resource,), count)
+
+    def _on_request_end(self, event: RequestEvent):
+        labels = (event.resource, event.method)
+        if event.error is not None:
+            status = type(event.error).__name__
+        else:
+            status = str(event.status_code)
+        self.requests.inc(labels + (status,))
+        if event.error is not None or (event.status_code or 0) >= 400:
+            self.errors.inc(labels + (status,))
+        if event.retries:
+            self.retries.inc(labels, event.retries)
+        self.latency.observe(event.duration, labels)
+        if event.response_bytes is not None:
+            self.response_size.observe(event.response_bytes, labels)
+        for phase, seconds in event.phases.items():
+            self.phases.inc((event.resource, phase), seconds)
+
+    def _on_object_created(self, event: RequestEvent):
+        for phase in ("decode", "build"):
+            if phase in event.phases:
+                self.phases.inc((event.resource, phase), event.phases[phase])
+        if event.object_type and "Page" in event.object_type:
+            self.pages.inc((event.resource,))
+
+    def _collect_token_refreshes(self) -> List[Counter]:
+        counter = Counter(
+            "mediahaven_token_refreshes_total",
+            "The amount of refreshes of the access token.",
+        )
+        with self._lock:
+            grants = list(self._grants)
+        counter.inc((), sum(getattr(grant, "refresh_count", 0) for grant in grants))
+        return [counter]
+
+    def _collect_concurrency(self) -> List[Gauge]:
+        with self._lock:
+            clients = list(self._clients)
+        limiters = [
+            client.concurrency_limiter
+            for client in clients
+            if getattr(client, "concurrency_limiter", None) is not None
+        ]
+        if not limiters:
+            return []
+        # Summed over the limiters of the clients sharing the metrics
+        limit = Gauge(
+            "mediahaven_concurrency_limit",
+            "The current limit on the amount of in-flight requests.",
+        )
+        limit.set((), sum(limiter.limit for limiter in limiters))
+        in_flight = Gauge(
+            "mediahaven_requests_in_flight",
+            "The current amount of in-flight requests.",
+        )
+        in_flight.set((), sum(limiter.in_flight for limiter in limiters))
+        return [limit, in_flight]
+
+    def _collect_compression(self) -> list:
+        with self._lock:
+            clients = list(self._clients)
+        stats = [
+            client.compression_stats.as_dict()
+            for client in clients
+            if getattr(client, "compression_stats", None) is not None
+        ]
+        if not stats:
+            return []
+        saved = Counter(
+            "mediahaven_compression_saved_bytes_total",
+            "The amount of body bytes which did not need to be transferred.",
+            ("direction",),
+        )
+        ratio = Gauge(
+            "mediahaven_compression_ratio",
+            "The size of the bodies divided by their size on the wire.",
+            ("direction",),
+        )
+        for direction in ("request", "response"):
+            size = sum(stat[f"{direction}_bytes"] for stat in stats)
+            wire_size = sum(stat[f"{direction}_wire_bytes"] for stat in stats)
+            saved.inc((direction,), size - wire_size)
+            if wire_size:
+                ratio.set((direction,), size / wire_size)
+        return [saved, ratio]
+
+    def to_prometheus(self) -> str:
+        return self.registry.to_prometheus()
+
+    def snapshot(self) -> dict:
+        return self.registry.snapshot()
@@ -0,0 +1,596 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import copy
+import email.parser
+import email.policy
+import fnmatch
+import gzip
+import json
+import re
+import secrets
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from email.utils import formatdate
+from itertools import chain, islice
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from mediahaven.mediahaven import API_PATH
+
+# Page size of a search without "nrOfResults".
+DEFAULT_PAGE_SIZE = 25
+# Maximum page size of a search.
+MAX_PAGE_SIZE = 10000
+
+# A search term: an optional "+" or "-" followed by a (field:value) group or word.
+_TERM = re.compile(r'([+-]?)(?:\(((?:[^()"]|"[^"]*")*)\)|((?:[^\s"]|"[^"]*")+))')
+
+# The response status, headers and body.
+FakeResponse = Tuple[int, Dict[str, str], bytes]
+
+
+def _json_response(status: int, payload, headers: dict = None) -> FakeResponse:
+    body = json.dumps(payload).encode("utf-8")
+    return (
+        status,
+        {"Content-Type": "application/json", **(headers or {})},
+        body,
+    )
+
+
+def _xml_response(
+    status: int, name: str, payload, headers: dict = None
+) -> FakeResponse:
+    body = ET.tostring(_to_xml(name, payload), encoding="utf-8")
+    return (
+        status,
+        {"Content-Type": "application/xml", **(headers or {})},
+        body,
+    )
+
+
+def _error(status: int, message: str) -> FakeResponse:
+    return _json_response(status, {"status": status, "message": message})
+
+
+def _to_xml(name: str, value) -> ET.Element:
+    element = ET.Element(name)
+    if isinstance(value, dict):
+        for key, child in value.items():
+            element.append(_to_xml(key, child))
+    elif isinstance(value, list):
+        for child in value:
+            element.append(_to_xml(name[:-1] if name.endswith("s") else name, child))
+    elif value is not None:
+        element.text = str(value).lower() if isinstance(value, bool) else str(value)
+    return element
+
+
+def _from_xml(element: ET.Element):
+    """Convert an XML element to a dict, ignoring the namespaces."""
+    children = list(element)
+    if not children:
+        return element.text
+    result: dict = {}
+    for child in children:
+        result[child.tag.rsplit("}", 1)[-1]] = _from_xml(child)
+    return result
+
+
+def _merge(target: dict, update: dict):
+    """Recursively merge the update into the target."""
+    for key, value in update.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = copy.deepcopy(value)
+
+
+def _values(value, field: Optional[str] = None) -> Iterator[str]:
+    """Yield the scalar values of a record, only of the given field if set."""
+    if isinstance(value, dict):
+        for key, child in value.items():
+            if field is None or key.lower() != field:
+                yield from _values(child, field)
+            else:
+                yield from _values(child)
+    elif isinstance(value, list):
+        for child in value:
+            yield from _values(child, field)
+    elif field is None and value is not None:
+        yield str(value).lower()
+
+
+def _parse_form(content_type: str, body: bytes) -> Dict[str, str]:
+    """Parse an URL encoded or multipart form into its text fields."""
+    if content_type.startswith("multipart/form-data"):
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body
+        )
+        form = {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            form[name] = part.get_content()
+            if isinstance(form[name], bytes):
+                form[name] = form[name].decode("utf-8")
+        return form
+    return {
+        key: values[-1]
+        for key, values in parse_qs(
+            body.decode("utf-8"), keep_blank_values=True
+        ).items()
+    }
+
+
+class FakeMediaHaven:
+    """In-memory fake of the MediaHaven v2 REST API.
+
+    It answers the requests of the client without any network I/O, e.g. via a
+    `mediahaven.transport.InMemoryTransport`. Supported are the token requests,
+    the searches (with paging and HEAD "Result-Count") and gets of records, field
+    definitions and organisations and the writes of records.
+
+    The search query supports a subset of the MediaHaven syntax: "+" / "-" prefixed
+    "(field:value)" groups, where a quoted value matches any of its words and "*"
+    is a wildcard, and free text words.
+
+    Besides the records added to the fake, a lazy dataset can be passed, e.g. a
+    `mediahaven.simulator.dataset.SyntheticDataset`. Its records are only generated
+    when requested and copied into the fake when written. Searches matching all
+    records are paged without generating the skipped records. Other searches scan
+    the whole dataset, unless its `select(query)` method returns the indexes of the
+    candidate records.
+
+    Example:
+        >>> fake = FakeMediaHaven(records=[{"Dynamic": {"PID": "pid1"}}])
+        >>> grant = ROPCGrant(url, "id", "secret", transport=fake.transport())
+    """
+
+    def __init__(
+        self,
+        records: Iterable[dict] = (),
+        field_definitions: Iterable[dict] = (),
+        organisations: Iterable[dict] = (),
+        token_lifetime: float = 3600,
+        dataset: Optional[Sequence[dict]] = None,
+    ):
+        """Initialize a FakeMediaHaven.
+
+        Args:
+            records: The initial records.
+            field_definitions: The field definitions, with a "FlatKey".
+            organisations: The organisations, with an "Id" and "ExternalId".
+            token_lifetime: The lifetime of the access tokens in seconds.
+            dataset: An optional lazy sequence of records which also has an
+                `index_of(record_id)` method returning the index of a record ID.
+        """
+        self.token_lifetime = token_lifetime
+        self.dataset = dataset
+        # The added and the written records, by RecordId
+        self.records: Dict[str, dict] = {}
+        # The IDs of the added records which are not part of the dataset
+        self._added: List[str] = []
+        self._deleted: set = set()
+        self.field_definitions: List[dict] = list(field_definitions)
+        self.organisations: List[dict] = list(organisations)
+        self.request_count = 0
+        self._versions: Dict[str, int] = {}
+        # Access token -> expiry timestamp and the valid refresh tokens
+        self._access_tokens: Dict[str, float] = {}
+        self._refresh_tokens: set = set()
+        self._lock = threading.RLock()
+        for record in records:
+            self.add_record(record)
+
+    def transport(self):
+        """Return a transport answering the requests with this fake."""
+        from mediahaven.transport import InMemoryTransport
+
+        return InMemoryTransport(self)
+
+    def add_record(self, record: dict) -> dict:
+        """Add a record, generating its IDs if missing.
+
+        Returns:
+            The stored record.
+        """
+        record = copy.deepcopy(record)
+        internal = record.setdefault("Internal", {})
+        record_id = internal.setdefault("RecordId", uuid.uuid4().hex)
+        internal.setdefault("MediaObjectId", record_id)
+        internal.setdefault("IsInIngestSpace", False)
+        internal.setdefault("IsDeleted", False)
+        record.setdefault("Descriptive", {})
+        record.setdefault("Dynamic", {})
+        with self._lock:
+            if record_id not in self.records and self._dataset_index(record_id) is None:
+                self._added.append(record_id)
+            self.records[record_id] = record
+            if internal["IsDeleted"]:
+                self._deleted.add(record_id)
+            self._touch(record_id)
+        return record
+
+    def _dataset_index(self, record_id: str) -> Optional[int]:
+        if self.dataset is None:
+            return None
+        return self.dataset.index_of(record_id)
+
+    def _touch(self, record_id: str):
+        """Mark a (written) record as modified."""
+        self._versions[record_id] = self._versions.get(record_id, 1) + 1
+        administrative = self.records[record_id].setdefault("Administrative", {})
+        administrative["LastModifiedDate"] = formatdate(usegmt=True)
+
+    def __call__(
+        self,
+        method: str,
+        url: str,
+        headers: Mapping[str, str],
+        body: Optional[bytes],
+    ) -> FakeResponse:
+        """Answer a request.
+
+        Args:
+            method: The HTTP method.
+            url: The request URL.
+            headers: The request headers.
+            body: The request body.
+
+        Returns:
+            The status, the headers and the body of the response.
+        """
+        with self._lock:
+            self.request_count += 1
+        parts = urlsplit(url)
+        path = unquote(parts.path)
+        query = {
+            key: values[-1]
+            for key, values in parse_qs(parts.query, keep_blank_values=True).items()
+        }
+        headers = {key.lower(): value for key, value in headers.items()}
+        body = body or b""
+
+        if path == "/auth/ropc.php" and method == "POST":
+            return self._password_grant(headers, body)
+        if path == "/auth/oauth2/token" and method == "POST":
+            return self._refresh_grant(headers, body)
+        if not path.startswith(API_PATH):
+            return _error(404, f"Unknown path {path}")
+        if not self._is_authorized(headers.get("authorization", "")):
+            return _error(401, "Invalid or expired access token")
+
+        resource, _, item = path[len(API_PATH) :].partition("/")
+        xml = "xml" in headers.get("accept", "")
+        if resource == "records":
+            return self._records(method, item, query, headers, body)
+        if resource == "field-definitions" and method in ("GET", "HEAD"):
+            return self._lookup(
+                method, self.field_definitions, item, query, ("FlatKey", "Id"), xml
+            )
+        if resource == "organisations" and method in ("GET", "HEAD"):
+            if item.startswith("ExternalId:"):
+                return self._lookup(
+                    method,
+                    self.organisations,
+                    item[len("ExternalId:") :],
+                    query,
+                    ("ExternalId",),
+                    xml,
+                )
+            return self._lookup(method, self.organisations, item, query, ("Id",), xml)
+        return _error(404, f"Unknown resource {resource}")
+
+    # Authorization
+
+    def _issue_token(self) -> FakeResponse:
+        access_token = secrets.token_hex(16)
+        refresh_token = secrets.token_hex(16)
+        with self._lock:
+            self._access_tokens[access_token] = time.time() + self.token_lifetime
+            self._refresh_tokens.add(refresh_token)
+        return _json_response(
+            200,
+            {
+                "access_token": access_token,
+                "refresh_token": refresh_token,
+                "token_type": "Bearer",
+                "expires_in": self.token_lifetime,
+            },
+        )
+
+    def _password_grant(self, headers: dict, body: bytes) -> FakeResponse:
+        form = _parse_form(headers.get("content-type", ""), body)
+        if form.get("grant_type") != "password" or not form.get("username"):
+            return _json_response(400, {"error": "invalid_request"})
+        return self._issue_token()
+
+    def _refresh_grant(self, headers: dict, body: bytes) -> FakeResponse:
+        form = _parse_form(headers.get("content-type", ""), body)
+        with self._lock:
+            refresh_token = form.get("refresh_token")
+            if refresh_token not in self._refresh_tokens:
+                return _json_response(400, {"error": "invalid_grant"})
+            self._refresh_tokens.discard(refresh_token)
+        return self._issue_token()
+
+    def _is_authorized(self, authorization: str) -> bool:
+        scheme, _, access_token = authorization.partition(" ")
+        if scheme.lower() != "bearer":
+            return False
+        with self._lock:
+            expires_at = self._access_tokens.get(access_token)
+        return expires_at is not None and time.time() < expires_at
+
+    # Searches
+
+    @staticmethod
+    def matches(item: dict, query: str) -> bool:
+        """Check if the item matches the (subset of the) MediaHaven query."""
+        for sign, group, word in _TERM.findall(query or "*"):
+            term = (group or word).strip()
+            field, _, value = term.rpartition(":")
+            if not field or " " in field or field.startswith('"'):
+                field, value = "", term
+            value = value.strip()
+            if value.startswith('"') and value.endswith('"'):
+                alternatives = value[1:-1].lower().split()
+            else:
+                alternatives = [value.lower()]
+            values = list(_values(item, field.lower() or None))
+            if field:
+                found = any(
+                    fnmatch.fnmatchcase(candidate, alternative)
+                    for alternative in alternatives
+                    for candidate in values
+                )
+            else:
+                found = value == "*" or any(
+                    alternative.strip("*") in candidate
+                    for alternative in alternatives
+                    for candidate in values
+                )
+            if found == (sign == "-"):
+                return False
+        return True
+
+    def _page(
+        self,
+        method: str,
+        query: dict,
+        items: Iterable[dict],
+        total: Optional[int] = None,
+        xml: bool = False,
+    ) -> FakeResponse:
+        """Answer a search with a page of the matching items.
+
+        Args:
+            method: The HTTP method, "HEAD" only returns the "Result-Count".
+            query: The query parameters with the optional paging parameters.
+            items: The matching items. If the total is known, the items start at
+                the requested start index.
+            total: The total amount of matching items, if known.
+            xml: If true, answer with an XML page. Its "Results" element holds a
+                "Result" element per item.
+        """
+        try:
+            start = max(int(query.get("startIndex", 0)), 0)
+            size = int(query.get("nrOfResults", DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return _error(400, "Invalid paging parameters")
+        if total is None:
+            items = list(items)
+            total = len(items)
+            items = items[start:]
+        if method == "HEAD":
+            return 200, {"Result-Count": str(total)}, b""
+        if not 0 <= size <= MAX_PAGE_SIZE:
+            return _error(400, f"nrOfResults should be at most {MAX_PAGE_SIZE}")
+        results = list(islice(items, size))
+        page = {
+            "NrOfResults": len(results),
+            "StartIndex": start,
+            "TotalNrOfResults": total,
+            "Results": results,
+        }
+        if xml:
+            return _xml_response(200, "Response", page)
+        return _json_response(200, page)
+
+    def _lookup(
+        self,
+        method: str,
+        items: List[dict],
+        key: str,
+        query: dict,
+        fields: Tuple[str, ...],
+        xml: bool = False,
+    ) -> FakeResponse:
+        if not key:
+            matches = (item for item in items if self.matches(item, query.get("q")))
+            return self._page(method, query, matches, xml=xml)
+        for item in items:
+            if any(str(item.get(field)) == key for field in fields):
+                return _json_response(200, item)
+        return _error(404, f"{key} not found")
+
+    # Records
+
+    def _find_record(self, record_id: str) -> Optional[dict]:
+        record = self.records.get(record_id)
+        if record is not None:
+            return record
+        index = self._dataset_index(record_id)
+        if index is not None:
+            return self.dataset[index]
+        for record in self.records.values():
+            internal = record["Internal"]
+            if record_id in (internal.get("MediaObjectId"), internal.get("FragmentId")):
+                return record
+        return None
+
+    def _iter_records(self, start: int = 0) -> Iterator[dict]:
+        """Iterate over all the records from the start index, deleted ones included."""
+        size = len(self.dataset) if self.dataset is not None else 0
+        for index in range(start, size):
+            record = self.dataset[index]
+            yield self.records.get(record["Internal"]["RecordId"], record)
+        for record_id in self._added[max(start - size, 0) :]:
+            yield self.records[record_id]
+
+    def _position(self, record_id: str) -> int:
+        """Return the position of a record in the iteration of `_iter_records`."""
+        index = self._dataset_index(record_id)
+        if index is not None:
+            return index
+        size = len(self.dataset) if self.dataset is not None else 0
+        return size + self._added.index(record_id)
+
+    def _search_records(
+        self, method: str, query: dict, xml: bool = False
+    ) -> FakeResponse:
+        q = query.get("q")
+        if (q or "*").strip() == "*":
+            # All the records but the deleted ones match, so skip to the start index
+            size = len(self.dataset) if self.dataset is not None else 0
+            try:
+                start = max(int(query.get("startIndex", 0)), 0)
+            except ValueError:
+                return _error(400, "Invalid paging parameters")
+            for position in sorted(map(self._position, self._deleted)):
+                if position > start:
+                    break
+                start += 1
+            total = size + len(self._added) - len(self._deleted)
+            records = (
+                record
+                for record in self._iter_records(start)
+                if not record["Internal"]["IsDeleted"]
+            )
+            return self._page(method, query, records, total, xml)
+        records = self._iter_records()
+        select = getattr(self.dataset, "select", None)
+        indexes = select(q) if select is not None else None
+        if indexes is not None:
+            # The dataset knows the candidates, the added records are still checked
+            candidates = (self.dataset[index] for index in indexes)
+            candidates = (
+                self.records.get(record["Internal"]["RecordId"], record)
+                for record in candidates
+            )
+            records = chain(
+                candidates, (self.records[record_id] for record_id in self._added)
+            )
+        matches = (
+            record
+            for record in records
+            if not record["Internal"]["IsDeleted"] and self.matches(record, q)
+        )
+        return self._page(method, query, matches, xml=xml)
+
+    def _records(
+        self, method: str, item: str, query: dict, headers: dict, body: bytes
+    ) -> FakeResponse:
+        with self._lock:
+            if not item:
+                if method in ("GET", "HEAD"):
+                    return self._search_records(
+                        method, query, "xml" in headers.get("accept", "")
+                    )
+                if method == "POST":
+                    return self._create_record(headers, body)
+                return _error(405, f"{method} not allowed")
+
+            record = self._find_record(item)
+            include_deleted = query.get("includeDeleted") == "true"
+            if record is None or (
+                record["Internal"]["IsDeleted"] and not include_deleted
+            ):
+                return _error(404, f"Record {item} not found")
+            record_id = record["Internal"]["RecordId"]
+
+            if method == "GET":
+                etag = f'"{record_id}-{self._versions.get(record_id, 1)}"'
+                if headers.get("if-none-match") == etag:
+                    return 304, {"ETag": etag}, b""
+                if "xml" in headers.get("accept", ""):
+                    return _xml_response(200, "Record", record, {"ETag": etag})
+                return _json_response(200, record, {"ETag": etag})
+            if method in ("POST", "PUT"):
+                update = self._parse_metadata(headers, body)
+                if update is None:
+                    return _error(400, "Invalid metadata")
+                if update.pop("Publish", False):
+                    record["Internal"]["IsInIngestSpace"] = False
+                update.pop("Reason", None)
+                update.pop("EventType", None)
+                _merge(record, update)
+                self.records[record_id] = record
+                self._touch(record_id)
+                return 204, {}, b""
+            if method == "DELETE":
+                record["Internal"]["IsDeleted"] = True
+                self.records[record_id] = record
+                self._deleted.add(record_id)
+                self._touch(record_id)
+                return 204, {}, b""
+            return _error(405, f"{method} not allowed")
+
+    def _parse_metadata(self, headers: dict, body: bytes) -> Optional[dict]:
+        """Parse the metadata of a write, sent as JSON, XML or form."""
+        content_type = headers.get("content-type", "")
+        if headers.get("content-encoding") == "gzip":
+            body = gzip.decompress(body)
+        try:
+            if content_type.startswith("application/json"):
+                return json.loads(body or b"{}")
+            if content_type.startswith("application/xml"):
+                return _from_xml(ET.fromstring(body)) or {}
+            form = _parse_form(content_type, body)
+        except (ValueError, ET.ParseError):
+            return None
+        metadata = form.pop("metadata", None)
+        if metadata is None:
+            return form
+        try:
+            if metadata.lstrip().startswith("<"):
+                return _from_xml(ET.fromstring(metadata)) or {}
+            return json.loads(metadata)
+        except (ValueError, ET.ParseError):
+            return None
+
+    def _create_record(self, headers: dict, body: bytes) -> FakeResponse:
+        metadata = self._parse_metadata(headers, body)
+        if metadata is None:
+            return _error(400, "Invalid metadata")
+        record: dict = {"Internal": {}, "Descriptive": {}}
+        fragment = metadata.pop("Fragment", None)
+        if fragment is not None:
+            parent = self._find_record(fragment.get("ParentRecordId", ""))
+            if parent is None:
+                return _error(404, "Parent record not found")
+            record["Internal"]["FragmentId"] = uuid.uuid4().hex
+            record["Internal"]["MediaObjectId"] = parent["Internal"]["MediaObjectId"]
+            record["Fragment"] = fragment
+        if "Title" in metadata:
+            record["Descriptive"]["Title"] = metadata.pop("Title")
+        publish = str(metadata.pop("Publish", metadata.pop("publish", False)))
+        record["Internal"]["IsInIngestSpace"] = publish.lower() != "true"
+        for key in ("fileUrl", "recordType", "zone", "ingestSpaceId", "Type"):
+            if key in metadata:
+                record["Internal"][key[0].upper() + key[1:]] = metadata.pop(key)
+        _merge(record, {k: v for k, v in metadata.items() if isinstance(v, dict)})
+        record = self.add_record(record)
+        return _json_response(201, record)
@@ -1,18 +1,19 @@
 import json
-from types import SimpleNamespace
 from typing import List
 
+from mediahaven.json_decoder import DEFAULT_DECODER
 from mediahaven.resources.base_resource import (
     MediaHavenPageObjectJSON,
     MediaHavenSingleObjectJSON,
     MediaHavenSingleObjectXML,
 )
+from mediahaven.resources.views import DictView
 
 
 class MediaHavenSingleObjectJSONMock(MediaHavenSingleObjectJSON):
     def __init__(self, data: dict):
-        self._single_result: SimpleNamespace = json.loads(
-            json.dumps(data), object_hook=lambda d: SimpleNamespace(**d)
+        self._single_result = DictView(
+            DEFAULT_DECODER(json.dumps(data).encode("utf-8"))
         )
 
 
@@ -30,8 +31,8 @@ class MediaHavenPageObjectJSONMock(MediaHavenPageObjectJSON):
             "TotalNrOfResults": total_nr_of_results,
             "Results": results,
         }
-        self._page_result: SimpleNamespace = json.loads(
-            json.dumps(paged_dict), object_hook=lambda d: SimpleNamespace(**d)
+        self._page_result = DictView(
+            DEFAULT_DECODER(json.dumps(paged_dict).encode("utf-8"))
         )
 
         self._total_nr_of_results = total_nr_of_results
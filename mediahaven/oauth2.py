@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import logging
+import threading
+import time
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from typing import Dict, Optional
 from urllib.parse import urljoin
 
 from oauthlib.oauth2 import LegacyApplicationClient
@@ -9,8 +14,57 @@ from oauthlib.oauth2.rfc6749.errors import (
     CustomOAuth2Error,
     InvalidClientError,
 )
+from requests.adapters import BaseAdapter, HTTPAdapter
 from requests_oauthlib import OAuth2Session
 
+from mediahaven.compression import ACCEPT_ENCODING
+from mediahaven.deadline import DEFAULT_TIMEOUT, Timeout, bound_timeout
+from mediahaven.token_store import TokenStore
+from mediahaven.tracing import span
+
+# Amount of hosts for which a connection pool is cached.
+DEFAULT_POOL_CONNECTIONS = 10
+# Maximum amount of connections kept alive per host.
+DEFAULT_POOL_MAXSIZE = 10
+# Seconds before expiry at which the background refresh renews the token.
+DEFAULT_REFRESH_MARGIN = 60
+# Seconds to wait before retrying a failed background refresh.
+BACKGROUND_REFRESH_RETRY_INTERVAL = 5
+# Minimum seconds between two background refreshes.
+MIN_BACKGROUND_REFRESH_INTERVAL = 1
+# Maximum seconds to wait before retrying a failed ahead-of-expiry refresh.
+MAX_REFRESH_COOLDOWN = 30
+
+logger = logging.getLogger(__name__)
+
+
+def refresh_cooldown(margin: float) -> float:
+    """Return the seconds to wait before retrying a failed ahead-of-expiry refresh.
+
+    Without a cooldown, every request within the refresh margin would retry the
+    failing refresh, adding a token round trip to each of them.
+
+    Args:
+        margin: The refresh margin in seconds.
+    """
+    return min(margin / 4, MAX_REFRESH_COOLDOWN)
+
+
+def token_refresh_margin(token: Optional[dict], margin: float) -> float:
+    """Return the refresh margin for a token, at most half of its lifetime.
+
+    A token which lives shorter than the margin would otherwise be renewed as
+    soon as it is issued, over and over again.
+
+    Args:
+        token: The token, of which "expires_in" is its lifetime in seconds.
+        margin: The configured refresh margin in seconds.
+    """
+    lifetime = (token or {}).get("expires_in")
+    if not lifetime:
+        return margin
+    return min(margin, float(lifetime) / 2)
+
 
 class RequestTokenError(Exception):
     """Raised when an error occurred during token request.
@@ -42,42 +96,320 @@ class NoTokenError(Exception):
 class OAuth2Grant(ABC):
     """Abstract class representing an OAuth2 grant used in MediaHaven."""
 
-    def __init__(self, mh_base_url: str, client_id: str, client_secret: str):
+    def __init__(
+        self,
+        mh_base_url: str,
+        client_id: str,
+        client_secret: str,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+        refresh_margin: Optional[float] = None,
+        token_store: Optional[TokenStore] = None,
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        http2: bool = False,
+        transport: Optional[BaseAdapter] = None,
+    ):
         """Initialize a Grant class.
 
+        The grant owns one long-lived, pooled session which is shared by all the
+        requests of the clients using this grant. When the token changes, the
+        session is updated in place so the open connections can be reused.
+
         Args:
             mh_base_url: The URL of MH auth server.
             client_id: The ID of the client.
             client_secret: The secret of the client.
+            pool_connections: The amount of hosts to cache a connection pool for.
+            pool_maxsize: The maximum amount of connections to keep per host.
+            pool_block: If true, block when all the connections of a host are in
+                use instead of opening an extra, non-pooled connection.
+            keep_alive: If false, close the connection after every request.
+            refresh_margin: If set, renew the token when a session is requested
+                less than this amount of seconds before the token expires. The
+                token is still valid at that point, so a failed renewal falls back
+                to the refresh on expiry.
+            token_store: If set, share the token with the other grants using the
+                same store, e.g. a `FileTokenStore` for the processes on a node.
+            timeout: The timeout of the token requests in seconds, bounded by the
+                current deadline, if any.
+            http2: If true, send the HTTPS requests over HTTP/2, multiplexed over
+                at most `pool_maxsize` connections. Requires the "http2" extra.
+            transport: If set, send the requests to MediaHaven via this transport
+                adapter instead of over HTTP, e.g. an `InMemoryTransport`.
         """
         self.mh_base_url = mh_base_url
         self.client = None
         self.client_id = client_id
         self.client_secret = client_secret
-        self.token = None
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.refresh_margin = refresh_margin
+        self.token_store = token_store
+        self.timeout = timeout
+        self.http2 = http2
+        # The transport adapters mounted on top of the default ones, by prefix
+        self._transports: Dict[str, BaseAdapter] = {}
+        self._session: Optional[OAuth2Session] = None
+        self._token: Optional[dict] = None
+        # The amount of refreshes of the token by this grant
+        self.refresh_count = 0
+        # The monotonic time before which a failed ahead-of-expiry refresh is
+        # not retried
+        self._refresh_retry_at = 0.0
+        # The tracing of the token refreshes, set by the client if enabled
+        self.tracing = None
+        # Guards the session creation and the (refresh of the) token
+        self._lock = threading.RLock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._stop_refresh = threading.Event()
         self.refresh_url = urljoin(self.mh_base_url, "/auth/oauth2/token")
+        if transport is not None:
+            self.mount(self.mh_base_url, transport)
+
+    @property
+    def token(self) -> Optional[dict]:
+        return self._token
+
+    @token.setter
+    def token(self, token: Optional[dict]):
+        """Set the token and update the pooled session in place."""
+        with self._lock:
+            self._token = token
+            if self._session is not None:
+                self._session.token = token or {}
+
+    @property
+    def expires_at(self) -> Optional[float]:
+        """The timestamp at which the access token expires, if known."""
+        if not self._token:
+            return None
+        return self._token.get("expires_at")
+
+    def _expires_within(self, margin: float) -> bool:
+        """Check if the access token expires within the given amount of seconds."""
+        expires_at = self.expires_at
+        margin = token_refresh_margin(self._token, margin)
+        return expires_at is not None and time.time() >= expires_at - margin
+
+    def _is_valid(self, token: Optional[dict]) -> bool:
+        """Check if the token contains an access token which is not about to expire."""
+        if not token or "access_token" not in token:
+            return False
+        expires_at = token.get("expires_at")
+        margin = token_refresh_margin(token, self.refresh_margin or 0)
+        return expires_at is None or time.time() < expires_at - margin
+
+    def _store_lock(self):
+        """Return the lock of the token store, or a no-op without a store."""
+        return self.token_store.lock() if self.token_store else nullcontext()
+
+    @property
+    def session(self) -> OAuth2Session:
+        """The pooled session, created on first use."""
+        with self._lock:
+            if self._session is None:
+                self._session = self._create_session()
+            return self._session
+
+    def _create_session(self) -> OAuth2Session:
+        """Create a requests session with a pooled connection adapter.
+
+        Returns:
+            A session containing the current token.
+        """
+        session = OAuth2Session(client=self.client, token=self.token or {})
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if self.http2:
+            # Imported lazily as httpx is an optional dependency
+            from mediahaven.http2 import HTTP2Adapter
+
+            session.mount(
+                "https://",
+                HTTP2Adapter(
+                    max_connections=self.pool_maxsize,
+                    max_keepalive_connections=self.pool_maxsize,
+                ),
+            )
+        for prefix, transport in self._transports.items():
+            session.mount(prefix, transport)
+        # Negotiate every content coding which can be decoded, the decoding is
+        # done while the body is read
+        session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def mount(self, prefix: str, transport: BaseAdapter):
+        """Send the requests of which the URL starts with the prefix via a transport.
+
+        Args:
+            prefix: The URL prefix, e.g. the base URL of MediaHaven.
+            transport: The requests transport adapter.
+        """
+        with self._lock:
+            self._transports[prefix] = transport
+            if self._session is not None:
+                self._session.mount(prefix, transport)
+
+    def use_http2(self, enabled: bool = True):
+        """Enable or disable HTTP/2 for the requests sent via this grant.
+
+        The current session is closed, the next request creates a new one.
+
+        Args:
+            enabled: If true, send the HTTPS requests over HTTP/2.
+        """
+        with self._lock:
+            if enabled == self.http2:
+                return
+            self.http2 = enabled
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def close(self):
+        """Close the pooled session and its connections."""
+        self.stop_background_refresh()
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
 
     @abstractmethod
     def request_token(self):
         pass
 
-    def refresh_token(self):
+    def refresh_token(self, expired_token: Optional[dict] = None):
         """Refresh the OAuth2 token with the saved refresh token.
 
         Issues a new access token but also a new refresh token.
+
+        The refresh is single-flight: only one thread refreshes at a time while the
+        other threads wait for the result. When the expired token is passed and it
+        has already been replaced by the time the lock is acquired, the refresh is
+        skipped and the new token is used instead.
+
+        With a token store, the refresh is coordinated via the lock of the store. If
+        another grant already stored a refreshed, valid token, that one is used. If
+        the stored token has expired but holds another refresh token, that newer
+        refresh token is used to refresh.
+
+        Args:
+            expired_token: The token that was found to be expired.
+        """
+        with self._lock:
+            if expired_token is not None and self._token is not expired_token:
+                # Another thread already refreshed the token
+                return
+            with self._store_lock():
+                if self.token_store:
+                    stored_token = self.token_store.load()
+                    if self._is_valid(stored_token) and stored_token[
+                        "access_token"
+                    ] != (self._token or {}).get("access_token"):
+                        # Another grant already refreshed the token
+                        self.token = stored_token
+                        return
+                    if (stored_token or {}).get("refresh_token") not in (
+                        None,
+                        (self._token or {}).get("refresh_token"),
+                    ):
+                        # Another grant refreshed the token, which has expired
+                        # since, and our refresh token was revoked by rotation
+                        self.token = stored_token
+                # These extra params are needed to refresh the token
+                extra = {
+                    "client_id": self.client_id,
+                    "client_secret": self.client_secret,
+                }
+                # Refresh the token via the pooled session, which is updated in place
+                with span(self.tracing, "mediahaven.token_refresh"):
+                    self.token = self.session.refresh_token(
+                        self.refresh_url, timeout=bound_timeout(self.timeout), **extra
+                    )
+                self.refresh_count += 1
+                if self.token_store:
+                    self.token_store.save(self.token)
+
+    def start_background_refresh(self):
+        """Renew the token ahead of its expiry in a background thread.
+
+        The token is renewed `refresh_margin` seconds (or `DEFAULT_REFRESH_MARGIN`
+        if not set) before it expires, so request latency never includes a refresh.
+        The margin is at most half of the lifetime of the token, see
+        `token_refresh_margin`, and two refreshes are at least
+        `MIN_BACKGROUND_REFRESH_INTERVAL` seconds apart.
         """
-        # Create a session containing the (refresh) token
-        oauth = OAuth2Session(client=self.client, token=self.token)
-        # These extra params are needed to refresh the token
-        extra = {"client_id": self.client_id, "client_secret": self.client_secret}
-        # Refresh the token
-        self.token = oauth.refresh_token(self.refresh_url, **extra)
+        with self._lock:
+            if self._refresh_thread is not None:
+                return
+            self._stop_refresh.clear()
+            self._refresh_thread = threading.Thread(
+                target=self._background_refresh,
+                name="mediahaven-token-refresh",
+                daemon=True,
+            )
+            self._refresh_thread.start()
+
+    def stop_background_refresh(self):
+        """Stop the background refresh thread if it is running."""
+        with self._lock:
+            thread, self._refresh_thread = self._refresh_thread, None
+        if thread is not None:
+            self._stop_refresh.set()
+            thread.join()
+
+    def _background_refresh(self):
+        """Loop of the background thread which renews the token before expiry."""
+        margin = (
+            self.refresh_margin
+            if self.refresh_margin is not None
+            else DEFAULT_REFRESH_MARGIN
+        )
+        while True:
+            expires_at = self.expires_at
+            if expires_at is None:
+                # Wait for a token which expires
+                wait = BACKGROUND_REFRESH_RETRY_INTERVAL
+            else:
+                token_margin = token_refresh_margin(self._token, margin)
+                wait = max(expires_at - token_margin - time.time(), 0)
+            if self._stop_refresh.wait(wait):
+                return
+            token = self._token
+            if not token or not self._expires_within(margin):
+                continue
+            try:
+                self.refresh_token(token)
+            except Exception:
+                logger.warning("Background token refresh failed", exc_info=True)
+                if self._stop_refresh.wait(BACKGROUND_REFRESH_RETRY_INTERVAL):
+                    return
+            else:
+                if self._stop_refresh.wait(MIN_BACKGROUND_REFRESH_INTERVAL):
+                    return
 
     def _get_session(self) -> OAuth2Session:
-        """Return a requests session with the valid OAuth2 token.
+        """Return the pooled requests session with the valid OAuth2 token.
 
         This session can be used to execute the authorized requests. This means that
-        a token needs to have been requested before getting this session.
+        a token needs to have been requested before getting this session. The same
+        session is returned on every call so the connections are kept warm.
+
+        If a `refresh_margin` is set and the token expires within that margin (at
+        most half of its lifetime), the token is renewed before returning the
+        session. A failed renewal is only
+        retried after a cooldown, see `refresh_cooldown`.
 
         Returns:
             A session with the valid OAuth2 token.
@@ -87,14 +419,28 @@ class OAuth2Grant(ABC):
         """
         if not self.token:
             raise NoTokenError
-        return OAuth2Session(client=self.client, token=self.token)
+        if (
+            self.refresh_margin is not None
+            and self._expires_within(self.refresh_margin)
+            and time.monotonic() >= self._refresh_retry_at
+        ):
+            token = self._token
+            try:
+                self.refresh_token(token)
+            except Exception:
+                # The token is still valid, the refresh on expiry will take over
+                logger.warning("Ahead-of-expiry token refresh failed", exc_info=True)
+                self._refresh_retry_at = time.monotonic() + refresh_cooldown(
+                    self.refresh_margin
+                )
+        return self.session
 
 
 class ROPCGrant(OAuth2Grant):
     """Represents a "Resource Owner Password Credential" grant."""
 
-    def __init__(self, mh_base_url: str, client_id: str, client_secret: str):
-        super().__init__(mh_base_url, client_id, client_secret)
+    def __init__(self, mh_base_url: str, client_id: str, client_secret: str, **kwargs):
+        super().__init__(mh_base_url, client_id, client_secret, **kwargs)
         self.token_url = urljoin(self.mh_base_url, "/auth/ropc.php")
         self.client = LegacyApplicationClient(self.client_id)
 
@@ -106,6 +452,9 @@ class ROPCGrant(OAuth2Grant):
         token is issued by the authorization server. This token will be saved in memory
         and used by the session in order to execute authorized requests.
 
+        With a token store, a valid stored token is used instead of requesting a new
+        one. A newly requested token is saved in the store.
+
         Args:
             username: The username of the resource owner.
             password: The password of the resource owner.
@@ -113,18 +462,26 @@ class ROPCGrant(OAuth2Grant):
         Raises:
             RequestTokenException: When an error occurred when requesting the token.
         """
-        # Create a session to request the token
-        oauth = OAuth2Session(client=self.client)
-
-        # Fetch the access token
-        try:
-            self.token = oauth.fetch_token(
-                token_url=self.token_url,
-                username=username,
-                password=password,
-                client_id=self.client_id,
-                client_secret=self.client_secret,
-                include_client_id=True,
-            )
-        except (CustomOAuth2Error, InvalidClientError) as err:
-            raise RequestTokenError from err
+        with self._lock, self._store_lock():
+            if self.token_store:
+                stored_token = self.token_store.load()
+                if self._is_valid(stored_token):
+                    self.token = stored_token
+                    return
+
+            # Fetch the access token via the pooled session
+            try:
+                self.token = self.session.fetch_token(
+                    token_url=self.token_url,
+                    username=username,
+                    password=password,
+                    client_id=self.client_id,
+                    client_secret=self.client_secret,
+                    include_client_id=True,
+                    timeout=bound_timeout(self.timeout),
+                )
+            except (CustomOAuth2Error, InvalidClientError) as err:
+                raise RequestTokenError from err
+
+            if self.token_store:
+                self.token_store.save(self.token)
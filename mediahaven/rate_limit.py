@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+from mediahaven.deadline import DeadlineExceededError, current_deadline
+
+# HTTP methods which only read data.
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    The bucket is refilled at `rate` tokens per second up to `burst` tokens. When
+    the bucket does not hold enough tokens, the tokens are reserved ahead and the
+    caller waits until they have been refilled. This way, the callers are served
+    in order and the rate is never exceeded.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        """Initialize a TokenBucket.
+
+        Args:
+            rate: The amount of tokens added per second.
+            burst: The maximum amount of tokens in the bucket. Defaults to the
+                rate, with a minimum of 1.
+        """
+        if rate <= 0:
+            raise ValueError("The rate should be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(int(rate), 1)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """Take the tokens from the bucket.
+
+        Args:
+            tokens: The amount of tokens to take.
+
+        Returns:
+            The amount of seconds to wait before the tokens are available.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated_at) * self.rate
+            )
+            self._updated_at = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.rate
+
+    def _reserve_before_deadline(self, tokens: int) -> float:
+        """Take the tokens if they are available before the current deadline.
+
+        Returns:
+            The amount of seconds to wait before the tokens are available.
+
+        Raises:
+            DeadlineExceededError: If the tokens are only available after the
+                deadline. The tokens are returned to the bucket then.
+        """
+        wait = self._reserve(tokens)
+        active = current_deadline()
+        if active is not None and (active.expired or wait > active.remaining()):
+            with self._lock:
+                self._tokens += tokens
+            raise DeadlineExceededError
+        return wait
+
+    def acquire(self, tokens: int = 1):
+        """Take the tokens, blocking until they are available.
+
+        Raises:
+            DeadlineExceededError: If the tokens are only available after the
+                current deadline.
+        """
+        wait = self._reserve_before_deadline(tokens)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 1):
+        """Take the tokens, awaiting until they are available.
+
+        Raises:
+            DeadlineExceededError: If the tokens are only available after the
+                current deadline.
+        """
+        wait = self._reserve_before_deadline(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class RateLimiter:
+    """Client-side rate limiter for the requests to MediaHaven.
+
+    Reads (GET/HEAD) and writes can be limited by separate buckets. Without a
+    separate write rate, all requests share one bucket.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[int] = None,
+        write_rate: Optional[float] = None,
+        write_burst: Optional[int] = None,
+    ):
+        """Initialize a RateLimiter.
+
+        Args:
+            rate: The maximum amount of requests per second.
+            burst: The maximum amount of requests which can be sent at once.
+            write_rate: If set, the maximum amount of write requests per second.
+            write_burst: The maximum amount of write requests sent at once.
+        """
+        self.read_bucket = TokenBucket(rate, burst)
+        if write_rate is not None:
+            self.write_bucket = TokenBucket(write_rate, write_burst)
+        else:
+            self.write_bucket = self.read_bucket
+
+    def bucket(self, method: str) -> TokenBucket:
+        """Return the bucket used for requests with the given HTTP method."""
+        if method.upper() in READ_METHODS:
+            return self.read_bucket
+        return self.write_bucket
+
+    def acquire(self, method: str):
+        """Wait until a request with the given HTTP method is allowed."""
+        self.bucket(method).acquire()
+
+    async def acquire_async(self, method: str):
+        """Await until a request with the given HTTP method is allowed."""
+        await self.bucket(method).acquire_async()
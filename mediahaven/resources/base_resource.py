@@ -1,13 +1,80 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 from __future__ import annotations
+import time
+import xml.etree.ElementTree as ET
 from abc import ABC, abstractmethod
-from types import SimpleNamespace
-from typing import Generator, Optional, Union
+from collections import deque
+from typing import Callable, Deque, Generator, Iterable, Iterator, Optional, Union
 
 from requests.models import Response
 
-from mediahaven.mediahaven import AcceptFormat, MediaHavenClient
+from mediahaven.deadline import Deadline, use_deadline
+from mediahaven.hooks import OBJECT_CREATED, RESPONSE_ATTRIBUTE
+from mediahaven.json_decoder import decode_json
+from mediahaven.mediahaven import (
+    RAW_RESPONSE_ATTRIBUTE,
+    AcceptFormat,
+    MediaHavenClient,
+)
+from mediahaven.resources.streaming import (
+    CHUNK_SIZE,
+    StreamingPageParser,
+    StreamingXMLPageParser,
+    iter_text,
+)
+from mediahaven.resources.views import DictView, wrap
+from mediahaven.tracing import end_scan_span, start_scan_span, use_span
+
+
+def _json_to_view(response: Response) -> DictView:
+    """Decode the JSON body of the response into a lazy DictView.
+
+    The body is decoded from its bytes by the JSON decoder of the client. The
+    nested objects are only wrapped in a view when accessed. If the response
+    carries a RequestEvent, the time spent decoding the JSON and constructing the
+    view is added to its "decode" and "build" phases.
+    """
+    event = getattr(response, RESPONSE_ATTRIBUTE, None)
+    if event is None:
+        return wrap(decode_json(response))
+
+    start = time.perf_counter()
+    data = decode_json(response)
+    decoded = time.perf_counter()
+    result = wrap(data)
+    event.add_phase("decode", decoded - start)
+    event.add_phase("build", time.perf_counter() - decoded)
+    return result
+
+
+def _raw_body(response: Response) -> Optional[bytes]:
+    """Return the body of the response to keep, if the client keeps it."""
+    if getattr(response, RAW_RESPONSE_ATTRIBUTE, True):
+        return response.content
+    return None
+
+
+def _decode_raw_body(body: Optional[bytes], encoding: Optional[str]) -> Optional[str]:
+    if body is None:
+        return None
+    return str(body, encoding or "utf-8", errors="replace")
+
+
+def _record_yielded(resource: Optional[BaseResource], count: int):
+    """Add the amount of results yielded by a page generator to the client metrics."""
+    metrics = getattr(getattr(resource, "mh_client", None), "metrics", None)
+    if metrics is not None:
+        metrics.record_yielded(resource.name, count)
+
+
+def _emit_object_created(response: Response, result_object, results: int):
+    """Emit the OBJECT_CREATED event of the response, if it carries a RequestEvent."""
+    event = getattr(response, RESPONSE_ATTRIBUTE, None)
+    if event is not None:
+        event.object_type = type(result_object).__name__
+        event.results = results
+        event.hooks.emit(OBJECT_CREATED, event)
 
 
 class BaseResource:
@@ -62,7 +129,8 @@ class MediaHavenSingleObject(ABC):
     """Represents a single result.
 
     Attributes:
-        _raw_response: The raw body of the response.
+        _raw_response: The raw body of the response, if kept by the client.
+        _encoding: The encoding of the raw body.
         _single_result: The payload of the response transformed depending on the type.
     """
 
@@ -72,24 +140,27 @@ class MediaHavenSingleObject(ABC):
         Args:
             response: The HTTP response.
         """
-        self._raw_response: str = response.text
-        self._single_result: Optional[Union[SimpleNamespace, str]] = None
+        self._raw_response: Optional[bytes] = _raw_body(response)
+        self._encoding: Optional[str] = response.encoding
+        self._single_result: Optional[Union[DictView, str]] = None
 
     @property
     def single_result(self):
         return self._single_result
 
     @property
-    def raw_response(self):
-        return self._raw_response
+    def raw_response(self) -> Optional[str]:
+        """The raw body of the response, decoded on access.
+
+        None if the client was configured not to keep it.
+        """
+        return _decode_raw_body(self._raw_response, self._encoding)
 
 
 class MediaHavenSingleObjectJSON(MediaHavenSingleObject):
     def __init__(self, response: Response):
         super().__init__(response)
-        self._single_result: SimpleNamespace = response.json(
-            object_hook=lambda d: SimpleNamespace(**d)
-        )
+        self._single_result: DictView = _json_to_view(response)
 
     def __getattr__(self, attr):
         return getattr(self.single_result, attr)
@@ -116,9 +187,11 @@ class MediaHavenSingleObjectCreator:
             The MediaHavenSingleObject.
         """
         if accept_format == AcceptFormat.JSON:
-            return MediaHavenSingleObjectJSON(response)
+            single_object = MediaHavenSingleObjectJSON(response)
         else:
-            return MediaHavenSingleObjectXML(response)
+            single_object = MediaHavenSingleObjectXML(response)
+        _emit_object_created(response, single_object, 1)
+        return single_object
 
 
 class NoMorePagesException(Exception):
@@ -140,7 +213,8 @@ class MediaHavenPageObject(ABC):
         _has_more: Indicating if there are more pages left.
         _resource: The resource that executed the request.
         _query_params: The query parameters used in the request.
-        _raw_response: The raw body of the response.
+        _raw_response: The raw body of the response, if kept by the client.
+        _encoding: The encoding of the raw body.
         _page_result: The payload of the response transformed depending on the type.
     """
 
@@ -154,12 +228,13 @@ class MediaHavenPageObject(ABC):
         """
         self._resource: BaseResource = resource
         self._query_params: dict = query_params
-        self._raw_response: str = response.text
+        self._raw_response: Optional[bytes] = _raw_body(response)
+        self._encoding: Optional[str] = response.encoding
         self._start_index: Optional[int] = None
         self._nr_of_results: Optional[int] = None
         self._total_nr_of_results: Optional[int] = None
         self._has_more: Optional[bool] = None
-        self._page_result: Optional[Union[SimpleNamespace, str]] = None
+        self._page_result: Optional[Union[DictView, str]] = None
 
     @abstractmethod
     def next_page(self) -> MediaHavenPageObject:
@@ -174,14 +249,24 @@ class MediaHavenPageObject(ABC):
         pass
 
     @abstractmethod
-    def as_generator(self) -> Generator[Union[SimpleNamespace, str], None, None]:
+    def as_generator(
+        self, deadline: Optional[float] = None
+    ) -> Generator[Union[DictView, ET.Element], None, None]:
         """Returns a generator for all the result items spread over all the pages.
 
+        Args:
+            deadline: The optional time budget in seconds for fetching all the
+                subsequent pages, counting from the creation of the generator.
+
         Returns:
             A generator.
         """
         pass
 
+    def close(self):
+        """Release the connection of the response, if still in use."""
+        pass
+
     @property
     def page_result(self):
         return self._page_result
@@ -203,8 +288,12 @@ class MediaHavenPageObject(ABC):
         return self._start_index
 
     @property
-    def raw_response(self):
-        return self._raw_response
+    def raw_response(self) -> Optional[str]:
+        """The raw body of the response, decoded on access.
+
+        None if the client was configured not to keep it.
+        """
+        return _decode_raw_body(self._raw_response, self._encoding)
 
 
 class MediaHavenPageObjectJSON(MediaHavenPageObject):
@@ -212,7 +301,7 @@ class MediaHavenPageObjectJSON(MediaHavenPageObject):
         """Initializes a MediaHavenPageObjectJSON."""
         super().__init__(response, resource, **query_params)
 
-        self._page_result = response.json(object_hook=lambda d: SimpleNamespace(**d))
+        self._page_result = _json_to_view(response)
         self._total_nr_of_results = self.page_result.TotalNrOfResults
         self._nr_of_results = self.page_result.NrOfResults
         self._start_index = self.page_result.StartIndex
@@ -224,6 +313,9 @@ class MediaHavenPageObjectJSON(MediaHavenPageObject):
     def __getitem__(self, key):
         return self.page_result.Results[key]
 
+    def _results(self) -> Iterable[DictView]:
+        return self.page_result.Results
+
     def next_page(self) -> MediaHavenPageObjectJSON:
         if self.has_more:
             params = self._query_params.copy()
@@ -232,16 +324,247 @@ class MediaHavenPageObjectJSON(MediaHavenPageObject):
         else:
             raise NoMorePagesException
 
-    def as_generator(self) -> Generator[SimpleNamespace, None, None]:
-        page = self
+    def as_generator(
+        self, deadline: Optional[float] = None
+    ) -> Generator[DictView, None, None]:
+        return _iter_pages(self, deadline)
+
+
+def _iter_pages(
+    first_page: MediaHavenPageObject, deadline: Optional[float] = None
+) -> Generator[Union[DictView, ET.Element], None, None]:
+    """Return a generator of the results of the page and of the subsequent pages.
+
+    The deadline starts now rather than on the first `next()`, see `as_generator`.
+    """
+    budget = Deadline(deadline) if deadline is not None else None
+    return _iter_pages_within(first_page, budget)
+
+
+def _iter_pages_within(
+    first_page: MediaHavenPageObject, budget: Optional[Deadline]
+) -> Generator[Union[DictView, ET.Element], None, None]:
+    page = first_page
+    resource = getattr(first_page, "_resource", None)
+    yielded = 0
+    # The span of the scan, the subsequent pages are fetched within it
+    scan_span = start_scan_span(resource)
+    try:
         while True:
-            for result in page.page_result.Results:
+            for result in page._results():
+                yielded += 1
                 yield result
 
             try:
-                page = page.next_page()
+                with use_deadline(budget), use_span(scan_span):
+                    page = page.next_page()
             except NoMorePagesException:
                 break
+    finally:
+        page.close()
+        _record_yielded(resource, yielded)
+        end_scan_span(scan_span, yielded)
+
+
+class MediaHavenPageObjectStream(MediaHavenPageObject):
+    """A page of which the results are parsed while the body is read.
+
+    The response is read in chunks and the results are parsed one at a time, so a
+    large page can be iterated with bounded memory and its first results are
+    available before the whole body has been received. The results can only be
+    iterated once, via `as_generator` or `iter_results`, and the page can't be
+    indexed. The raw body of a streamed response is not kept.
+
+    The paging fields are parsed up front if they precede the results. Else they
+    become available once all the results were read; the remaining results are
+    then buffered when a paging field is accessed earlier.
+
+    Subclasses provide the parser of the format, see `_create_parser`.
+    """
+
+    def __init__(
+        self,
+        response: Response,
+        resource: BaseResource,
+        accept_format: AcceptFormat,
+        stream: bool,
+        **query_params,
+    ):
+        """Initializes a MediaHavenPageObjectStream.
+
+        Args:
+            response: The HTTP response.
+            resource: The resource that executed the initial request.
+            accept_format: The format of the page, which is requested for the
+                subsequent pages as well.
+            stream: If the response was requested with `stream=True`, the
+                subsequent pages are then streamed as well.
+            **query_params: The optional query parameters.
+        """
+        self._resource: BaseResource = resource
+        self._query_params: dict = query_params
+        # The body of a streamed response is only read while parsing
+        self._raw_response: Optional[bytes] = None if stream else _raw_body(response)
+        self._encoding: Optional[str] = response.encoding
+        self._response = response
+        self._accept_format = accept_format
+        self._stream = stream
+        self._buffered: Deque = deque()
+        self._parser = self._create_parser(response)
+        self._parse(self._parser.start)
+
+    @abstractmethod
+    def _create_parser(self, response: Response):
+        """Return the incremental parser of the body of the response.
+
+        The parser has the `fields` and `done` attributes and the `start` and
+        `next_result` methods of StreamingPageParser.
+        """
+        pass
+
+    def _chunks(self, response: Response) -> Iterator[bytes]:
+        """Return the body of the response as chunks of bytes."""
+        return response.iter_content(CHUNK_SIZE)
+
+    def _wrap(self, result):
+        """Return the result as yielded by the page."""
+        return result
+
+    def _parse(self, step: Callable):
+        """Execute a parse step, closing the response once it is fully parsed."""
+        try:
+            result = step()
+        except BaseException:
+            self.close()
+            raise
+        if self._parser.done:
+            self.close()
+        return result
+
+    def close(self):
+        """Release the connection of the response, if it has not been read fully."""
+        self._response.close()
+
+    def _field(self, name: str):
+        """Return a paging field, buffering the results if it follows them."""
+        if name not in self._parser.fields and not self._parser.done:
+            for result in self._iter_parsed():
+                self._buffered.append(result)
+        return self._parser.fields.get(name)
+
+    @property
+    def page_result(self) -> DictView:
+        """The fields of the page, without the results."""
+        return DictView(self._parser.fields)
+
+    @property
+    def total_nr_of_results(self):
+        return self._field("TotalNrOfResults")
+
+    @property
+    def nr_of_results(self):
+        return self._field("NrOfResults")
+
+    @property
+    def start_index(self):
+        return self._field("StartIndex")
+
+    @property
+    def has_more(self):
+        return self.total_nr_of_results > (self.nr_of_results + self.start_index)
+
+    def __getitem__(self, key):
+        raise TypeError("The results of a streamed page can only be iterated")
+
+    def _iter_parsed(self) -> Iterator:
+        while True:
+            try:
+                yield self._wrap(self._parse(self._parser.next_result))
+            except StopIteration:
+                return
+
+    def iter_results(self) -> Iterator:
+        """Yield the results of this page as they are parsed."""
+        while self._buffered:
+            yield self._buffered.popleft()
+        yield from self._iter_parsed()
+
+    _results = iter_results
+
+    def _next_page_params(self) -> dict:
+        params = self._query_params.copy()
+        params["startIndex"] = self.start_index + self.nr_of_results
+        if self._stream:
+            params["stream"] = True
+        return params
+
+    def next_page(self) -> MediaHavenPageObjectStream:
+        if self.has_more:
+            return self._resource.search(
+                accept_format=self._accept_format, **self._next_page_params()
+            )
+        else:
+            raise NoMorePagesException
+
+    def as_generator(
+        self, deadline: Optional[float] = None
+    ) -> Generator[Union[DictView, ET.Element], None, None]:
+        return _iter_pages(self, deadline)
+
+
+class MediaHavenPageObjectJSONStream(MediaHavenPageObjectStream):
+    """A JSON page of which the results are parsed while the body is downloaded.
+
+    See MediaHavenPageObjectStream. The results are DictViews.
+    """
+
+    def __init__(self, response: Response, resource: BaseResource, **query_params):
+        """Initializes a MediaHavenPageObjectJSONStream.
+
+        Args:
+            response: The HTTP response, requested with `stream=True`.
+            resource: The resource that executed the initial request.
+            **query_params: The optional query parameters.
+        """
+        super().__init__(response, resource, AcceptFormat.JSON, True, **query_params)
+
+    def _create_parser(self, response: Response) -> StreamingPageParser:
+        return StreamingPageParser(iter_text(self._chunks(response), response.encoding))
+
+    def _wrap(self, result) -> DictView:
+        return wrap(result)
+
+
+class MediaHavenPageObjectXML(MediaHavenPageObjectStream):
+    """An XML page of search results, e.g. in the METS or Dublin Core format.
+
+    The body is parsed incrementally by StreamingXMLPageParser, see
+    MediaHavenPageObjectStream. The results are `xml.etree.ElementTree.Element`s
+    which are detached from the tree once parsed, so a scan over all the pages
+    via `as_generator` runs in constant memory when the pages are streamed.
+    """
+
+    def __init__(
+        self,
+        response: Response,
+        resource: BaseResource,
+        accept_format: AcceptFormat = AcceptFormat.XML,
+        stream: bool = False,
+        **query_params,
+    ):
+        """Initializes a MediaHavenPageObjectXML.
+
+        Args:
+            response: The HTTP response.
+            resource: The resource that executed the initial request.
+            accept_format: The XML format of the page.
+            stream: If the response was requested with `stream=True`.
+            **query_params: The optional query parameters.
+        """
+        super().__init__(response, resource, accept_format, stream, **query_params)
+
+    def _create_parser(self, response: Response) -> StreamingXMLPageParser:
+        return StreamingXMLPageParser(self._chunks(response))
 
 
 class MediaHavenPageObjectCreator:
@@ -252,6 +575,7 @@ class MediaHavenPageObjectCreator:
         response: Response,
         accept_format: AcceptFormat,
         resource: BaseResource,
+        stream: bool = False,
         **query_params,
     ) -> MediaHavenPageObject:
         """Create a MediaHavenPageObject.
@@ -264,13 +588,24 @@ class MediaHavenPageObjectCreator:
             response: The HTTP response.
             accept_format: To determine the format of the result (XML/JSON).
             resource: The resource that executed the initial request.
+            stream: If true, the response was requested with `stream=True`. The
+                results are then parsed while the body is downloaded, see
+                MediaHavenPageObjectStream. The results of an XML page are always
+                parsed incrementally, see MediaHavenPageObjectXML.
             **query_params: The optional query parameters.
         Returns:
             The MediaHavenPageObject.
-        Raises:
-            NotImplementedError: When passing an XML format.
         """
-        if accept_format == AcceptFormat.JSON:
-            return MediaHavenPageObjectJSON(response, resource, **query_params)
+        if accept_format == AcceptFormat.JSON and stream:
+            page = MediaHavenPageObjectJSONStream(response, resource, **query_params)
+        elif accept_format == AcceptFormat.JSON:
+            page = MediaHavenPageObjectJSON(response, resource, **query_params)
+            _emit_object_created(response, page, page.nr_of_results)
+            return page
         else:
-            raise NotImplementedError("XML format is not yet implemented")
+            page = MediaHavenPageObjectXML(
+                response, resource, accept_format, stream, **query_params
+            )
+        # The amount of results is only known if it precedes the results
+        _emit_object_created(response, page, page._parser.fields.get("NrOfResults"))
+        return page
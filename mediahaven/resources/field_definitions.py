@@ -10,6 +10,7 @@ from mediahaven.resources.base_resource import (
     MediaHavenSingleObject,
     MediaHavenSingleObjectCreator,
 )
+from mediahaven.tracing import traced
 
 
 class FieldDefinitions(BaseResource):
@@ -19,6 +20,7 @@ class FieldDefinitions(BaseResource):
         super().__init__(*args, **kwargs)
         self._name = "field-definitions"
 
+    @traced("get")
     def get(
         self,
         field: str = None,
@@ -38,6 +40,7 @@ class FieldDefinitions(BaseResource):
         )
         return MediaHavenSingleObjectCreator.create_object(response, accept_format)
 
+    @traced("search")
     def search(
         self, accept_format: str = DEFAULT_ACCEPT_FORMAT, **query_params
     ) -> MediaHavenPageObject:
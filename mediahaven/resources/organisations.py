@@ -10,6 +10,7 @@ from mediahaven.resources.base_resource import (
     MediaHavenSingleObject,
     MediaHavenSingleObjectCreator,
 )
+from mediahaven.tracing import traced
 
 
 class Organisations(BaseResource):
@@ -19,6 +20,7 @@ class Organisations(BaseResource):
         super().__init__(*args, **kwargs)
         self._name = "organisations"
 
+    @traced("get")
     def get(
         self,
         organisation_id: str,
@@ -37,6 +39,7 @@ class Organisations(BaseResource):
         )
         return MediaHavenSingleObjectCreator.create_object(response, accept_format)
 
+    @traced("get_by_external_id")
     def get_by_external_id(
         self,
         external_id: str,
@@ -55,6 +58,7 @@ class Organisations(BaseResource):
         )
         return MediaHavenSingleObjectCreator.create_object(response, accept_format)
 
+    @traced("search")
     def search(
         self, accept_format: str = DEFAULT_ACCEPT_FORMAT, **query_params
     ) -> MediaHavenPageObject:
@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 
 from typing import Any, Dict
-from mediahaven.mediahaven import ContentType, DEFAULT_ACCEPT_FORMAT
+from mediahaven.mediahaven import AcceptFormat, ContentType, DEFAULT_ACCEPT_FORMAT
 from mediahaven.resources.base_resource import (
     BaseResource,
     MediaHavenPageObject,
@@ -10,6 +10,7 @@ from mediahaven.resources.base_resource import (
     MediaHavenSingleObject,
     MediaHavenSingleObjectCreator,
 )
+from mediahaven.tracing import traced
 
 
 DEFAULT_ZONE_NAME = "MediaHaven 2.0 Concepts"
@@ -22,6 +23,7 @@ class Records(BaseResource):
         super().__init__(*args, **kwargs)
         self._name = "records"
 
+    @traced("count")
     def count(self, query: str) -> int:
         """Counts the amount the records given a query string.
 
@@ -36,6 +38,7 @@ class Records(BaseResource):
             q=query,
         )
 
+    @traced("get")
     def get(
         self,
         record_id: str,
@@ -67,13 +70,18 @@ class Records(BaseResource):
         )
         return MediaHavenSingleObjectCreator.create_object(response, accept_format)
 
+    @traced("search")
     def search(
-        self, accept_format=DEFAULT_ACCEPT_FORMAT, **query_params
+        self, accept_format=DEFAULT_ACCEPT_FORMAT, stream=False, **query_params
     ) -> MediaHavenPageObject:
         """Search for multiple records.
 
         Args:
             accept_format: The "Accept" request header.
+            stream: If true, parse the results while the response is downloaded,
+                so a large page is iterated with bounded memory. The results can
+                only be iterated once, see MediaHavenPageObjectStream. The pages
+                in an XML format are always streamed.
             **query_params: The optional query parameters:
                 query_params["q"]: Free text search string.
                 query_params["startIndex"]: Used for pagination of search results,
@@ -85,15 +93,21 @@ class Records(BaseResource):
         Returns:
             A paged result with the records.
         """
+        if accept_format != AcceptFormat.JSON:
+            # The XML pages are parsed incrementally, see MediaHavenPageObjectXML
+            stream = True
+        options = {"stream": True} if stream else {}
         response = self.mh_client._get(
             self._construct_path(),
             accept_format,
+            **options,
             **query_params,
         )
         return MediaHavenPageObjectCreator.create_object(
-            response, accept_format, self, **query_params
+            response, accept_format, self, **options, **query_params
         )
 
+    @traced("delete")
     def delete(self, record_id: str, reason: str = None, event_type: str = None):
         """Delete a record.
 
@@ -116,6 +130,7 @@ class Records(BaseResource):
             **body,
         )
 
+    @traced("update")
     def update(self, record_id: str, json: dict = None, xml: str = None, **form_data):
         """Update a record.
 
@@ -168,6 +183,7 @@ class Records(BaseResource):
             **form_data,
         )
 
+    @traced("publish")
     def publish(self, record_id: str, reason: str = None):
         """Publishes a record.
 
@@ -185,6 +201,7 @@ class Records(BaseResource):
 
         return self.mh_client._post(self._construct_path(record_id), json=body)
 
+    @traced("create_fragment")
     def create_fragment(
         self,
         record_id: str,
@@ -242,6 +259,7 @@ class Records(BaseResource):
             json=json,
         )
 
+    @traced("upload_single_file_via_url")
     def upload_single_file_via_url(
         self,
         url: str,
@@ -288,6 +306,7 @@ class Records(BaseResource):
     def _encode_text_part(self, part: str | bool) -> tuple[None, str | bool]:
         return (None, part)
 
+    @traced("upload_complex_file_via_url")
     def upload_complex_file_via_url(
         self,
         url: str,
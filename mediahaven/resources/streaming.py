@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import codecs
+import json
+import xml.etree.ElementTree as ET
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# The size in bytes of the chunks in which a streamed body is read.
+CHUNK_SIZE = 64 * 1024
+
+# The key of the array of results in a page of search results.
+RESULTS_KEY = "Results"
+
+# The paging fields of a page of search results.
+PAGING_FIELDS = ("TotalNrOfResults", "StartIndex", "NrOfResults")
+
+_WHITESPACE = " \t\n\r"
+
+
+def iter_text(chunks: Iterable[bytes], encoding: Optional[str] = None) -> Iterator[str]:
+    """Decode the chunks of a body incrementally, a character may span chunks."""
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+class StreamingPageParser:
+    """Incremental parser of a JSON page of search results.
+
+    The page is a JSON object of which the "Results" array is parsed one result at
+    a time, so only the current result and the unparsed part of the current chunk
+    are kept in memory. The other (scalar) members of the page are collected in
+    `fields`, whether they come before or after the results.
+
+    Each value is decoded with `json.JSONDecoder.raw_decode` once it is complete in
+    the buffer. A value which ends at the end of the buffer could be incomplete,
+    e.g. a number, so it is only decoded once more text was read.
+
+    Attributes:
+        fields: The members of the page other than the results, read so far.
+        done: If true, the whole page has been parsed.
+    """
+
+    def __init__(self, text: Iterable[str]):
+        """Initialize a StreamingPageParser.
+
+        Args:
+            text: The body of the response, as chunks of text.
+        """
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._text = iter(text)
+        self._buffer = ""
+        self._pos = 0
+        self._exhausted = False
+        self._decoder = json.JSONDecoder()
+        # Before the first member, in the results or after them
+        self._in_results = False
+        self._first_result = True
+
+    def _fill(self) -> bool:
+        """Read the next chunk of text into the buffer, False if there is none."""
+        if self._exhausted:
+            return False
+        try:
+            chunk = next(self._text)
+        except StopIteration:
+            self._exhausted = True
+            return False
+        # Drop the parsed text, keeping the buffer bounded
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Skip the whitespace and return the next character, "" at the end."""
+        while True:
+            buffer = self._buffer
+            pos = self._pos
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, characters: str) -> str:
+        char = self._peek()
+        if not char or char not in characters:
+            raise ValueError(
+                f"Expected one of {characters!r} at {self._pos} but got {char!r}"
+            )
+        self._pos += 1
+        return char
+
+    def _value(self) -> Any:
+        """Decode the next JSON value."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            if end < len(self._buffer) or not self._fill():
+                self._pos = end
+                return value
+
+    def _members(self):
+        """Parse the members of the page up to the results or the end."""
+        while True:
+            key = self._value()
+            if not isinstance(key, str):
+                raise ValueError(f"Expected a key at {self._pos}")
+            self._expect(":")
+            if key == RESULTS_KEY:
+                self._expect("[")
+                self._in_results = True
+                self._first_result = True
+                return
+            self.fields[key] = self._value()
+            if self._expect(",}") == "}":
+                self.done = True
+                return
+
+    def start(self):
+        """Parse the page up to the start of the results.
+
+        Raises:
+            ValueError: If the body is not a valid JSON object.
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            self.done = True
+            return
+        self._members()
+
+    def next_result(self) -> Any:
+        """Parse the next result.
+
+        Returns:
+            The decoded result.
+
+        Raises:
+            StopIteration: If all the results have been parsed. The members after
+                the results are parsed then as well.
+            ValueError: If the body is not a valid JSON page.
+        """
+        if not self._in_results:
+            raise StopIteration
+        if self._peek() == "]":
+            self._pos += 1
+            self._in_results = False
+            if self._expect(",}") == ",":
+                self._members()
+            else:
+                self.done = True
+            raise StopIteration
+        if not self._first_result:
+            self._expect(",")
+        self._first_result = False
+        return self._value()
+
+    def __iter__(self) -> Iterator[Any]:
+        while True:
+            try:
+                yield self.next_result()
+            except StopIteration:
+                return
+
+
+def _local_name(tag: str) -> str:
+    """Return the tag of an XML element without its namespace."""
+    return tag.rpartition("}")[2]
+
+
+def _paging_value(text: Optional[str]) -> Any:
+    try:
+        return int(text)
+    except (TypeError, ValueError):
+        return text
+
+
+class StreamingXMLPageParser:
+    """Incremental parser of an XML page of search results.
+
+    The body is fed chunk by chunk to an `xml.etree.ElementTree.XMLPullParser`. Each
+    result element is returned once it is complete and is then detached from the
+    tree, as are the other processed elements, so the memory used does not grow
+    with the amount of results. The namespaces of the tags are ignored.
+
+    The results are the children of the "Results" element of the root, or else
+    the children of the root other than the paging fields. The paging fields
+    ("TotalNrOfResults", "StartIndex" and "NrOfResults") are collected in `fields`,
+    as integers, whether they come before or after the results.
+
+    Attributes:
+        fields: The paging fields of the page, read so far.
+        done: If true, the whole page has been parsed.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        """Initialize a StreamingXMLPageParser.
+
+        Args:
+            chunks: The body of the response, as chunks of bytes.
+        """
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._chunks = iter(chunks)
+        self._parser: Optional[ET.XMLPullParser] = ET.XMLPullParser(
+            events=("start", "end")
+        )
+        self._events: Deque[Tuple[str, ET.Element]] = deque()
+        # The elements which are currently open, the root first
+        self._path: List[ET.Element] = []
+
+    def _next_event(self) -> Optional[Tuple[str, ET.Element]]:
+        """Return the next parse event, None at the end of the body."""
+        while not self._events:
+            if self._parser is None:
+                return None
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                # Raises a ParseError if the document is incomplete
+                self._parser.close()
+                self._events.extend(self._parser.read_events())
+                self._parser = None
+            else:
+                self._parser.feed(chunk)
+                self._events.extend(self._parser.read_events())
+        return self._events.popleft()
+
+    def _is_result(self, element: ET.Element, depth: int) -> bool:
+        if depth == 2:
+            return _local_name(self._path[1].tag) == RESULTS_KEY
+        if depth == 1:
+            name = _local_name(element.tag)
+            return name != RESULTS_KEY and name not in PAGING_FIELDS
+        return False
+
+    def _read(self, until_result_start: bool) -> Optional[ET.Element]:
+        """Parse up to the end of the next result, or else up to its start.
+
+        Returns:
+            The complete result element, None if parsed up to the start of a result
+            or the end of the page.
+        """
+        while True:
+            event = self._next_event()
+            if event is None:
+                self.done = True
+                return None
+            kind, element = event
+            if kind == "start":
+                self._path.append(element)
+                if until_result_start and self._is_result(element, len(self._path) - 1):
+                    return None
+                continue
+
+            self._path.pop()
+            depth = len(self._path)
+            if depth == 0:
+                self.done = True
+            elif self._is_result(element, depth):
+                # Detach the result, the tree only holds the open elements
+                self._path[-1].remove(element)
+                return element
+            elif depth == 1:
+                self._path[-1].remove(element)
+                name = _local_name(element.tag)
+                if name in PAGING_FIELDS:
+                    self.fields[name] = _paging_value(element.text)
+
+    def start(self):
+        """Parse the page up to the start of the first result.
+
+        Raises:
+            xml.etree.ElementTree.ParseError: If the body is not well-formed XML.
+        """
+        self._read(until_result_start=True)
+
+    def next_result(self) -> ET.Element:
+        """Parse the next result.
+
+        Returns:
+            The result element, which is no longer part of the tree.
+
+        Raises:
+            StopIteration: If all the results have been parsed. The fields after
+                the results are parsed then as well.
+            xml.etree.ElementTree.ParseError: If the body is not well-formed XML.
+        """
+        element = self._read(until_result_start=False)
+        if element is None:
+            raise StopIteration
+        return element
+
+    def __iter__(self) -> Iterator[ET.Element]:
+        while True:
+            try:
+                yield self.next_result()
+            except StopIteration:
+                return
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from collections.abc import MutableSequence
+from typing import Any, Iterator
+
+
+def wrap(value: Any) -> Any:
+    """Return a view of a decoded JSON dict or list, other values as is."""
+    if isinstance(value, dict):
+        return DictView(value)
+    if isinstance(value, list):
+        return ListView(value)
+    return value
+
+
+def unwrap(value: Any) -> Any:
+    """Return the decoded JSON value of a view, other values as is."""
+    if isinstance(value, (DictView, ListView)):
+        return value._data
+    return value
+
+
+class DictView:
+    """A lazy attribute view of a decoded JSON object.
+
+    The keys of the dict are accessed as attributes, e.g. `record.Internal.RecordId`.
+    The nested objects and arrays are only wrapped in a view when accessed, so
+    reading a single field of a large result costs no more than reading that field.
+    Setting an attribute updates the underlying dict.
+
+    Keys which aren't valid identifiers can be accessed via indexing, e.g.
+    `record.Dynamic["dc_title-nl"]`.
+    """
+
+    __slots__ = ("_data",)
+    __hash__ = None
+
+    def __init__(self, data: dict):
+        object.__setattr__(self, "_data", data)
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__") or name == "_data":
+            raise AttributeError(name)
+        try:
+            return wrap(self._data[name])
+        except KeyError:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            ) from None
+
+    def __setattr__(self, name: str, value: Any):
+        self._data[name] = unwrap(value)
+
+    def __delattr__(self, name: str):
+        try:
+            del self._data[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getitem__(self, key: str) -> Any:
+        return wrap(self._data[key])
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def __dir__(self) -> list:
+        return sorted(set(super().__dir__()) | set(self._data))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, DictView):
+            return self._data == other._data
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._data!r})"
+
+    def __reduce__(self):
+        return type(self), (self._data,)
+
+    def to_dict(self) -> dict:
+        """Return the decoded JSON object, which is shared with the view."""
+        return self._data
+
+
+class ListView(MutableSequence):
+    """A lazy view of a decoded JSON array, its objects are wrapped when accessed."""
+
+    __slots__ = ("_data",)
+    __hash__ = None
+
+    def __init__(self, data: list):
+        self._data = data
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ListView(self._data[index])
+        return wrap(self._data[index])
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self._data[index] = [unwrap(item) for item in value]
+        else:
+            self._data[index] = unwrap(value)
+
+    def __delitem__(self, index):
+        del self._data[index]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[Any]:
+        return map(wrap, self._data)
+
+    def insert(self, index: int, value: Any):
+        self._data.insert(index, unwrap(value))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ListView):
+            return self._data == other._data
+        if isinstance(other, list):
+            return self._data == [unwrap(item) for item in other]
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._data!r})"
+
+    def __reduce__(self):
+        return type(self), (self._data,)
+
+    def to_list(self) -> list:
+        """Return the decoded JSON array, which is shared with the view."""
+        return self._data
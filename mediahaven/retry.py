@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Optional
+
+from requests.exceptions import ConnectionError, Timeout
+from requests.models import Response
+
+# Statuses indicating a transient overload of MediaHaven.
+DEFAULT_RETRY_STATUSES = frozenset({429, 502, 503, 504})
+# Idempotent methods which are safe to retry.
+DEFAULT_RETRY_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE"})
+
+
+class RetryPolicy:
+    """Policy to retry requests which failed due to a transient error.
+
+    Only idempotent methods are retried by default, POST requests can be retried
+    by enabling `retry_post`. The delay between the attempts grows exponentially
+    and is randomized ("full jitter") to avoid synchronized retries of clients. A
+    "Retry-After" header sent by MediaHaven takes precedence over the backoff. The
+    delay it asks for is never shortened: if it is longer than `max_backoff`, the
+    response is returned without retrying.
+
+    Attributes:
+        max_retries: The maximum amount of retries per request.
+        backoff_factor: The delay before the first retry, in seconds.
+        max_backoff: The maximum delay between two attempts, in seconds. A longer
+            "Retry-After" stops the retries.
+        jitter: If true, randomize the delay between zero and the backoff.
+        total_timeout: The maximum time in seconds spent on a request, including
+            the retries. No retry is done if it would exceed this budget.
+        retry_statuses: The response statuses which are retried.
+        retry_methods: The HTTP methods which are retried.
+        respect_retry_after: If true, honour the "Retry-After" response header.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 30,
+        jitter: bool = True,
+        total_timeout: Optional[float] = None,
+        retry_statuses: Iterable[int] = DEFAULT_RETRY_STATUSES,
+        retry_methods: Iterable[str] = DEFAULT_RETRY_METHODS,
+        retry_post: bool = False,
+        respect_retry_after: bool = True,
+    ):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.total_timeout = total_timeout
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_methods = frozenset(m.upper() for m in retry_methods)
+        if retry_post:
+            self.retry_methods |= {"POST"}
+        self.respect_retry_after = respect_retry_after
+
+    def is_retryable_method(self, method: str) -> bool:
+        return method.upper() in self.retry_methods
+
+    def is_retryable_response(self, response: Response) -> bool:
+        return response.status_code in self.retry_statuses
+
+    def is_retryable_exception(self, exception: Exception) -> bool:
+        """Check if a failed attempt is retried.
+
+        The httpx errors of the async client are passed as the requests exception
+        of the same failure, see `mediahaven.http2.to_requests_exception`.
+        """
+        return isinstance(exception, (ConnectionError, Timeout))
+
+    def get_backoff(self, retry: int, response: Optional[Response] = None) -> float:
+        """Calculate the delay before the given retry.
+
+        Args:
+            retry: The number of the retry, starting from 1.
+            response: The response of the failed attempt, if any.
+
+        Returns:
+            The delay in seconds. The delay of a "Retry-After" header can be longer
+            than `max_backoff`, see `exceeds_max_backoff`.
+        """
+        if response is not None and self.respect_retry_after:
+            retry_after = self.parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                # A retry before the time asked by MediaHaven is throttled again
+                return retry_after
+
+        backoff = min(self.backoff_factor * (2 ** (retry - 1)), self.max_backoff)
+        if self.jitter:
+            backoff = random.uniform(0, backoff)
+        return backoff
+
+    def exceeds_max_backoff(self, delay: float) -> bool:
+        """Check if the delay before a retry is too long to retry."""
+        return delay > self.max_backoff
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Parse the value of a "Retry-After" header.
+
+        Args:
+            value: The delay in seconds or an HTTP date.
+
+        Returns:
+            The delay in seconds or None if the value could not be parsed.
+        """
+        if not value:
+            return None
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(retry_at.timestamp() - time.time(), 0)
+
+
+class RetryStats:
+    """Thread-safe counters of the retries executed by a client.
+
+    Attributes:
+        retries: The amount of retries executed.
+        retried_requests: The amount of requests which needed at least one retry.
+        exhausted: The amount of requests which still failed after retrying.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.retried_requests = 0
+        self.exhausted = 0
+
+    def record(self, retries: int, exhausted: bool = False):
+        """Record the outcome of a request.
+
+        Args:
+            retries: The amount of retries executed for the request.
+            exhausted: If the request still failed after retrying.
+        """
+        if not retries and not exhausted:
+            return
+        with self._lock:
+            self.retries += retries
+            if retries:
+                self.retried_requests += 1
+            if exhausted:
+                self.exhausted += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "retries": self.retries,
+                "retried_requests": self.retried_requests,
+                "exhausted": self.exhausted,
+            }
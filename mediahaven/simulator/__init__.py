@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from mediahaven.simulator.dataset import SyntheticDataset
+from mediahaven.simulator.server import (
+    Faults,
+    Latency,
+    Simulator,
+    SimulatorServer,
+)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+import re
+from collections.abc import Sequence
+from typing import Optional
+
+# A query on a single batch_id or on RecordIds, which can be answered without a scan.
+_BATCH_QUERY = re.compile(r'^\+?\(batch_id:"?BATCH(\d+)"?\)$', re.IGNORECASE)
+_RECORD_ID_QUERY = re.compile(r'^\+?\(RecordId:"?([0-9a-f ]+?)"?\)$', re.IGNORECASE)
+
+_WORDS = (
+    "archive broadcast camera concert debate documentary festival film interview "
+    "journal lecture museum news orchestra parliament portrait radio recording "
+    "report season series sport studio television theatre tour video"
+).split()
+
+_ORGANISATIONS = ("VRT", "Amsab", "KBR", "Letterenhuis", "STAM", "Vlaams Parlement")
+
+
+class SyntheticDataset(Sequence):
+    """A lazy, reproducible dataset of MediaHaven records.
+
+    A record is generated from the seed and its index whenever it is requested, so
+    a dataset of millions of records takes no memory. The RecordId encodes the
+    seed and the index, so a record can be looked up by its ID.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        seed: int = 0,
+        batch_size: int = 1000,
+        description_words: int = 50,
+    ):
+        """Initialize a SyntheticDataset.
+
+        Args:
+            size: The amount of records.
+            seed: The seed of the generated values.
+            batch_size: The amount of records with the same "batch_id".
+            description_words: The amount of words of the description, to tune the
+                size of a record.
+        """
+        self.size = size
+        self.seed = seed
+        self.batch_size = batch_size
+        self.description_words = description_words
+        self._prefix = f"{seed & 0xFFFFFFFF:08x}"
+
+    def __len__(self) -> int:
+        return self.size
+
+    def record_id(self, index: int) -> str:
+        return f"{self._prefix}{index:024x}"
+
+    def index_of(self, record_id: str) -> Optional[int]:
+        """Return the index of the record with the ID, if part of the dataset."""
+        if len(record_id) != 32 or not record_id.startswith(self._prefix):
+            return None
+        try:
+            index = int(record_id[8:], 16)
+        except ValueError:
+            return None
+        return index if index < self.size else None
+
+    def select(self, query: Optional[str]) -> Optional[Sequence]:
+        """Return the indexes of the records matching an indexed query.
+
+        Only a query on one "batch_id" or on "RecordId"s is indexed.
+
+        Returns:
+            The indexes of the matching records, or None if the query needs a scan.
+        """
+        query = (query or "").strip()
+        match = _BATCH_QUERY.match(query)
+        if match:
+            start = int(match.group(1)) * self.batch_size
+            return range(min(start, self.size), min(start + self.batch_size, self.size))
+        match = _RECORD_ID_QUERY.match(query)
+        if match:
+            indexes = (self.index_of(record_id) for record_id in match.group(1).split())
+            return sorted({index for index in indexes if index is not None})
+        return None
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.size))]
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("dataset index out of range")
+        return self._generate(index)
+
+    def _generate(self, index: int) -> dict:
+        rng = random.Random(self.seed * 1_000_003 + index)
+        record_id = self.record_id(index)
+        title = " ".join(rng.choice(_WORDS) for _ in range(4)).capitalize()
+        return {
+            "Internal": {
+                "RecordId": record_id,
+                "MediaObjectId": record_id,
+                "IsInIngestSpace": False,
+                "IsDeleted": False,
+                "OrganisationName": rng.choice(_ORGANISATIONS),
+            },
+            "Descriptive": {
+                "Title": title,
+                "Description": " ".join(
+                    rng.choice(_WORDS) for _ in range(self.description_words)
+                ),
+                "CreationDate": f"{rng.randint(1950, 2023)}-"
+                f"{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            },
+            "Dynamic": {
+                "PID": "".join(
+                    rng.choice("0123456789abcdefghjkmnpqrstvwxz") for _ in range(10)
+                ),
+                "batch_id": f"BATCH{index // self.batch_size:06d}",
+            },
+            "Technical": {
+                "Duration": rng.randint(10, 7200),
+                "Width": rng.choice((720, 1280, 1920)),
+            },
+        }
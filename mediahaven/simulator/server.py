@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import gzip
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Mapping, Optional, Sequence
+from urllib.parse import urlsplit
+
+from mediahaven.mediahaven import API_PATH
+from mediahaven.mocks.backend import FakeMediaHaven, FakeResponse
+from mediahaven.simulator.dataset import SyntheticDataset
+
+# Minimum size in bytes of a response body before it is gzipped.
+COMPRESSION_MIN_SIZE = 1024
+
+logger = logging.getLogger(__name__)
+
+
+def endpoint_name(method: str, url: str) -> str:
+    """Return the name of the endpoint of a request, used to configure it.
+
+    The names are "auth", "records.search", "records.count", "records.get",
+    "records.write", "field-definitions" and "organisations".
+    """
+    path = urlsplit(url).path
+    if path.startswith("/auth/"):
+        return "auth"
+    resource, _, item = path[len(API_PATH) :].partition("/")
+    if resource != "records":
+        return resource
+    if method == "HEAD":
+        return "records.count"
+    if method == "GET":
+        return "records.get" if item else "records.search"
+    return "records.write"
+
+
+class Latency:
+    """A distribution of the latency of a response, in seconds."""
+
+    KINDS = {
+        "const": 1,
+        "uniform": 2,
+        "normal": 2,
+        "lognormal": 2,
+        "exponential": 1,
+    }
+
+    def __init__(self, kind: str, *params: float):
+        """Initialize a Latency.
+
+        Args:
+            kind: One of "const" (seconds), "uniform" (min, max), "normal" (mean,
+                stddev), "lognormal" (mu, sigma of the underlying normal) or
+                "exponential" (mean).
+            *params: The parameters of the distribution.
+
+        Raises:
+            ValueError: If the kind or the amount of parameters is invalid.
+        """
+        if self.KINDS.get(kind) != len(params):
+            raise ValueError(f"Invalid latency distribution: {kind}{params}")
+        self.kind = kind
+        self.params = params
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        """Parse a latency specification like "lognormal:-3,0.5"."""
+        kind, _, params = spec.partition(":")
+        return cls(kind, *(float(param) for param in params.split(",") if param))
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "const":
+            latency = self.params[0]
+        elif self.kind == "uniform":
+            latency = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            latency = rng.gauss(*self.params)
+        elif self.kind == "lognormal":
+            latency = rng.lognormvariate(*self.params)
+        else:
+            latency = rng.expovariate(1 / self.params[0])
+        return max(latency, 0.0)
+
+
+class Faults:
+    """The rates of the injected overload responses."""
+
+    def __init__(
+        self, rate_limited: float = 0.0, unavailable: float = 0.0, retry_after=1
+    ):
+        """Initialize Faults.
+
+        Args:
+            rate_limited: The fraction (0-1) of requests answered with a 429.
+            unavailable: The fraction (0-1) of requests answered with a 503.
+            retry_after: The value of the "Retry-After" header of the faults.
+        """
+        self.rate_limited = rate_limited
+        self.unavailable = unavailable
+        self.retry_after = retry_after
+
+
+class Simulator:
+    """A FakeMediaHaven with latency and fault injection.
+
+    The latency and the faults are configured per endpoint name (see
+    `endpoint_name`), "*" configures the default. The simulator can be served over
+    HTTP with a SimulatorServer or used in-process via an `InMemoryTransport`.
+    """
+
+    def __init__(
+        self,
+        fake: FakeMediaHaven,
+        latencies: Optional[Mapping[str, Latency]] = None,
+        faults: Optional[Mapping[str, Faults]] = None,
+        compress_responses: bool = True,
+        seed: Optional[int] = None,
+    ):
+        """Initialize a Simulator.
+
+        Args:
+            fake: The fake answering the requests.
+            latencies: The latency distribution per endpoint name.
+            faults: The injected faults per endpoint name.
+            compress_responses: If true, gzip the large response bodies when the
+                client accepts it.
+            seed: The seed of the latencies and the faults.
+        """
+        self.fake = fake
+        self.latencies: Dict[str, Latency] = dict(latencies or {})
+        self.faults: Dict[str, Faults] = dict(faults or {})
+        self.compress_responses = compress_responses
+        self.stats: Dict[int, int] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _config(self, config: Mapping, endpoint: str):
+        return config.get(endpoint, config.get("*"))
+
+    def __call__(
+        self,
+        method: str,
+        url: str,
+        headers: Mapping[str, str],
+        body: Optional[bytes],
+    ) -> FakeResponse:
+        """Answer a request after the simulated latency, or with a fault."""
+        endpoint = endpoint_name(method, url)
+        latency = self._config(self.latencies, endpoint)
+        faults = self._config(self.faults, endpoint)
+        with self._lock:
+            delay = latency.sample(self._rng) if latency else 0.0
+            draw = self._rng.random()
+        if delay:
+            time.sleep(delay)
+
+        if faults is not None and draw < faults.rate_limited + faults.unavailable:
+            status = 429 if draw < faults.rate_limited else 503
+            response = (
+                status,
+                {"Retry-After": str(faults.retry_after), "Content-Type": "text/plain"},
+                b"Too Many Requests" if status == 429 else b"Service Unavailable",
+            )
+        else:
+            response = self.fake(method, url, headers, body)
+
+        status, response_headers, content = response
+        with self._lock:
+            self.stats[status] = self.stats.get(status, 0) + 1
+        accept_encoding = {k.lower(): v for k, v in headers.items()}.get(
+            "accept-encoding", ""
+        )
+        if (
+            self.compress_responses
+            and "gzip" in accept_encoding
+            and len(content) >= COMPRESSION_MIN_SIZE
+        ):
+            content = gzip.compress(content, compresslevel=1)
+            response_headers = {**response_headers, "Content-Encoding": "gzip"}
+        return status, response_headers, content
+
+
+class SimulatorRequestHandler(BaseHTTPRequestHandler):
+    """Passes the HTTP requests to the simulator of the server."""
+
+    protocol_version = "HTTP/1.1"
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else None
+        url = f"http://{self.headers.get('Host', 'localhost')}{self.path}"
+        status, headers, content = self.server.simulator(
+            self.command, url, dict(self.headers), body
+        )
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(content)
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_DELETE = _handle
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    """HTTP server serving a simulated MediaHaven, one thread per connection.
+
+    Example:
+        >>> server = SimulatorServer(Simulator(FakeMediaHaven()))
+        >>> threading.Thread(target=server.serve_forever, daemon=True).start()
+        >>> client = MediaHaven(server.url, grant)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, simulator: Simulator, host: str = "127.0.0.1", port: int = 0):
+        """Initialize a SimulatorServer.
+
+        Args:
+            simulator: The simulator answering the requests.
+            host: The host to listen on.
+            port: The port to listen on, 0 picks a free port.
+        """
+        super().__init__((host, port), SimulatorRequestHandler)
+        self.simulator = simulator
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+
+def _parse_endpoint_options(options: List[str], parse) -> dict:
+    """Parse "[endpoint=]value" options, without an endpoint the default is set."""
+    config = {}
+    for option in options:
+        endpoint, _, value = option.rpartition("=")
+        config[endpoint or "*"] = parse(value)
+    return config
+
+
+def _parse_faults(value: str) -> Faults:
+    rate_limited, _, unavailable = value.partition(",")
+    return Faults(float(rate_limited or 0), float(unavailable or 0))
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """Run a simulated MediaHaven server until interrupted."""
+    parser = argparse.ArgumentParser(
+        prog="python -m mediahaven.simulator",
+        description="Serve a simulated MediaHaven v2 REST API for load tests.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--token-lifetime",
+        type=float,
+        default=3600,
+        help="The lifetime of the access tokens in seconds.",
+    )
+    parser.add_argument(
+        "--latency",
+        action="append",
+        default=[],
+        metavar="[ENDPOINT=]KIND:PARAMS",
+        help='E.g. "records.search=lognormal:-3,0.5" or "const:0.01".',
+    )
+    parser.add_argument(
+        "--faults",
+        action="append",
+        default=[],
+        metavar="[ENDPOINT=]RATE_429,RATE_503",
+        help='The fraction of injected 429 and 503 responses, e.g. "0.01,0.005".',
+    )
+    parser.add_argument("--no-compression", action="store_true")
+    args = parser.parse_args(argv)
+
+    fake = FakeMediaHaven(
+        dataset=SyntheticDataset(args.records, seed=args.seed),
+        token_lifetime=args.token_lifetime,
+    )
+    simulator = Simulator(
+        fake,
+        latencies=_parse_endpoint_options(args.latency, Latency.parse),
+        faults=_parse_endpoint_options(args.faults, _parse_faults),
+        compress_responses=not args.no_compression,
+        seed=args.seed,
+    )
+    server = SimulatorServer(simulator, args.host, args.port)
+    print(f"Serving a simulated MediaHaven with {args.records} records at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Not available on Windows
+    fcntl = None
+
+
+class TokenStore(ABC):
+    """Abstract class representing a store shared by grants to save the token.
+
+    The lock of the store is used to coordinate the requesting and refreshing of
+    the token between the grants using the same store.
+    """
+
+    @abstractmethod
+    def load(self) -> Optional[dict]:
+        """Load the stored token.
+
+        Returns:
+            The token or None if no token has been stored.
+        """
+        pass
+
+    @abstractmethod
+    def save(self, token: dict):
+        """Save the token.
+
+        Args:
+            token: The token to save.
+        """
+        pass
+
+    @abstractmethod
+    def lock(self):
+        """Return a context manager which holds the lock of the store."""
+        pass
+
+
+class MemoryTokenStore(TokenStore):
+    """Token store shared by the grants within one process."""
+
+    def __init__(self):
+        self._token: Optional[dict] = None
+        self._lock = threading.RLock()
+
+    def load(self) -> Optional[dict]:
+        return self._token
+
+    def save(self, token: dict):
+        self._token = token
+
+    def lock(self):
+        return self._lock
+
+
+class FileTokenStore(TokenStore):
+    """Token store on disk shared by the processes on a node.
+
+    The token is saved as JSON in the given file, readable by the owner only. The
+    store is locked via an exclusive `flock` on a separate lock file, next to the
+    token file.
+    """
+
+    def __init__(self, path: str):
+        """Initialize a FileTokenStore.
+
+        Args:
+            path: The path of the file to save the token in.
+
+        Raises:
+            NotImplementedError: If file locking is not supported on this platform.
+        """
+        if fcntl is None:
+            raise NotImplementedError("File locking is not supported")
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        # The flock is held per process, the thread lock makes it reentrant
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._lock_file = None
+
+    def load(self) -> Optional[dict]:
+        try:
+            with open(self.path, encoding="utf8") as token_file:
+                return json.load(token_file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self, token: dict):
+        # Write to a temporary file first so readers never see a partial token
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".token-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf8") as token_file:
+                json.dump(token, token_file)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        with self._thread_lock:
+            if self._depth == 0:
+                self._lock_file = open(self.lock_path, "a")
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                    self._lock_file.close()
+                    self._lock_file = None
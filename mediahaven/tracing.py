@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import functools
+import inspect
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Optional
+from urllib.parse import urlsplit
+
+try:
+    from opentelemetry import propagate, trace
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:  # pragma: no cover
+    trace = None
+
+# The name of the instrumentation scope of the spans.
+TRACER_NAME = "mediahaven"
+
+
+class Tracing:
+    """Opens OpenTelemetry spans for the operations and requests of a client.
+
+    A span is opened per high-level operation, like `Records.search` or a full
+    scan via `as_generator`, with a child span per HTTP request and token refresh.
+    The trace context is propagated to MediaHaven via the request headers.
+    """
+
+    def __init__(self, tracer_provider=None, propagate_context: bool = True):
+        """Initialize Tracing.
+
+        Args:
+            tracer_provider: The OpenTelemetry tracer provider, by default the
+                global one.
+            propagate_context: If true, add the trace context headers (e.g.
+                "traceparent") to the requests.
+
+        Raises:
+            ImportError: If opentelemetry-api is not installed.
+        """
+        if trace is None:
+            raise ImportError(
+                "Tracing requires opentelemetry-api, install it via "
+                "'mediahaven[tracing]'"
+            )
+        self.tracer = trace.get_tracer(TRACER_NAME, tracer_provider=tracer_provider)
+        self.propagate_context = propagate_context
+
+    def span(self, name: str, attributes: Optional[dict] = None):
+        """Open an internal span, which is the current span within the context."""
+        return self.tracer.start_as_current_span(
+            name, kind=SpanKind.INTERNAL, attributes=attributes
+        )
+
+    def start_span(self, name: str, attributes: Optional[dict] = None):
+        """Start an internal span which does not become the current span.
+
+        Use `use_span` to make it the parent of the spans opened within a context,
+        e.g. in a generator which can't keep a span current while suspended.
+        """
+        return self.tracer.start_span(
+            name, kind=SpanKind.INTERNAL, attributes=attributes
+        )
+
+    @staticmethod
+    def use_span(span) -> ContextManager:
+        return trace.use_span(span, end_on_exit=False)
+
+    def request_span(self, method: str, url: str, resend_count: int = 0):
+        """Open the client span of one HTTP request."""
+        parts = urlsplit(url)
+        attributes = {
+            "http.request.method": method,
+            "url.full": f"{parts.scheme}://{parts.netloc}{parts.path}",
+            "server.address": parts.hostname or "",
+        }
+        if parts.port:
+            attributes["server.port"] = parts.port
+        if resend_count:
+            attributes["http.request.resend_count"] = resend_count
+        return self.tracer.start_as_current_span(
+            method or "HTTP", kind=SpanKind.CLIENT, attributes=attributes
+        )
+
+    @staticmethod
+    def set_response(span, status_code: int):
+        """Set the status of the response on the span of the request."""
+        span.set_attribute("http.response.status_code", status_code)
+        if status_code >= 400:
+            span.set_status(Status(StatusCode.ERROR))
+            span.set_attribute("error.type", str(status_code))
+
+    def inject(self, headers: dict) -> dict:
+        """Add the trace context of the current span to the headers."""
+        if self.propagate_context:
+            propagate.inject(headers)
+        return headers
+
+
+def span(tracing: Optional[Tracing], name: str, attributes: Optional[dict] = None):
+    """Open a span if tracing is enabled, else a no-op context."""
+    if tracing is None:
+        return nullcontext()
+    return tracing.span(name, attributes)
+
+
+def client_tracing(resource) -> Optional[Tracing]:
+    """Return the tracing of the client of a resource, if enabled."""
+    tracing = getattr(getattr(resource, "mh_client", None), "tracing", None)
+    return tracing if isinstance(tracing, Tracing) else None
+
+
+def use_span(operation_span) -> ContextManager:
+    """Make the span, if any, the parent of the spans opened within the context."""
+    if operation_span is None:
+        return nullcontext()
+    return Tracing.use_span(operation_span)
+
+
+def start_scan_span(resource):
+    """Start the span of a scan over the pages of a search, if its client traces.
+
+    The span is not the current span, see `Tracing.start_span`. End it with
+    `end_scan_span`.
+    """
+    tracing = client_tracing(resource)
+    if tracing is None:
+        return None
+    return tracing.start_span(
+        f"mediahaven.{resource.name}.scan", {"mediahaven.resource": resource.name}
+    )
+
+
+def end_scan_span(scan_span, results: int):
+    if scan_span is not None:
+        scan_span.set_attribute("mediahaven.results", results)
+        scan_span.end()
+
+
+async def _end_after(tracing: Tracing, operation_span, awaitable):
+    try:
+        with tracing.use_span(operation_span):
+            return await awaitable
+    finally:
+        operation_span.end()
+
+
+def traced(operation: str) -> Callable:
+    """Decorate a resource method to run in a span if its client traces.
+
+    The span is named "mediahaven.<resource name>.<operation>". When a sync method
+    returns an awaitable, e.g. as it is inherited by an async resource, the span
+    ends once the awaitable is done.
+    """
+
+    def decorator(method: Callable) -> Callable:
+        if inspect.iscoroutinefunction(method):
+
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                tracing = client_tracing(self)
+                if tracing is None:
+                    return await method(self, *args, **kwargs)
+                with tracing.span(
+                    f"mediahaven.{self.name}.{operation}",
+                    {"mediahaven.resource": self.name},
+                ):
+                    return await method(self, *args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            tracing = client_tracing(self)
+            if tracing is None:
+                return method(self, *args, **kwargs)
+            operation_span = tracing.start_span(
+                f"mediahaven.{self.name}.{operation}",
+                {"mediahaven.resource": self.name},
+            )
+            try:
+                with tracing.use_span(operation_span):
+                    result = method(self, *args, **kwargs)
+            except BaseException:
+                operation_span.end()
+                raise
+            if inspect.isawaitable(result):
+                return _end_after(tracing, operation_span, result)
+            operation_span.end()
+            return result
+
+        return wrapper
+
+    return decorator
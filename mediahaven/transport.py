@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import base64
+import json
+import threading
+from collections import defaultdict, deque
+from http.client import responses as reasons
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Mapping, Optional, Tuple, Union
+
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.exceptions import ConnectionError
+from requests.models import PreparedRequest, Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3 import HTTPResponse
+
+from mediahaven.deadline import Timeout
+
+# Answers a request given its method, URL, headers and body with the status, the
+# headers and the body of the response.
+Handler = Callable[
+    [str, str, Mapping[str, str], Optional[bytes]], Tuple[int, Mapping[str, str], bytes]
+]
+
+
+def _request_body(request: PreparedRequest) -> Optional[bytes]:
+    """Return the body of the prepared request as bytes."""
+    body = request.body
+    if body is None or isinstance(body, bytes):
+        return body
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    if hasattr(body, "read"):
+        return body.read()
+    return b"".join(
+        chunk.encode("utf-8") if isinstance(chunk, str) else chunk for chunk in body
+    )
+
+
+def build_response(
+    request: PreparedRequest,
+    status: int,
+    headers: Mapping[str, str],
+    body: bytes,
+    adapter: Optional[BaseAdapter] = None,
+) -> Response:
+    """Build a requests response as if it was received over the network.
+
+    The body is wrapped in a urllib3 response, so it is decoded and streamed
+    like the body of a real response.
+
+    Args:
+        request: The request which the response answers.
+        status: The status code.
+        headers: The response headers.
+        body: The response body, as sent on the wire.
+        adapter: The adapter which sent the request.
+
+    Returns:
+        The requests response.
+    """
+    raw = HTTPResponse(
+        body=BytesIO(body),
+        headers=dict(headers),
+        status=status,
+        reason=reasons.get(status, ""),
+        preload_content=False,
+        decode_content=True,
+    )
+    response = Response()
+    response.status_code = status
+    response.reason = raw.reason
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.raw = raw
+    response.url = request.url
+    response.request = request
+    response.connection = adapter
+    return response
+
+
+class InMemoryTransport(BaseAdapter):
+    """Transport adapter which answers the requests in-process.
+
+    Every request is passed to the handler, e.g. a
+    `mediahaven.mocks.backend.FakeMediaHaven`, without any network I/O. This
+    allows to run the full client stack offline.
+    """
+
+    def __init__(self, handler: Handler):
+        """Initialize an InMemoryTransport.
+
+        Args:
+            handler: The callable answering the requests.
+        """
+        super().__init__()
+        self.handler = handler
+
+    def send(
+        self,
+        request: PreparedRequest,
+        stream: bool = False,
+        timeout: Timeout = None,
+        verify=True,
+        cert=None,
+        proxies=None,
+    ) -> Response:
+        status, headers, body = self.handler(
+            request.method, request.url, request.headers, _request_body(request)
+        )
+        response = build_response(request, status, headers, body, self)
+        if not stream:
+            response.content
+        return response
+
+    def close(self):
+        pass
+
+
+class RecordingTransport(BaseAdapter):
+    """Transport adapter which records the exchanges of another transport.
+
+    The recordings can be replayed with a ReplayTransport. The request headers are
+    not recorded, but the recorded responses of the token requests contain the
+    tokens, so the recordings should be kept private.
+    """
+
+    def __init__(
+        self,
+        transport: Optional[BaseAdapter] = None,
+        path: Optional[Union[str, Path]] = None,
+    ):
+        """Initialize a RecordingTransport.
+
+        Args:
+            transport: The transport to record, by default a pooled HTTPAdapter.
+            path: If set, append every exchange as a JSON line to this file.
+        """
+        super().__init__()
+        self.transport = transport or HTTPAdapter()
+        self.path = Path(path) if path else None
+        self.recordings: List[dict] = []
+        self._lock = threading.Lock()
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        response = self.transport.send(request, **kwargs)
+        # The body is recorded without the transfer encoding
+        ignored_headers = {"transfer-encoding"}
+        if response.raw is not None and not response._content_consumed:
+            # Read the body while it is still encoded as it was received
+            body = response.raw.read(decode_content=False)
+        else:
+            # The transport already read and decoded the body
+            body = response.content or b""
+            ignored_headers.update({"content-encoding", "content-length"})
+        headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name.lower() not in ignored_headers
+        }
+        recording = {
+            "method": request.method,
+            "url": request.url,
+            "status": response.status_code,
+            "headers": headers,
+            "body": base64.b64encode(body).decode("ascii"),
+        }
+        with self._lock:
+            self.recordings.append(recording)
+            if self.path is not None:
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps(recording) + "\n")
+        response.close()
+        return build_response(request, response.status_code, headers, body, self)
+
+    def close(self):
+        self.transport.close()
+
+
+class ReplayTransport(BaseAdapter):
+    """Transport adapter which answers the requests with recorded responses.
+
+    The responses recorded for the same method and URL are replayed in order. The
+    last one is repeated once the others have been used.
+    """
+
+    def __init__(self, recordings: Union[str, Path, List[dict]]):
+        """Initialize a ReplayTransport.
+
+        Args:
+            recordings: The recordings of a RecordingTransport or the path of the
+                file it wrote them to.
+        """
+        super().__init__()
+        if isinstance(recordings, (str, Path)):
+            with open(recordings, encoding="utf-8") as f:
+                recordings = [json.loads(line) for line in f if line.strip()]
+        self._recordings: Dict[Tuple[str, str], Deque[dict]] = defaultdict(deque)
+        for recording in recordings:
+            key = (recording["method"], recording["url"])
+            self._recordings[key].append(recording)
+        self._lock = threading.Lock()
+
+    def send(self, request: PreparedRequest, stream: bool = False, **kwargs):
+        with self._lock:
+            queue = self._recordings.get((request.method, request.url))
+            if not queue:
+                raise ConnectionError(
+                    f"No recorded response for {request.method} {request.url}",
+                    request=request,
+                )
+            recording = queue.popleft() if len(queue) > 1 else queue[0]
+        response = build_response(
+            request,
+            recording["status"],
+            recording["headers"],
+            base64.b64decode(recording["body"]),
+            self,
+        )
+        if not stream:
+            response.content
+        return response
+
+    def close(self):
+        pass
@@ -6,9 +6,15 @@ setup(
     license="GPL",
     author="Mattias",
     author_email="mattias.poppe@meemoo.be",
-    packages=find_packages(exclude=["tests"]),
+    packages=find_packages(exclude=["tests", "tests.*", "benchmarks"]),
     long_description=open("README.md", encoding="utf8").read(),
     zip_safe=False,
     setup_requires=["wheel"],
     install_requires=["oauthlib>=3.1.0,<4", "requests_oauthlib>=1.3.0,<2", "requests>=2,<3"],
+    extras_require={
+        "async": ["httpx>=0.23,<1"],
+        "http2": ["httpx[http2]>=0.23,<1"],
+        "tracing": ["opentelemetry-api>=1.0,<2"],
+        "orjson": ["orjson>=3,<4"],
+    },
 )
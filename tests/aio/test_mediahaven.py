@@ -0,0 +1,379 @@
+import asyncio
+import gzip
+import json
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+from oauthlib.oauth2.rfc6749.errors import InvalidGrantError
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+from mediahaven.aio import AsyncMediaHaven
+from mediahaven.aio.oauth2 import AsyncOAuth2Grant
+from mediahaven.aio.resources.base_resource import (
+    AsyncMediaHavenPageObjectJSON,
+    AsyncMediaHavenPageObjectXML,
+)
+from mediahaven.compression import CompressionPolicy
+from mediahaven.deadline import DeadlineExceededError
+from mediahaven.hooks import OBJECT_CREATED, REQUEST_END
+from mediahaven.mediahaven import AcceptFormat, MediaHavenException
+from mediahaven.oauth2 import RefreshTokenError
+from mediahaven.retry import RetryPolicy
+from mediahaven.tracing import Tracing
+
+RECORDS = [
+    {"Internal": {"RecordId": str(i)}, "Dynamic": {"PID": f"pid{i}"}} for i in range(5)
+]
+
+
+class AsyncOAuth2GrantTest(AsyncOAuth2Grant):
+    def __init__(self, handler):
+        super().__init__("https://localhost/", "id", "secret")
+        self._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        self.refreshes = 0
+
+    async def request_token(self):
+        self._set_token({"access_token": "access_token", "token_type": "Bearer"})
+
+    async def refresh_token(self, expired_token=None):
+        self.refreshes += 1
+        self._set_token(
+            {
+                "access_token": "access_token_after_refresh",
+                "token_type": "Bearer",
+                "expires_in": 7200,
+            }
+        )
+
+
+class FakeBackend:
+    """Answers the requests of the async client with a fixed set of records."""
+
+    def __init__(self):
+        self.requests = []
+        self.statuses = []
+        self.errors = []
+        # The headers of the responses with the statuses
+        self.headers = {}
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.errors:
+            raise self.errors.pop(0)("Failed", request=request)
+        if self.statuses:
+            return httpx.Response(self.statuses.pop(0), headers=self.headers)
+        params = parse_qs(request.url.query.decode())
+        path = request.url.path.split("/mediahaven-rest-api/v2/")[1]
+        if request.method == "HEAD":
+            return httpx.Response(200, headers={"Result-Count": str(len(RECORDS))})
+        if request.method == "GET" and path == "records":
+            start = int(params.get("startIndex", ["0"])[0])
+            nr = int(params.get("nrOfResults", ["2"])[0])
+            results = RECORDS[start : start + nr]
+            if "xml" in request.headers["Accept"]:
+                pids = "".join(
+                    f"<Result><Dynamic><PID>{record['Dynamic']['PID']}</PID></Dynamic>"
+                    "</Result>"
+                    for record in results
+                )
+                body = (
+                    f"<Response><TotalNrOfResults>{len(RECORDS)}</TotalNrOfResults>"
+                    f"<StartIndex>{start}</StartIndex>"
+                    f"<NrOfResults>{len(results)}</NrOfResults>"
+                    f"<Results>{pids}</Results></Response>"
+                )
+                return httpx.Response(200, text=body)
+            return httpx.Response(
+                200,
+                json={
+                    "TotalNrOfResults": len(RECORDS),
+                    "StartIndex": start,
+                    "NrOfResults": len(results),
+                    "Results": results,
+                },
+            )
+        if request.method == "GET" and path.startswith("records/"):
+            record_id = path.split("/")[1]
+            for record in RECORDS:
+                if record["Internal"]["RecordId"] == record_id:
+                    return httpx.Response(200, json=record)
+            return httpx.Response(404, json={"error": "not found"})
+        if request.method == "DELETE":
+            return httpx.Response(204)
+        if request.method in ("POST", "PUT"):
+            return httpx.Response(204)
+        return httpx.Response(405)
+
+
+class TestAsyncMediaHaven:
+    @pytest.fixture()
+    def backend(self):
+        return FakeBackend()
+
+    @pytest.fixture()
+    def client(self, backend):
+        grant = AsyncOAuth2GrantTest(backend)
+        asyncio.run(grant.request_token())
+        return AsyncMediaHaven("https://localhost/", grant)
+
+    def test_get(self, client, backend):
+        # Act
+        record = asyncio.run(client.records.get("1"))
+
+        # Assert
+        assert record.Dynamic.PID == "pid1"
+        request = backend.requests[0]
+        assert request.headers["Authorization"] == "Bearer access_token"
+        assert request.headers["Accept"] == AcceptFormat.JSON.value
+        assert request.url.query == b"includeDeleted=false"
+
+    def test_get_404(self, client):
+        with pytest.raises(MediaHavenException) as mhe:
+            asyncio.run(client.records.get("unknown"))
+        assert mhe.value.status_code == 404
+
+    def test_count(self, client, backend):
+        # Act
+        count = asyncio.run(client.records.count('+(RecordId:"1 2")'))
+
+        # Assert
+        assert count == 5
+        assert backend.requests[0].url.query == b"q=%2B%28RecordId%3A%221%202%22%29"
+
+    def test_search_as_generator(self, client, backend):
+        # Arrange
+        async def search():
+            page = await client.records.search(q="*", nrOfResults=2)
+            assert isinstance(page, AsyncMediaHavenPageObjectJSON)
+            return [record.Dynamic.PID async for record in page.as_generator()]
+
+        # Act
+        pids = asyncio.run(search())
+
+        # Assert
+        assert pids == [f"pid{i}" for i in range(5)]
+        assert len(backend.requests) == 3
+        assert client.metrics.pages.value(("records",)) == 3
+        assert client.metrics.records_yielded.value(("records",)) == 5
+
+    def test_search_as_generator_deadline_counts_from_creation(self, client, backend):
+        # Arrange
+        async def search():
+            page = await client.records.search(q="*", nrOfResults=2)
+            generator = page.as_generator(deadline=0.01)
+            await asyncio.sleep(0.02)
+            return [record.Dynamic.PID async for record in generator]
+
+        # Act and Assert
+        # The budget started when the generator was created, not when iterated
+        with pytest.raises(DeadlineExceededError):
+            asyncio.run(search())
+        assert len(backend.requests) == 1
+
+    def test_search_xml_as_generator(self, client, backend):
+        # Arrange
+        async def search():
+            page = await client.records.search(
+                accept_format=AcceptFormat.XML, q="*", nrOfResults=2
+            )
+            assert isinstance(page, AsyncMediaHavenPageObjectXML)
+            return [
+                record.find("Dynamic/PID").text async for record in page.as_generator()
+            ]
+
+        # Act
+        pids = asyncio.run(search())
+
+        # Assert
+        assert pids == [f"pid{i}" for i in range(5)]
+        assert len(backend.requests) == 3
+        assert backend.requests[-1].headers["Accept"] == AcceptFormat.XML.value
+        assert client.metrics.records_yielded.value(("records",)) == 5
+
+    def test_update_json(self, client, backend):
+        # Act
+        result = asyncio.run(client.records.update("1", json={"Title": "title"}))
+
+        # Assert
+        assert result is True
+        assert backend.requests[0].method == "POST"
+        assert json.loads(backend.requests[0].content) == {"Title": "title"}
+
+    def test_update_xml_compressed(self, client, backend):
+        # Arrange
+        client.request_compression = CompressionPolicy(min_size=10)
+        xml = "<Record>" + "<Title>title</Title>" * 100 + "</Record>"
+
+        # Act
+        asyncio.run(client.records.update("1", xml=xml))
+
+        # Assert
+        request = backend.requests[0]
+        assert request.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(request.content).decode() == xml
+        assert client.compression_stats.request_bytes == len(xml)
+        assert client.compression_stats.request_wire_bytes == len(request.content)
+
+    def test_update_xml(self, client, backend):
+        # Act
+        asyncio.run(client.records.update("1", xml="<Title/>"))
+
+        # Assert
+        assert backend.requests[0].headers["content-type"] == "application/xml"
+        assert backend.requests[0].content == b"<Title/>"
+
+    def test_upload_complex_file_via_url(self, client, backend):
+        # Act
+        asyncio.run(client.records.upload_complex_file_via_url("https://file"))
+
+        # Assert
+        request = backend.requests[0]
+        assert "multipart/form-data" in request.headers["content-type"]
+        assert b'name="publish"\r\n\r\nFalse' in request.content
+
+    def test_publish_and_delete(self, client, backend):
+        # Act
+        published = asyncio.run(client.records.publish("1", reason="reason"))
+        deleted = asyncio.run(client.records.delete("1", reason="reason"))
+
+        # Assert
+        assert published is True
+        assert deleted is True
+        assert json.loads(backend.requests[1].content) == {"Reason": "reason"}
+
+    def test_token_expired_refresh(self, client, backend):
+        # Arrange
+        client.grant.oauth_client._expires_at = 1
+
+        # Act
+        asyncio.run(client.records.get("1"))
+
+        # Assert
+        assert client.grant.refreshes == 1
+        assert (
+            backend.requests[0].headers["Authorization"]
+            == "Bearer access_token_after_refresh"
+        )
+
+    def test_token_expired_refresh_error(self, client):
+        # Arrange
+        async def refresh_token(expired_token=None):
+            raise InvalidGrantError
+
+        client.grant.oauth_client._expires_at = 1
+        client.grant.refresh_token = refresh_token
+
+        # Act and Assert
+        with pytest.raises(RefreshTokenError):
+            asyncio.run(client.records.get("1"))
+
+    def test_retry(self, client, backend):
+        # Arrange
+        client.retry_policy = RetryPolicy(backoff_factor=0)
+        backend.statuses = [503, 429]
+
+        # Act
+        record = asyncio.run(client.records.get("1"))
+
+        # Assert
+        assert record.Dynamic.PID == "pid1"
+        assert len(backend.requests) == 3
+        assert client.retry_stats.retries == 2
+
+    def test_retry_after_exceeds_max_backoff(self, client, backend):
+        # Arrange
+        client.retry_policy = RetryPolicy(max_backoff=30)
+        backend.statuses = [429]
+        backend.headers = {"Retry-After": "120"}
+
+        # Act
+        with pytest.raises(MediaHavenException) as mhe:
+            asyncio.run(client.records.get("1"))
+
+        # Assert
+        assert mhe.value.status_code == 429
+        assert len(backend.requests) == 1
+
+    @pytest.mark.parametrize(
+        "error,retried",
+        [
+            (httpx.ConnectError, True),
+            (httpx.ReadTimeout, True),
+            (httpx.RemoteProtocolError, True),
+            (httpx.LocalProtocolError, False),
+            (httpx.UnsupportedProtocol, False),
+        ],
+    )
+    def test_retry_exception(self, client, backend, error, retried):
+        # Arrange
+        client.retry_policy = RetryPolicy(backoff_factor=0)
+        backend.errors = [error]
+
+        # Act
+        if retried:
+            asyncio.run(client.records.get("1"))
+        else:
+            with pytest.raises(error):
+                asyncio.run(client.records.get("1"))
+
+        # Assert
+        # The same errors are retried as by the sync client
+        assert len(backend.requests) == (2 if retried else 1)
+        assert client.retry_stats.retries == (1 if retried else 0)
+
+    def test_hooks(self, client, backend):
+        # Arrange
+        client.retry_policy = RetryPolicy(backoff_factor=0)
+        backend.statuses = [503]
+        events = []
+        client.hooks.register(REQUEST_END, events.append)
+        client.hooks.register(OBJECT_CREATED, events.append)
+
+        # Act
+        asyncio.run(client.records.search(q="*", nrOfResults=2))
+
+        # Assert
+        assert len(events) == 2
+        event = events[0]
+        assert events[1] is event
+        assert event.resource == "records"
+        assert event.status_code == 200
+        assert event.retries == 1
+        assert event.response_bytes > 0
+        assert event.object_type == "AsyncMediaHavenPageObjectJSON"
+        assert event.results == 2
+        assert {"wait", "auth", "ttfb", "backoff", "decode", "build"} <= set(
+            event.phases
+        )
+
+    def test_tracing(self, backend):
+        # Arrange
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        grant = AsyncOAuth2GrantTest(backend)
+        asyncio.run(grant.request_token())
+        client = AsyncMediaHaven(
+            "https://localhost/", grant, tracing=Tracing(tracer_provider=provider)
+        )
+
+        # Act
+        asyncio.run(client.records.get("1"))
+        asyncio.run(client.records.count("*"))
+
+        # Assert
+        get, get_request, count, count_request = sorted(
+            exporter.get_finished_spans(), key=lambda span: span.start_time
+        )
+        assert get.name == "mediahaven.records.get"
+        assert get_request.parent.span_id == get.context.span_id
+        # Count is inherited from the sync resource
+        assert count.name == "mediahaven.records.count"
+        assert count_request.name == "HEAD"
+        assert count_request.parent.span_id == count.context.span_id
+        assert "traceparent" in backend.requests[0].headers
@@ -0,0 +1,163 @@
+import asyncio
+import time
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from mediahaven.aio.oauth2 import AsyncROPCGrant
+from mediahaven.oauth2 import NoTokenError, RequestTokenError
+
+
+def _token(access_token: str, expires_in: int = 7200) -> dict:
+    return {
+        "access_token": access_token,
+        "refresh_token": f"refresh_{access_token}",
+        "token_type": "bearer",
+        "expires_in": expires_in,
+    }
+
+
+class TestAsyncROPCGrant:
+    @pytest.fixture()
+    def requests_sent(self):
+        return []
+
+    @pytest.fixture()
+    def grant(self, requests_sent):
+        async def handler(request: httpx.Request):
+            requests_sent.append(request)
+            await asyncio.sleep(0.01)
+            body = parse_qs(request.content.decode())
+            if request.url.path == "/auth/ropc.php":
+                if body["password"] == ["wrong"]:
+                    return httpx.Response(400, json={"error": "invalid_client"})
+                return httpx.Response(200, json=_token("access"))
+            if request.url.path == "/auth/unavailable":
+                return httpx.Response(503)
+            count = len(requests_sent)
+            return httpx.Response(200, json=_token(f"refreshed_{count}"))
+
+        grant = AsyncROPCGrant("https://localhost/", "id", "secret")
+        grant._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return grant
+
+    def test_request_token(self, grant, requests_sent):
+        # Act
+        asyncio.run(grant.request_token("user", "password"))
+
+        # Assert
+        body = parse_qs(requests_sent[0].content.decode())
+        assert body["grant_type"] == ["password"]
+        assert body["username"] == ["user"]
+        assert body["client_id"] == ["id"]
+        assert body["client_secret"] == ["secret"]
+        assert grant.token["access_token"] == "access"
+        assert grant.token["expires_at"] > time.time()
+
+    def test_request_token_error(self, grant):
+        with pytest.raises(RequestTokenError):
+            asyncio.run(grant.request_token("user", "wrong"))
+
+    def test_get_session_no_token(self, grant):
+        with pytest.raises(NoTokenError):
+            asyncio.run(grant._get_session())
+
+    def test_refresh_token_single_flight(self, grant, requests_sent):
+        # Arrange
+        async def refresh_concurrently():
+            await grant.request_token("user", "password")
+            expired_token = grant.token
+            await asyncio.gather(
+                *(grant.refresh_token(expired_token) for _ in range(10))
+            )
+
+        # Act
+        asyncio.run(refresh_concurrently())
+
+        # Assert
+        assert len(requests_sent) == 2
+        body = parse_qs(requests_sent[1].content.decode())
+        assert body["grant_type"] == ["refresh_token"]
+        assert body["refresh_token"] == ["refresh_access"]
+        assert grant.token["access_token"] == "refreshed_2"
+
+    def test_get_session_refresh_within_margin(self, grant, requests_sent):
+        # Arrange
+        grant.refresh_margin = 30
+
+        async def get_session():
+            await grant.request_token("user", "password")
+            grant.token["expires_at"] = time.time() + 10
+            await grant._get_session()
+
+        # Act
+        asyncio.run(get_session())
+
+        # Assert
+        assert len(requests_sent) == 2
+        assert grant.token["access_token"] == "refreshed_2"
+
+    def test_get_session_refresh_failure_cooldown(self, grant, requests_sent, caplog):
+        # Arrange
+        grant.refresh_margin = 30
+        grant.refresh_url = "https://localhost/auth/unavailable"
+
+        async def get_sessions():
+            await grant.request_token("user", "password")
+            grant.token["expires_at"] = time.time() + 10
+            for _ in range(3):
+                await grant._get_session()
+
+        # Act
+        asyncio.run(get_sessions())
+
+        # Assert
+        # Only one failed refresh within the cooldown, the token is kept
+        assert len(requests_sent) == 2
+        assert grant.token["access_token"] == "access"
+        assert "Ahead-of-expiry token refresh failed" in caplog.text
+
+    def test_get_session_lifetime_shorter_than_margin(self, grant, requests_sent):
+        # Arrange
+        grant.refresh_margin = 60
+
+        async def get_sessions():
+            await grant.request_token("user", "password")
+            grant.token.update(expires_in=30, expires_at=time.time() + 30)
+            for _ in range(10):
+                await grant._get_session()
+            # More than half of the lifetime has passed
+            grant.token["expires_at"] = time.time() + 10
+            await grant._get_session()
+
+        # Act
+        asyncio.run(get_sessions())
+
+        # Assert
+        # The just issued token is not renewed, only the half expired one
+        assert len(requests_sent) == 2
+        assert grant.token["access_token"] == "refreshed_2"
+
+    def test_add_token(self, grant):
+        # Arrange
+        asyncio.run(grant.request_token("user", "password"))
+
+        # Act
+        headers = grant._add_token("GET", "https://localhost/", {"Accept": "json"})
+
+        # Assert
+        assert headers == {"Accept": "json", "Authorization": "Bearer access"}
+
+
+def test_use_http2():
+    grant = AsyncROPCGrant("https://localhost/", "id", "secret")
+
+    # Act
+    grant.use_http2()
+
+    # Assert
+    assert grant.http2
+    assert grant.http_client._transport._pool._http2
+    with pytest.raises(RuntimeError):
+        grant.use_http2(False)
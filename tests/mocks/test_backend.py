@@ -0,0 +1,175 @@
+import json
+
+import pytest
+
+from mediahaven import MediaHaven
+from mediahaven.compression import CompressionPolicy
+from mediahaven.mediahaven import AcceptFormat, MediaHavenException
+from mediahaven.mocks.backend import FakeMediaHaven
+from mediahaven.oauth2 import ROPCGrant
+
+URL = "https://mediahaven.test/"
+
+RECORDS = [
+    {
+        "Internal": {"RecordId": str(i)},
+        "Dynamic": {"PID": f"pid{i}", "batch_id": "odd" if i % 2 else "even"},
+    }
+    for i in range(7)
+]
+
+
+@pytest.fixture()
+def fake():
+    return FakeMediaHaven(
+        records=RECORDS,
+        field_definitions=[{"Id": 1, "FlatKey": "Dynamic.PID", "Name": "PID"}],
+        organisations=[{"Id": "1", "Name": "Org", "ExternalId": "OR-1"}],
+    )
+
+
+@pytest.fixture()
+def client(fake):
+    grant = ROPCGrant(URL, "id", "secret", transport=fake.transport())
+    grant.request_token("user", "password")
+    return MediaHaven(URL, grant)
+
+
+class TestFakeMediaHaven:
+    def test_search_paging(self, client):
+        # Act
+        page = client.records.search(q="+(batch_id:odd)", nrOfResults=2)
+
+        # Assert
+        assert page.total_nr_of_results == 3
+        assert [r.Dynamic.PID for r in page.as_generator()] == ["pid1", "pid3", "pid5"]
+
+    @pytest.mark.parametrize(
+        "query,count",
+        [
+            ("*", 7),
+            ('+(RecordId:"1 2")', 2),
+            ("+(PID:pid*) -(batch_id:even)", 3),
+            ("pid4", 1),
+        ],
+    )
+    def test_count(self, client, query, count):
+        assert client.records.count(query) == count
+
+    def test_get_not_found(self, client):
+        with pytest.raises(MediaHavenException) as mhe:
+            client.records.get("unknown")
+        assert mhe.value.status_code == 404
+
+    def test_get_xml(self, client):
+        record = client.records.get("1", accept_format=AcceptFormat.XML)
+
+        assert "<PID>pid1</PID>" in record.raw_response
+
+    def test_raw_response_not_kept(self, client):
+        # Arrange
+        client = MediaHaven(URL, client.grant, keep_raw_response=False)
+
+        # Act
+        record = client.records.get("1")
+        page = client.records.search(q="*")
+
+        # Assert
+        assert record.raw_response is None
+        assert page.raw_response is None
+        assert record.Dynamic.PID == "pid1"
+
+    def test_update_and_delete(self, client, fake):
+        # Act
+        client.records.update("1", json={"Dynamic": {"PID": "json"}})
+        client.records.update(
+            "2", xml="<Record><Dynamic><PID>xml</PID></Dynamic></Record>"
+        )
+        client.records.delete("3")
+
+        # Assert
+        assert client.records.get("1").Dynamic.PID == "json"
+        assert client.records.get("2").Dynamic.PID == "xml"
+        assert client.records.count("*") == 6
+        assert fake.records["3"]["Internal"]["IsDeleted"]
+
+    def test_update_compressed(self, client, fake):
+        # Arrange
+        client.request_compression = CompressionPolicy(min_size=1)
+        title = "title " * 100
+
+        # Act
+        client.records.update("1", json={"Descriptive": {"Title": title}})
+
+        # Assert
+        assert fake.records["1"]["Descriptive"]["Title"] == title
+
+    def test_create_fragment(self, client):
+        # Act
+        fragment = client.records.create_fragment(
+            "1", "fragment", start_frames=0, end_frames=10
+        )
+
+        # Assert
+        assert fragment["Internal"]["MediaObjectId"] == "1"
+        assert client.records.get(fragment["Internal"]["FragmentId"])
+
+    def test_upload_complex_file_via_url(self, client):
+        # Act
+        record = client.records.upload_complex_file_via_url("https://file")
+
+        # Assert
+        assert record["Internal"]["FileUrl"] == "https://file"
+        assert record["Internal"]["IsInIngestSpace"]
+
+    def test_field_definitions_and_organisations(self, client):
+        assert client.fields.get("Dynamic.PID").Name == "PID"
+        assert client.organisations.get_by_external_id("OR-1").Name == "Org"
+        assert client.organisations.search(q="Org").total_nr_of_results == 1
+
+    def test_refresh_token(self, client):
+        # Arrange
+        client.grant.refresh_token()
+
+        # Act & Assert
+        assert client.records.count("*") == 7
+
+    def test_unauthorized(self, fake):
+        status, _, _ = fake("GET", f"{URL}mediahaven-rest-api/v2/records", {}, None)
+
+        assert status == 401
+
+    def test_expired_token(self, fake):
+        # Arrange
+        fake.token_lifetime = 0
+        _, _, body = fake(
+            "POST",
+            f"{URL}auth/ropc.php",
+            {"Content-Type": "application/x-www-form-urlencoded"},
+            b"grant_type=password&username=user&password=password",
+        )
+        token = json.loads(body)
+
+        # Act
+        status, _, _ = fake(
+            "GET",
+            f"{URL}mediahaven-rest-api/v2/records",
+            {"Authorization": f"Bearer {token['access_token']}"},
+            None,
+        )
+
+        # Assert
+        assert status == 401
+
+
+def test_client_transport(fake):
+    # Arrange
+    grant = ROPCGrant(URL, "id", "secret")
+    grant.session
+
+    # Act
+    client = MediaHaven(URL, grant, transport=fake.transport())
+    grant.request_token("user", "password")
+
+    # Assert
+    assert client.records.count("*") == 7
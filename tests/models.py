@@ -18,7 +18,7 @@ class OAuth2GrantTest(OAuth2Grant):
             "expires_in": 7200,
         }
 
-    def refresh_token(self):
+    def refresh_token(self, expired_token=None):
         self.token = {
             "refresh_token": "refresh_token_after_refresh",
             "token_type": "bearer",
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from mediahaven.mocks.backend import FakeMediaHaven
+from mediahaven.simulator.dataset import SyntheticDataset
+
+
+class TestSyntheticDataset:
+    def test_reproducible(self):
+        assert SyntheticDataset(10, seed=1)[5] == SyntheticDataset(10, seed=1)[5]
+        assert SyntheticDataset(10, seed=1)[5] != SyntheticDataset(10, seed=2)[5]
+
+    def test_index_of(self):
+        dataset = SyntheticDataset(10, seed=1)
+        record_id = dataset[7]["Internal"]["RecordId"]
+
+        assert dataset.index_of(record_id) == 7
+        assert dataset.index_of(SyntheticDataset(10, seed=2).record_id(7)) is None
+        assert dataset.index_of(dataset.record_id(10)) is None
+        assert dataset.index_of("unknown") is None
+
+    def test_getitem_out_of_range(self):
+        dataset = SyntheticDataset(10)
+
+        assert dataset[-1]["Internal"]["RecordId"] == dataset.record_id(9)
+        with pytest.raises(IndexError):
+            dataset[10]
+
+    @pytest.mark.parametrize(
+        "query,expected",
+        [
+            ("+(batch_id:BATCH000001)", range(10, 20)),
+            ("+(batch_id:BATCH000009)", range(25, 25)),
+            ("*", None),
+        ],
+    )
+    def test_select(self, query, expected):
+        assert SyntheticDataset(25, batch_size=10).select(query) == expected
+
+
+class TestFakeMediaHavenDataset:
+    @pytest.fixture()
+    def fake(self):
+        return FakeMediaHaven(
+            records=[{"Dynamic": {"batch_id": "BATCH000001"}}],
+            dataset=SyntheticDataset(1_000_000, batch_size=10),
+        )
+
+    def test_search_all_skips_to_start(self, fake):
+        # Act
+        status, _, body = fake._search_records(
+            "GET", {"startIndex": "999999", "nrOfResults": "5"}
+        )
+
+        # Assert
+        assert status == 200
+        page = json.loads(body)
+        assert page["TotalNrOfResults"] == 1_000_001
+        assert page["NrOfResults"] == 2
+        assert page["Results"][1]["Dynamic"]["batch_id"] == "BATCH000001"
+
+    def test_search_selected(self, fake):
+        status, headers, _ = fake._search_records(
+            "HEAD", {"q": "+(batch_id:BATCH000001)"}
+        )
+
+        # 10 records of the dataset and the added one
+        assert headers["Result-Count"] == "11"
+
+    def test_write_copies_record(self, fake):
+        # Arrange
+        dataset = fake.dataset
+        record_id = dataset.record_id(3)
+
+        # Act
+        status, _, _ = fake._records("DELETE", record_id, {}, {}, b"")
+
+        # Assert
+        assert status == 204
+        assert fake.records[record_id]["Internal"]["IsDeleted"]
+        assert not dataset[3]["Internal"]["IsDeleted"]
+        _, headers, _ = fake._search_records("HEAD", {"q": "*"})
+        assert headers["Result-Count"] == "1000000"
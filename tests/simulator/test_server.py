@@ -0,0 +1,147 @@
+import gzip
+import random
+import threading
+
+import pytest
+
+from mediahaven import MediaHaven
+from mediahaven.mediahaven import MediaHavenException
+from mediahaven.mocks.backend import FakeMediaHaven
+from mediahaven.oauth2 import ROPCGrant
+from mediahaven.retry import RetryPolicy
+from mediahaven.simulator import (
+    Faults,
+    Latency,
+    Simulator,
+    SimulatorServer,
+    SyntheticDataset,
+)
+from mediahaven.simulator.server import _parse_endpoint_options, endpoint_name
+
+API_URL = "http://localhost/mediahaven-rest-api/v2/"
+
+
+@pytest.mark.parametrize(
+    "method,url,expected",
+    [
+        ("POST", "http://localhost/auth/ropc.php", "auth"),
+        ("GET", f"{API_URL}records?q=*", "records.search"),
+        ("HEAD", f"{API_URL}records?q=*", "records.count"),
+        ("GET", f"{API_URL}records/1", "records.get"),
+        ("POST", f"{API_URL}records/1", "records.write"),
+        ("GET", f"{API_URL}organisations/1", "organisations"),
+    ],
+)
+def test_endpoint_name(method, url, expected):
+    assert endpoint_name(method, url) == expected
+
+
+class TestLatency:
+    @pytest.mark.parametrize(
+        "spec",
+        ["const:0.1", "uniform:0.05,0.15", "normal:0.1,0.01", "exponential:0.1"],
+    )
+    def test_sample(self, spec):
+        latency = Latency.parse(spec)
+
+        samples = [latency.sample(random.Random(i)) for i in range(100)]
+
+        assert all(sample >= 0 for sample in samples)
+        assert 0.05 < sum(samples) / len(samples) < 0.15
+
+    @pytest.mark.parametrize("spec", ["const", "uniform:1", "unknown:1"])
+    def test_parse_invalid(self, spec):
+        with pytest.raises(ValueError):
+            Latency.parse(spec)
+
+
+def test_parse_endpoint_options():
+    options = ["const:0.1", "records.get=uniform:0,1"]
+
+    config = _parse_endpoint_options(options, Latency.parse)
+
+    assert config["*"].kind == "const"
+    assert config["records.get"].params == (0, 1)
+
+
+class TestSimulator:
+    def test_faults(self):
+        # Arrange
+        simulator = Simulator(
+            FakeMediaHaven(),
+            faults={"*": Faults(rate_limited=0.5, unavailable=0.5, retry_after=3)},
+            seed=1,
+        )
+
+        # Act
+        status, headers, _ = simulator("GET", f"{API_URL}records", {}, None)
+
+        # Assert
+        assert status in (429, 503)
+        assert headers["Retry-After"] == "3"
+
+    def test_compress_responses(self):
+        # Arrange
+        fake = FakeMediaHaven(dataset=SyntheticDataset(100))
+        simulator = Simulator(fake)
+        token = fake._issue_token()[2].decode()
+        access_token = token.split('"access_token": "')[1].split('"')[0]
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Accept-Encoding": "gzip, deflate",
+        }
+
+        # Act
+        status, response_headers, body = simulator(
+            "GET", f"{API_URL}records?nrOfResults=50", headers, None
+        )
+
+        # Assert
+        assert status == 200
+        assert response_headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(body).startswith(b'{"NrOfResults": 50')
+
+
+class TestSimulatorServer:
+    @pytest.fixture()
+    def server(self, monkeypatch):
+        # The simulator is served over plain HTTP
+        monkeypatch.setenv("OAUTHLIB_INSECURE_TRANSPORT", "1")
+        fake = FakeMediaHaven(dataset=SyntheticDataset(10_000, seed=1))
+        simulator = Simulator(
+            fake,
+            latencies={"*": Latency("const", 0.001)},
+            faults={"records.get": Faults(rate_limited=0.3, retry_after=0)},
+            seed=1,
+        )
+        server = SimulatorServer(simulator)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+
+    def test_client(self, server):
+        # Arrange
+        grant = ROPCGrant(server.url, "id", "secret")
+        grant.request_token("user", "password")
+        client = MediaHaven(
+            server.url,
+            grant,
+            retry_policy=RetryPolicy(max_retries=10, backoff_factor=0.001),
+        )
+
+        # Act
+        count = client.records.count("*")
+        page = client.records.search(q="*", nrOfResults=100, startIndex=9950)
+        record_id = page.page_result.Results[0].Internal.RecordId
+        records = [client.records.get(record_id) for _ in range(10)]
+
+        # Assert
+        assert count == 10_000
+        assert page.nr_of_results == 50
+        assert all(r.Internal.RecordId == record_id for r in records)
+        assert server.simulator.stats[429] > 0
+        assert client.compression_stats.saved_bytes > 0
+        with pytest.raises(MediaHavenException):
+            client.records.get("unknown")
@@ -0,0 +1,147 @@
+import json
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from requests.models import Response
+
+from mediahaven.deadline import DeadlineExceededError, current_deadline
+from mediahaven.mediahaven import RAW_RESPONSE_ATTRIBUTE
+from mediahaven.mocks.base_resource import MediaHavenPageObjectJSONMock
+from mediahaven.resources.base_resource import (
+    AcceptFormat,
+    MediaHavenPageObjectJSON,
+    MediaHavenSingleObjectJSON,
+)
+
+
+def _json_response(payload) -> Response:
+    response = Response()
+    response.status_code = 200
+    response.encoding = "utf-8"
+    response._content = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    return response
+
+
+class TestRawResponse:
+    def test_single_object(self):
+        # Arrange
+        response = _json_response({"Dynamic": {"dc_title": "Één"}})
+
+        # Act
+        single_object = MediaHavenSingleObjectJSON(response)
+
+        # Assert
+        assert single_object._raw_response is response.content
+        assert single_object.raw_response == response.text
+
+    def test_page_object_not_kept(self):
+        # Arrange
+        response = _json_response(
+            {"TotalNrOfResults": 1, "StartIndex": 0, "NrOfResults": 1, "Results": [{}]}
+        )
+        setattr(response, RAW_RESPONSE_ATTRIBUTE, False)
+
+        # Act
+        page = MediaHavenPageObjectJSON(response, None)
+
+        # Assert
+        assert page.raw_response is None
+        assert page.nr_of_results == 1
+
+
+class TestMediaHavenPageObjectJSON:
+    @pytest.fixture()
+    def resource(self):
+        return MagicMock()
+
+    def _page(self, resource, start_index, total=4, nr_of_results=2):
+        page = MediaHavenPageObjectJSONMock(
+            [{"Id": start_index + i} for i in range(nr_of_results)],
+            nr_of_results=nr_of_results,
+            start_index=start_index,
+            total_nr_of_results=total,
+        )
+        page._resource = resource
+        page._query_params = {"q": "query"}
+        return page
+
+    def test_next_page(self, resource):
+        # Arrange
+        page = self._page(resource, 0)
+
+        # Act
+        page.next_page()
+
+        # Assert
+        resource.search.assert_called_once_with(
+            accept_format=AcceptFormat.JSON, q="query", startIndex=2
+        )
+
+    def test_as_generator(self, resource):
+        # Arrange
+        resource.search.return_value = self._page(resource, 2)
+        page = self._page(resource, 0)
+
+        # Act
+        ids = [result.Id for result in page.as_generator()]
+
+        # Assert
+        assert ids == [0, 1, 2, 3]
+        assert resource.search.call_count == 1
+
+    def test_as_generator_deadline_applied_to_next_pages(self, resource):
+        # Arrange
+        deadlines = []
+
+        def search(**kwargs):
+            deadlines.append(current_deadline())
+            return self._page(resource, 2)
+
+        resource.search.side_effect = search
+        page = self._page(resource, 0)
+
+        # Act
+        list(page.as_generator(deadline=10))
+
+        # Assert
+        assert deadlines[0] is not None
+        assert 9 < deadlines[0].remaining() <= 10
+        assert current_deadline() is None
+
+    def test_as_generator_deadline_exceeded(self, resource):
+        # Arrange
+        def search(**kwargs):
+            current_deadline().check()
+
+        resource.search.side_effect = search
+        page = self._page(resource, 0)
+        generator = page.as_generator(deadline=0.01)
+
+        # Act
+        next(generator)
+        next(generator)
+        time.sleep(0.02)
+
+        # Assert
+        with pytest.raises(DeadlineExceededError):
+            next(generator)
+
+    def test_as_generator_deadline_counts_from_creation(self, resource):
+        # Arrange
+        def search(**kwargs):
+            current_deadline().check()
+
+        resource.search.side_effect = search
+        page = self._page(resource, 0)
+
+        # Act
+        generator = page.as_generator(deadline=0.01)
+        time.sleep(0.02)
+        next(generator)
+        next(generator)
+
+        # Assert
+        # The budget started when the generator was created, not when iterated
+        with pytest.raises(DeadlineExceededError):
+            next(generator)
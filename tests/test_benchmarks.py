@@ -0,0 +1,183 @@
+from benchmarks import harness
+from benchmarks.harness import REFERENCE, Metric
+
+
+def test_run_quick():
+    # Act
+    metrics = harness.run(["page_object_json", "memory_per_record"], quick=True)
+
+    # Assert
+    names = [metric.name for metric in metrics]
+    assert names == [
+        REFERENCE,
+        "page_object_json[10]",
+        "page_object_json[100]",
+        "memory_per_record",
+        "memory_per_record[no_raw]",
+    ]
+    assert all(metric.value > 0 for metric in metrics)
+
+
+def test_save_and_load_baseline(tmp_path):
+    # Arrange
+    path = tmp_path / "baseline.json"
+    metrics = [Metric("parse", 1.0, "s")]
+
+    # Act
+    harness.save_baseline(path, metrics, {"s": 0.5})
+    baseline = harness.load_baseline(path)
+
+    # Assert
+    assert baseline["thresholds"] == {"s": 0.5}
+    assert baseline["metrics"] == {"parse": {"value": 1.0, "unit": "s"}}
+    assert harness.load_baseline(tmp_path / "missing.json") == {}
+
+
+def test_compare():
+    # Arrange
+    baseline = {
+        "thresholds": {"s": 0.2, "records/s": 0.2, "bytes": 0.1},
+        "metrics": {
+            REFERENCE: {"value": 1.0, "unit": "s"},
+            "fast": {"value": 1.0, "unit": "s"},
+            "slow": {"value": 1.0, "unit": "s"},
+            "throughput": {"value": 100.0, "unit": "records/s"},
+            "memory": {"value": 100.0, "unit": "bytes"},
+        },
+    }
+    # This machine is twice as slow as the one of the baseline
+    metrics = [
+        Metric(REFERENCE, 2.0, "s"),
+        Metric("fast", 2.2, "s"),
+        Metric("slow", 3.0, "s"),
+        Metric("throughput", 30.0, "records/s", higher_is_better=True),
+        Metric("memory", 105.0, "bytes"),
+        Metric("new", 1.0, "s"),
+    ]
+
+    # Act
+    results = {
+        metric.name: (base, regression)
+        for metric, base, regression in harness.compare(metrics, baseline)
+    }
+
+    # Assert
+    assert results[REFERENCE] == (1.0, None)
+    assert results["fast"] == (2.0, None)
+    assert results["slow"][0] == 2.0
+    assert results["slow"][1] == 0.5
+    assert results["throughput"][0] == 50.0
+    assert round(results["throughput"][1], 2) == 0.67
+    assert results["memory"] == (100.0, None)
+    assert results["new"] == (None, None)
+
+
+def test_compare_metric_threshold_and_reference():
+    # Arrange
+    baseline = {
+        "metrics": {
+            REFERENCE: {"value": 1.0, "unit": "s"},
+            "noisy": {"value": 1.0, "unit": "s", "threshold": 1.0},
+            "drifted": {"value": 1.0, "unit": "s", "threshold": 0.1},
+        },
+    }
+    # The machine was three times slower while measuring "drifted"
+    metrics = [
+        Metric(REFERENCE, 1.0, "s"),
+        Metric("noisy", 1.9, "s"),
+        Metric("drifted", 3.1, "s", reference=3.0),
+    ]
+
+    # Act
+    results = {
+        metric.name: (base, regression)
+        for metric, base, regression in harness.compare(metrics, baseline)
+    }
+
+    # Assert
+    assert results["noisy"] == (1.0, None)
+    assert results["drifted"] == (3.0, None)
+
+
+def test_noise_thresholds():
+    # Arrange
+    rounds = [
+        [
+            Metric(REFERENCE, reference, "s"),
+            Metric("stable", 1.0 * reference, "s", reference=reference),
+            Metric("jittery", 1.0 + noisy / 5, "s", reference=1.0),
+            Metric("noisy", 1.0 + noisy, "s", reference=1.0),
+            Metric("throughput", 100.0, "records/s", higher_is_better=True),
+        ]
+        for reference, noisy in [(1.0, 0.0), (2.0, 0.5), (1.0, 0.0)]
+    ]
+
+    # Act
+    metrics, thresholds, informational = harness.noise_thresholds(rounds)
+
+    # Assert
+    assert [(metric.name, metric.value) for metric in metrics] == [
+        (REFERENCE, 1.0),
+        ("stable", 1.0),
+        ("jittery", 1.0),
+        ("noisy", 1.0),
+        ("throughput", 100.0),
+    ]
+    assert thresholds == {
+        "stable": harness.MIN_THRESHOLD,
+        "jittery": harness.NOISE_MARGIN * 0.1,
+        "noisy": harness.MAX_THRESHOLD,
+        # Faster relative to the slower reference of the second run
+        "throughput": harness.MIN_THRESHOLD,
+    }
+    # A threshold of twice the noise of 50% would miss any regression
+    assert informational == ["noisy"]
+
+
+def test_best_comparison():
+    # Arrange
+    baseline = {
+        "metrics": {
+            REFERENCE: {"value": 1.0, "unit": "s"},
+            "disturbed": {"value": 1.0, "unit": "s", "threshold": 0.1},
+            "regressed": {"value": 1.0, "unit": "s", "threshold": 0.1},
+        },
+    }
+    runs = [
+        [
+            Metric(REFERENCE, 1.0, "s"),
+            Metric("disturbed", disturbed, "s"),
+            Metric("regressed", 2.0, "s"),
+        ]
+        for disturbed in (2.0, 1.0)
+    ]
+
+    # Act
+    results = {
+        metric.name: (metric.value, regression)
+        for metric, _, regression in harness.best_comparison(runs, baseline)
+    }
+
+    # Assert
+    assert results["disturbed"] == (1.0, None)
+    assert results["regressed"] == (2.0, 1.0)
+
+
+def test_save_baseline_informational(tmp_path):
+    # Arrange
+    path = tmp_path / "baseline.json"
+    metrics = [Metric("stable", 1.0, "s"), Metric("noisy", 1.0, "s")]
+
+    # Act
+    harness.save_baseline(path, metrics, {}, {"stable": 0.2}, ["noisy"])
+    baseline = harness.load_baseline(path)
+
+    # Assert
+    assert baseline["metrics"]["stable"] == {
+        "value": 1.0,
+        "unit": "s",
+        "threshold": 0.2,
+    }
+    assert harness.is_informational(baseline, "noisy")
+    assert not harness.is_informational(baseline, "stable")
+    assert not harness.is_informational(baseline, "missing")
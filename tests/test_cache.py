@@ -0,0 +1,62 @@
+from requests.models import Response
+
+from mediahaven.cache import ValidatorCache
+
+
+def _response(headers: dict, content: bytes = b"{}") -> Response:
+    response = Response()
+    response.status_code = 200
+    response.headers.update(headers)
+    response._content = content
+    return response
+
+
+class TestValidatorCache:
+    def test_store_and_get(self):
+        cache = ValidatorCache()
+        key = ("https://localhost/records/1?", "application/json")
+
+        cache.store(key, _response({"ETag": '"v1"'}))
+
+        entry = cache.get(key)
+        assert entry.content == b"{}"
+        assert entry.conditional_headers() == {"If-None-Match": '"v1"'}
+
+    def test_store_without_validators_discards(self):
+        cache = ValidatorCache()
+        key = ("https://localhost/records/1?", "application/json")
+        cache.store(key, _response({"ETag": '"v1"'}))
+
+        cache.store(key, _response({}))
+
+        assert cache.get(key) is None
+
+    def test_evicts_least_recently_used(self):
+        cache = ValidatorCache(max_entries=2)
+        cache.store(("a", ""), _response({"ETag": "a"}))
+        cache.store(("b", ""), _response({"ETag": "b"}))
+        cache.get(("a", ""))
+
+        cache.store(("c", ""), _response({"ETag": "c"}))
+
+        assert cache.get(("b", "")) is None
+        assert cache.get(("a", "")) is not None
+        assert len(cache) == 2
+
+    def test_to_response(self):
+        cache = ValidatorCache()
+        key = ("a", "")
+        cache.store(
+            key,
+            _response({"ETag": '"v1"', "Content-Type": "application/json"}, b"[1]"),
+        )
+        not_modified = _response({"ETag": '"v1"', "Content-Length": "0", "Age": "5"})
+        not_modified.status_code = 304
+
+        response = cache.get(key).to_response(not_modified)
+
+        assert response.status_code == 200
+        assert response.json() == [1]
+        assert response.headers["Age"] == "5"
+        assert "Content-Length" not in response.headers
+        assert response.from_cache
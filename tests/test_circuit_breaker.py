@@ -0,0 +1,133 @@
+import pytest
+
+from mediahaven.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+    CircuitState,
+)
+
+
+def _record(breaker: CircuitBreaker, *outcomes):
+    for outcome in outcomes:
+        breaker.before_request()
+        breaker.record(outcome)
+
+
+class TestCircuitBreaker:
+    def test_stays_closed_below_minimum_calls(self):
+        # Arrange
+        breaker = CircuitBreaker(minimum_calls=5)
+
+        # Act
+        _record(breaker, False, False, False, False)
+
+        # Assert
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.failure_rate == 1
+
+    def test_opens_at_failure_rate(self):
+        # Arrange
+        breaker = CircuitBreaker("mh", failure_rate_threshold=0.5, minimum_calls=4)
+
+        # Act
+        _record(breaker, True, False, True, False)
+
+        # Assert
+        assert breaker.state == CircuitState.OPEN
+        with pytest.raises(CircuitOpenError) as error:
+            breaker.before_request()
+        assert error.value.name == "mh"
+        assert 0 < error.value.retry_after <= 30
+
+    def test_stays_closed_under_failure_rate(self):
+        # Arrange
+        breaker = CircuitBreaker(failure_rate_threshold=0.5, minimum_calls=4)
+
+        # Act
+        _record(breaker, True, False, True, True, False)
+
+        # Assert
+        assert breaker.state == CircuitState.CLOSED
+
+    def test_half_open_probe_success_closes(self):
+        # Arrange
+        breaker = CircuitBreaker(minimum_calls=1, open_duration=0)
+        _record(breaker, False)
+
+        # Act
+        assert breaker.state == CircuitState.HALF_OPEN
+        breaker.before_request()
+        with pytest.raises(CircuitOpenError):
+            # Only one probe at a time
+            breaker.before_request()
+        breaker.record(True)
+
+        # Assert
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.failure_rate == 0
+
+    def test_half_open_probe_failure_opens(self):
+        # Arrange
+        breaker = CircuitBreaker(minimum_calls=1, open_duration=0)
+        _record(breaker, False)
+        breaker.open_duration = 30
+
+        # Act
+        breaker._state = CircuitState.HALF_OPEN
+        breaker.before_request()
+        breaker.record(False)
+
+        # Assert
+        assert breaker.state == CircuitState.OPEN
+
+    def test_half_open_probe_without_outcome(self):
+        # Arrange
+        breaker = CircuitBreaker(minimum_calls=1, open_duration=0)
+        _record(breaker, False)
+
+        # Act
+        breaker.before_request()
+        breaker.record(None)
+
+        # Assert
+        assert breaker.state == CircuitState.HALF_OPEN
+        breaker.before_request()
+
+    @pytest.mark.parametrize(
+        "status,result", [(500, True), (503, True), (429, False), (404, False)]
+    )
+    def test_is_failure_status(self, status, result):
+        assert CircuitBreaker().is_failure_status(status) is result
+
+
+class TestCircuitBreakerRegistry:
+    def test_per_base_url(self):
+        # Arrange
+        registry = CircuitBreakerRegistry(minimum_calls=1)
+
+        # Act
+        records = registry.get("https://mh/", "records")
+        organisations = registry.get("https://mh/", "organisations")
+        other = registry.get("https://other/", "records")
+
+        # Assert
+        assert records is organisations
+        assert records is not other
+        assert records.minimum_calls == 1
+        assert registry.states() == {
+            "https://mh/": "closed",
+            "https://other/": "closed",
+        }
+
+    def test_per_resource(self):
+        # Arrange
+        registry = CircuitBreakerRegistry(per_resource=True)
+
+        # Act
+        records = registry.get("https://mh/", "records")
+        organisations = registry.get("https://mh/", "organisations")
+
+        # Assert
+        assert records is not organisations
+        assert records.name == "https://mh/records"
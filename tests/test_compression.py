@@ -0,0 +1,77 @@
+import gzip
+from unittest.mock import MagicMock
+
+import pytest
+
+from mediahaven.compression import (
+    ACCEPT_ENCODING,
+    CompressionPolicy,
+    CompressionStats,
+    response_wire_size,
+)
+from mediahaven.oauth2 import ROPCGrant
+
+
+class TestCompressionPolicy:
+    def test_encode_compresses(self):
+        policy = CompressionPolicy(min_size=10)
+        body = "<Title>title</Title>" * 100
+
+        data, compressed = policy.encode(body)
+
+        assert compressed
+        assert gzip.decompress(data) == body.encode()
+
+    def test_encode_small(self):
+        policy = CompressionPolicy(min_size=1024)
+
+        assert policy.encode("<Title/>") == (b"<Title/>", False)
+
+    def test_encode_incompressible(self):
+        policy = CompressionPolicy(min_size=1)
+
+        # Gzip adds a header to a body which can't be compressed
+        assert policy.encode(b"a") == (b"a", False)
+
+
+class TestCompressionStats:
+    def test_as_dict(self):
+        stats = CompressionStats()
+
+        stats.record_request(1000, 100)
+        stats.record_request(10, 10)
+        stats.record_response(5000, 500)
+
+        assert stats.as_dict() == {
+            "request_bytes": 1010,
+            "request_wire_bytes": 110,
+            "compressed_requests": 1,
+            "response_bytes": 5000,
+            "response_wire_bytes": 500,
+            "saved_bytes": 5400,
+        }
+
+
+@pytest.mark.parametrize(
+    "tell,headers,expected",
+    [
+        (100, {"Content-Length": "50"}, 100),
+        (None, {"Content-Length": "50"}, 50),
+        (None, {}, None),
+    ],
+)
+def test_response_wire_size(tell, headers, expected):
+    response = MagicMock(headers=headers)
+    if tell is None:
+        response.raw = None
+    else:
+        response.raw.tell.return_value = tell
+
+    assert response_wire_size(response) == expected
+
+
+def test_grant_negotiates_compression():
+    grant = ROPCGrant("https://localhost/", "id", "secret")
+
+    assert grant.session.headers["Accept-Encoding"] == ACCEPT_ENCODING
+    assert "gzip" in ACCEPT_ENCODING
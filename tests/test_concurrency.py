@@ -0,0 +1,225 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from mediahaven.concurrency import AIMDLimiter, latency_key
+from mediahaven.deadline import DeadlineExceededError, deadline
+
+
+class TestAIMDLimiter:
+    def test_invalid_limits(self):
+        with pytest.raises(ValueError):
+            AIMDLimiter(initial_limit=5, min_limit=10)
+
+    def test_try_acquire(self):
+        # Arrange
+        limiter = AIMDLimiter(initial_limit=2, min_limit=1)
+
+        # Act and Assert
+        assert limiter.try_acquire()
+        assert limiter.try_acquire()
+        assert not limiter.try_acquire()
+        assert limiter.in_flight == 2
+
+    def test_acquire_blocks_until_release(self):
+        # Arrange
+        limiter = AIMDLimiter(initial_limit=1)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            limiter.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+
+        # Act
+        thread.start()
+        assert not acquired.wait(0.05)
+        limiter.release()
+
+        # Assert
+        assert acquired.wait(1)
+        thread.join()
+
+    def test_additive_increase(self):
+        # Arrange
+        limiter = AIMDLimiter(initial_limit=2, max_limit=3)
+
+        # Act
+        for _ in range(10):
+            limiter.acquire()
+            limiter.release(0.1)
+
+        # Assert
+        assert limiter.limit == 3
+        assert [limit for _, limit in limiter.history] == [2, 3]
+
+    def test_multiplicative_decrease_on_overload(self):
+        # Arrange
+        limiter = AIMDLimiter(initial_limit=8, min_limit=3)
+
+        # Act
+        limiter.acquire()
+        limiter.release(0.1, overloaded=True)
+        limiter._last_decrease = 0
+        limiter.acquire()
+        limiter.release(0.1, overloaded=True)
+
+        # Assert
+        assert limiter.limit == 3
+        assert [limit for _, limit in limiter.history] == [8, 4, 3]
+
+    def test_decrease_once_per_congestion_event(self):
+        # Arrange
+        limiter = AIMDLimiter(initial_limit=8)
+        limiter._baselines[""] = 10
+
+        # Act
+        for _ in range(3):
+            limiter.acquire()
+            limiter.release(0.1, overloaded=True)
+
+        # Assert
+        assert limiter.limit == 4
+
+    def test_decrease_on_latency_spike(self):
+        # Arrange
+        limiter = AIMDLimiter(initial_limit=8, latency_tolerance=2)
+        limiter.acquire()
+        limiter.release(0.001)
+
+        # Act
+        time.sleep(0.002)
+        limiter.acquire()
+        limiter.release(0.5)
+
+        # Assert
+        assert limiter.limit == 4
+        # The spike only moves the baseline slowly
+        assert 0.001 < limiter.baseline_latencies[""] < 0.01
+
+    def test_baseline_per_key(self):
+        # Arrange
+        limiter = AIMDLimiter(initial_limit=8, latency_tolerance=2)
+
+        # Act
+        for _ in range(10):
+            limiter.acquire()
+            limiter.release(0.01, key="GET records/*")
+            limiter.acquire()
+            limiter.release(0.5, key="GET records")
+
+        # Assert
+        # The slow search pages are not spikes against the fast gets
+        limits = [limit for _, limit in limiter.history]
+        assert limits == sorted(limits)
+        assert limiter.baseline_latencies == {
+            "GET records/*": pytest.approx(0.01),
+            "GET records": pytest.approx(0.5),
+        }
+
+    def test_latency_shift_is_learned(self):
+        # Arrange
+        limiter = AIMDLimiter(initial_limit=8, min_limit=1, latency_tolerance=2)
+        limiter.acquire()
+        limiter.release(0.01)
+
+        # Act
+        for _ in range(500):
+            limiter._last_decrease = 0
+            limiter.acquire()
+            limiter.release(0.05)
+
+        # Assert
+        # The baseline converged to the new latency, which is no longer a spike
+        assert limiter.baseline_latencies[""] > 0.025
+        limit = limiter.limit
+        for _ in range(10):
+            limiter.acquire()
+            limiter.release(0.05)
+        assert limiter.limit >= limit
+
+    def test_release_without_latency(self):
+        # Arrange
+        limiter = AIMDLimiter(initial_limit=8)
+        limiter.acquire()
+
+        # Act
+        limiter.release()
+
+        # Assert
+        assert limiter.limit == 8
+        assert limiter.in_flight == 0
+
+    def test_acquire_async(self):
+        # Arrange
+        limiter = AIMDLimiter(initial_limit=1)
+        limiter.acquire()
+
+        async def acquire():
+            asyncio.get_running_loop().call_later(0.02, limiter.release)
+            await limiter.acquire_async()
+
+        # Act
+        asyncio.run(asyncio.wait_for(acquire(), 1))
+
+        # Assert
+        assert limiter.in_flight == 1
+
+    def test_acquire_deadline_exceeded(self):
+        # Arrange
+        limiter = AIMDLimiter(initial_limit=1)
+        limiter.acquire()
+
+        # Act
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceededError):
+            with deadline(0.05):
+                limiter.acquire()
+
+        # Assert
+        assert 0.04 <= time.monotonic() - start < 1
+        assert limiter.in_flight == 1
+
+    def test_acquire_async_deadline_exceeded(self):
+        # Arrange
+        limiter = AIMDLimiter(initial_limit=1)
+        limiter.acquire()
+
+        async def acquire():
+            with deadline(0.05):
+                await limiter.acquire_async()
+
+        # Act and Assert
+        with pytest.raises(DeadlineExceededError):
+            asyncio.run(asyncio.wait_for(acquire(), 1))
+        assert limiter.in_flight == 1
+
+    def test_as_dict(self):
+        # Arrange
+        limiter = AIMDLimiter(initial_limit=4)
+
+        # Act
+        metrics = limiter.as_dict()
+
+        # Assert
+        assert metrics["limit"] == 4
+        assert metrics["in_flight"] == 0
+        assert metrics["baseline_latencies"] == {}
+        assert len(metrics["history"]) == 1
+
+
+@pytest.mark.parametrize(
+    "method, path, key",
+    [
+        ("get", "records", "GET records"),
+        ("GET", "records/1", "GET records/*"),
+        ("PUT", "records/1/profiles?x=1", "PUT records/*"),
+        ("HEAD", "records?q=%2A", "HEAD records"),
+    ],
+)
+def test_latency_key(method, path, key):
+    assert latency_key(method, path) == key
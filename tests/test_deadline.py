@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from mediahaven.deadline import (
+    Deadline,
+    DeadlineExceededError,
+    bound_timeout,
+    current_deadline,
+    deadline,
+    use_deadline,
+)
+
+
+def test_deadline_remaining():
+    # Arrange
+    budget = Deadline(10)
+
+    # Act and Assert
+    assert 9 < budget.remaining() <= 10
+    assert not budget.expired
+    budget.check()
+
+
+def test_deadline_expired():
+    # Arrange
+    budget = Deadline(0)
+
+    # Act and Assert
+    assert budget.expired
+    assert budget.remaining() == 0
+    with pytest.raises(DeadlineExceededError):
+        budget.check()
+
+
+def test_deadline_context():
+    # Act and Assert
+    assert current_deadline() is None
+    with deadline(10) as outer:
+        assert current_deadline() is outer
+        with deadline(1) as inner:
+            assert current_deadline() is inner
+        with deadline(100):
+            # The earliest deadline applies
+            assert current_deadline() is outer
+        with use_deadline(None):
+            assert current_deadline() is outer
+    assert current_deadline() is None
+
+
+@pytest.mark.parametrize("timeout", [None, 5, (5, 60)])
+def test_bound_timeout_without_deadline(timeout):
+    assert bound_timeout(timeout) == timeout
+
+
+def test_bound_timeout_with_deadline():
+    with deadline(2):
+        assert 1 < bound_timeout(None) <= 2
+        assert bound_timeout(1) == 1
+        connect, read = bound_timeout((1, 60))
+        assert connect == 1
+        assert 1 < read <= 2
+        connect, read = bound_timeout((None, 1))
+        assert 1 < connect <= 2
+        assert read == 1
+
+
+def test_bound_timeout_deadline_exceeded():
+    with deadline(0.01):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceededError):
+            bound_timeout(5)
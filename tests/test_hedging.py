@@ -0,0 +1,59 @@
+import pytest
+
+from mediahaven.hedging import HedgingPolicy
+
+
+class TestHedgingPolicy:
+    @pytest.fixture()
+    def policy(self):
+        policy = HedgingPolicy(
+            percentile=90, initial_delay=1, min_delay=0.01, min_samples=10
+        )
+        yield policy
+        policy.shutdown()
+
+    @pytest.mark.parametrize(
+        "method,result", [("GET", True), ("head", True), ("POST", False)]
+    )
+    def test_is_hedgeable_method(self, policy, method, result):
+        assert policy.is_hedgeable_method(method) is result
+
+    def test_hedge_delay_initial(self, policy):
+        # Act
+        for _ in range(9):
+            policy.record_latency(0.1)
+
+        # Assert
+        assert policy.hedge_delay() == 1
+
+    def test_hedge_delay_percentile(self, policy):
+        # Act
+        for latency in range(1, 101):
+            policy.record_latency(latency / 100)
+
+        # Assert
+        assert policy.hedge_delay() == 0.9
+
+    def test_hedge_delay_bounds(self, policy):
+        # Arrange
+        policy.max_delay = 0.5
+
+        # Act and Assert
+        for _ in range(10):
+            policy.record_latency(0.001)
+        assert policy.hedge_delay() == 0.01
+        for _ in range(100):
+            policy.record_latency(2)
+        assert policy.hedge_delay() == 0.5
+
+    def test_try_hedge_rate_limited(self, policy):
+        # Arrange
+        for _ in range(18):
+            policy.record_request()
+
+        # Act
+        allowed = [policy.try_hedge() for _ in range(3)]
+
+        # Assert
+        assert allowed == [True, True, False]
+        assert policy.hedge_rate == pytest.approx(2 / 21)
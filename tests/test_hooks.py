@@ -0,0 +1,87 @@
+import logging
+import time
+
+import pytest
+
+from mediahaven.hooks import (
+    OBJECT_CREATED,
+    REQUEST_END,
+    REQUEST_START,
+    Hooks,
+    RequestEvent,
+    current_request_event,
+    record_phase,
+    use_request_event,
+)
+
+API_URL = "https://localhost/mediahaven-rest-api/v2/"
+
+
+class TestHooks:
+    def test_register_and_emit(self):
+        # Arrange
+        hooks = Hooks()
+        events = []
+        callback = hooks.register(REQUEST_END, events.append)
+        event = RequestEvent(hooks, "GET", f"{API_URL}records/1?q=x", API_URL)
+
+        # Act
+        hooks.emit(REQUEST_START, event)
+        hooks.emit(REQUEST_END, event)
+        hooks.unregister(REQUEST_END, callback)
+        hooks.emit(REQUEST_END, event)
+
+        # Assert
+        assert events == [event]
+        assert not hooks
+
+    def test_register_unknown_event(self):
+        with pytest.raises(ValueError):
+            Hooks().register("unknown", print)
+
+    def test_failing_hook_is_logged(self, caplog):
+        # Arrange
+        hooks = Hooks()
+        events = []
+        hooks.register(OBJECT_CREATED, lambda event: 1 / 0)
+        hooks.register(OBJECT_CREATED, events.append)
+        event = RequestEvent(hooks, "GET", API_URL)
+
+        # Act
+        with caplog.at_level(logging.ERROR):
+            hooks.emit(OBJECT_CREATED, event)
+
+        # Assert
+        assert events == [event]
+        assert "ZeroDivisionError" in caplog.text
+
+
+class TestRequestEvent:
+    def test_resource_path(self):
+        # Act
+        event = RequestEvent(Hooks(), "GET", f"{API_URL}records/1?q=x", API_URL)
+
+        # Assert
+        assert event.url == f"{API_URL}records/1"
+        assert event.path == "records/1"
+        assert event.resource == "records"
+
+    def test_record_phase(self):
+        # Arrange
+        event = RequestEvent(Hooks(), "GET", API_URL, API_URL)
+        start = time.perf_counter()
+
+        # Act
+        record_phase("wait", start)
+        with use_request_event(event):
+            assert current_request_event() is event
+            record_phase("wait", start)
+            record_phase("wait", start)
+        event.finish()
+
+        # Assert
+        assert current_request_event() is None
+        assert set(event.phases) == {"wait"}
+        assert event.phases["wait"] > 0
+        assert event.duration > 0
+        assert event.as_dict()["phases"] == event.phases
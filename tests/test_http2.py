@@ -0,0 +1,180 @@
+import time
+from datetime import timedelta
+
+import httpx
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from mediahaven.http2 import HTTP2Adapter, to_httpx_timeout, to_requests_exception
+from mediahaven.mediahaven import MediaHavenClient
+from mediahaven.oauth2 import ROPCGrant
+
+
+@pytest.fixture()
+def requests_sent():
+    return []
+
+
+@pytest.fixture()
+def session(requests_sent):
+    def handler(request: httpx.Request):
+        requests_sent.append(request)
+        if request.url.path == "/fail":
+            raise httpx.ConnectError("Connection refused", request=request)
+        if request.url.path == "/slow":
+            raise httpx.ReadTimeout("Timed out", request=request)
+        if request.url.path == "/delayed":
+            time.sleep(0.05)
+        return httpx.Response(200, json={"path": request.url.path})
+
+    session = requests.Session()
+    session.mount("https://", HTTP2Adapter(transport=httpx.MockTransport(handler)))
+    yield session
+    session.close()
+
+
+class TestHTTP2Adapter:
+    def test_send(self, session, requests_sent):
+        # Act
+        response = session.post(
+            "https://localhost/records?q=a%20b",
+            data="<xml/>",
+            headers={"Content-Type": "application/xml"},
+            timeout=(1, 60),
+        )
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json() == {"path": "/records"}
+        assert response.headers["Content-Type"] == "application/json"
+        assert response.url == "https://localhost/records?q=a%20b"
+        request = requests_sent[0]
+        assert request.method == "POST"
+        assert request.url.query == b"q=a%20b"
+        assert request.headers["Content-Type"] == "application/xml"
+        assert request.content == b"<xml/>"
+        assert request.extensions["timeout"] == to_httpx_timeout((1, 60)).as_dict()
+
+    def test_send_stream(self, session):
+        # Act
+        response = session.get("https://localhost/records", stream=True)
+
+        # Assert
+        assert b"".join(response.iter_content(4)) == b'{"path":"/records"}'
+        response.close()
+
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_send_elapsed(self, session, stream):
+        # Arrange
+        request = requests.Request("GET", "https://localhost/delayed").prepare()
+        adapter = session.get_adapter("https://localhost")
+
+        # Act
+        response = adapter.send(request, stream=stream)
+
+        # Assert
+        assert response.elapsed >= timedelta(seconds=0.05)
+        assert response.json() == {"path": "/delayed"}
+
+    def test_send_proxy(self, session, monkeypatch):
+        # Arrange
+        adapter = session.get_adapter("https://localhost")
+        get_client = adapter._get_client
+        proxies_used = []
+
+        def _get_client(verify, cert, proxy=None):
+            proxies_used.append(proxy)
+            return get_client(verify, cert)
+
+        monkeypatch.setattr(adapter, "_get_client", _get_client)
+        session.proxies = {"https": "http://proxy.test:3128"}
+
+        # Act
+        response = session.get("https://localhost/records")
+        client = get_client(True, None, "http://proxy.test:3128")
+
+        # Assert
+        assert response.status_code == 200
+        assert proxies_used == ["http://proxy.test:3128"]
+        assert client is not get_client(True, None)
+        assert any(
+            isinstance(transport, httpx.HTTPTransport)
+            for transport in client._mounts.values()
+        )
+
+    @pytest.mark.parametrize(
+        "path,exception",
+        [
+            ("/fail", requests.exceptions.ConnectionError),
+            ("/slow", requests.exceptions.ReadTimeout),
+        ],
+    )
+    def test_send_error(self, session, path, exception):
+        with pytest.raises(exception):
+            session.get(f"https://localhost{path}")
+
+
+class TestGrantHTTP2:
+    def test_http2_disabled(self):
+        grant = ROPCGrant("https://localhost/", "id", "secret")
+
+        assert isinstance(grant.session.get_adapter("https://localhost"), HTTPAdapter)
+
+    def test_http2_enabled(self):
+        grant = ROPCGrant("https://localhost/", "id", "secret", pool_maxsize=4)
+
+        # Act
+        MediaHavenClient("https://localhost/", grant, http2=True)
+
+        # Assert
+        adapter = grant.session.get_adapter("https://localhost")
+        assert isinstance(adapter, HTTP2Adapter)
+        assert adapter.limits.max_connections == 4
+        # Plain HTTP is not upgraded to HTTP/2
+        assert isinstance(grant.session.get_adapter("http://localhost"), HTTPAdapter)
+
+    def test_use_http2_recreates_session(self):
+        grant = ROPCGrant("https://localhost/", "id", "secret")
+        grant.token = {"access_token": "access"}
+        session = grant.session
+
+        # Act
+        grant.use_http2()
+
+        # Assert
+        assert grant.session is not session
+        assert grant.session.token == {"access_token": "access"}
+        assert isinstance(grant.session.get_adapter("https://localhost"), HTTP2Adapter)
+
+
+@pytest.mark.parametrize(
+    "timeout,expected",
+    [
+        (5, httpx.Timeout(5)),
+        ((1, 60), httpx.Timeout(60, connect=1)),
+        (None, httpx.Timeout(None)),
+    ],
+)
+def test_to_httpx_timeout(timeout, expected):
+    assert to_httpx_timeout(timeout) == expected
+
+
+@pytest.mark.parametrize(
+    "error,exception",
+    [
+        (httpx.ConnectTimeout, requests.exceptions.ConnectTimeout),
+        (httpx.ReadTimeout, requests.exceptions.ReadTimeout),
+        (httpx.ConnectError, requests.exceptions.ConnectionError),
+        (httpx.RemoteProtocolError, requests.exceptions.ConnectionError),
+        (httpx.ProxyError, requests.exceptions.ProxyError),
+        (httpx.UnsupportedProtocol, requests.exceptions.InvalidSchema),
+        (httpx.LocalProtocolError, requests.exceptions.RequestException),
+    ],
+)
+def test_to_requests_exception(error, exception):
+    # Act
+    converted = to_requests_exception(error("Failed"))
+
+    # Assert
+    assert type(converted) is exception
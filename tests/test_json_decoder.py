@@ -0,0 +1,112 @@
+import json
+
+import pytest
+from requests.models import Response
+
+from mediahaven import MediaHaven
+from mediahaven import json_decoder
+from mediahaven.json_decoder import (
+    DECODER_ATTRIBUTE,
+    available_decoders,
+    decode_json,
+    get_decoder,
+)
+from mediahaven.mocks.backend import FakeMediaHaven
+from mediahaven.oauth2 import ROPCGrant
+
+URL = "https://mediahaven.test/"
+DOCUMENT = {"Results": [{"Dynamic": {"PID": "pid1", "dc_title": "Ünïcode"}}]}
+
+
+def _response(payload) -> Response:
+    response = Response()
+    response.status_code = 200
+    response._content = json.dumps(payload).encode("utf-8")
+    return response
+
+
+class TestGetDecoder:
+    @pytest.mark.parametrize("name", available_decoders())
+    def test_decode(self, name):
+        # Arrange
+        decoder = get_decoder(name)
+
+        # Act
+        document = decoder(json.dumps(DOCUMENT).encode("utf-8"))
+
+        # Assert
+        assert document == DOCUMENT
+        with pytest.raises(ValueError):
+            decoder(b"{not json")
+
+    def test_fastest_by_default(self):
+        # Act and Assert
+        assert get_decoder() is get_decoder(available_decoders()[0])
+        assert available_decoders()[-1] == "json"
+
+    def test_callable(self):
+        # Act and Assert
+        assert get_decoder(json.loads) is json.loads
+
+    def test_unknown(self):
+        with pytest.raises(ValueError):
+            get_decoder("yaml")
+
+    def test_not_installed(self, monkeypatch):
+        # Arrange
+        monkeypatch.setitem(json_decoder.DECODERS, "ujson", None)
+
+        # Act and Assert
+        with pytest.raises(ImportError):
+            get_decoder("ujson")
+        assert "ujson" not in available_decoders()
+
+
+class TestDecodeJson:
+    def test_decoder_of_response(self):
+        # Arrange
+        response = _response(DOCUMENT)
+        calls = []
+
+        def decoder(data: bytes):
+            calls.append(data)
+            return json.loads(data)
+
+        setattr(response, DECODER_ATTRIBUTE, decoder)
+
+        # Act
+        document = decode_json(response)
+
+        # Assert
+        assert document == DOCUMENT
+        assert calls == [response.content]
+
+    def test_default_decoder(self):
+        # Act and Assert
+        assert decode_json(_response(DOCUMENT)) == DOCUMENT
+
+    def test_client_decoder(self):
+        # Arrange
+        fake = FakeMediaHaven(
+            records=[{"Dynamic": {"PID": f"pid{i}"}} for i in range(3)]
+        )
+        grant = ROPCGrant(URL, "id", "secret", transport=fake.transport())
+        grant.request_token("user", "password")
+        decoded = []
+
+        def decoder(data: bytes):
+            decoded.append(data)
+            return json.loads(data)
+
+        client = MediaHaven(URL, grant, json_decoder=decoder)
+
+        # Act
+        page = client.records.search(q="*", nrOfResults=2)
+        pids = [record.Dynamic.PID for record in page.as_generator()]
+
+        # Assert
+        assert pids == ["pid0", "pid1", "pid2"]
+        assert len(decoded) == 2
+        assert MediaHaven(URL, grant, json_decoder="json").json_decoder is (
+            get_decoder("json")
+        )
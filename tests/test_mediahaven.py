@@ -1,5 +1,8 @@
+import gzip
 import json
-from unittest.mock import patch
+import threading
+import time
+from unittest.mock import MagicMock, patch
 
 import pytest
 import responses
@@ -9,6 +12,7 @@ from oauthlib.oauth2.rfc6749.errors import (
     InvalidClientIdError,
 )
 from requests import RequestException
+from requests.exceptions import ConnectionError, ReadTimeout
 from urllib.parse import urljoin
 
 from mediahaven.mediahaven import (
@@ -18,6 +22,25 @@ from mediahaven.mediahaven import (
     MediaHavenException,
     RefreshTokenError,
 )
+from mediahaven.cache import ValidatorCache
+from mediahaven.circuit_breaker import (
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+    CircuitState,
+)
+from mediahaven.compression import CompressionPolicy
+from mediahaven.concurrency import AIMDLimiter
+from mediahaven.deadline import DEFAULT_TIMEOUT, DeadlineExceededError, deadline
+from mediahaven.hedging import HedgingPolicy
+from mediahaven.hooks import (
+    OBJECT_CREATED,
+    REQUEST_END,
+    REQUEST_START,
+    current_request_event,
+)
+from mediahaven.rate_limit import RateLimiter
+from mediahaven.resources.records import Records
+from mediahaven.retry import RetryPolicy
 
 
 class TestMediahaven:
@@ -521,3 +544,682 @@ class TestMediahaven:
         # Act and Assert
         with pytest.raises(RequestException):
             mh_client._execute_request()
+
+
+class TestMediahavenRetry:
+    @pytest.fixture()
+    def retry_client(self, mh_client):
+        mh_client.retry_policy = RetryPolicy(max_retries=2, backoff_factor=0)
+        return mh_client
+
+    @responses.activate
+    def test_get_retry_transient_status(self, retry_client):
+        # Arrange
+        resource_path = "get_resource/1"
+        url = urljoin(retry_client.mh_api_url, resource_path)
+        responses.get(url, status=503)
+        responses.get(url, status=429)
+        responses.get(url, json={"RecordId": "1"}, status=200)
+
+        # Act
+        resp = retry_client._get(resource_path, AcceptFormat.JSON)
+
+        # Assert
+        assert resp.json() == {"RecordId": "1"}
+        assert len(responses.calls) == 3
+        assert retry_client.retry_stats.as_dict() == {
+            "retries": 2,
+            "retried_requests": 1,
+            "exhausted": 0,
+        }
+
+    @responses.activate
+    def test_get_retry_exhausted(self, retry_client):
+        # Arrange
+        resource_path = "get_resource/1"
+        url = urljoin(retry_client.mh_api_url, resource_path)
+        responses.get(url, status=503)
+
+        # Act
+        with pytest.raises(MediaHavenException) as mhe:
+            retry_client._get(resource_path, AcceptFormat.JSON)
+
+        # Assert
+        assert mhe.value.status_code == 503
+        assert len(responses.calls) == 3
+        assert retry_client.retry_stats.exhausted == 1
+
+    @responses.activate
+    def test_get_retry_total_timeout(self, retry_client):
+        # Arrange
+        retry_client.retry_policy = RetryPolicy(total_timeout=1)
+        resource_path = "get_resource/1"
+        url = urljoin(retry_client.mh_api_url, resource_path)
+        responses.get(url, status=503, headers={"Retry-After": "5"})
+
+        # Act
+        with pytest.raises(MediaHavenException):
+            retry_client._get(resource_path, AcceptFormat.JSON)
+
+        # Assert
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    def test_get_retry_after_exceeds_max_backoff(self, retry_client):
+        # Arrange
+        retry_client.retry_policy = RetryPolicy(max_backoff=30)
+        resource_path = "get_resource/1"
+        url = urljoin(retry_client.mh_api_url, resource_path)
+        responses.get(url, status=429, headers={"Retry-After": "120"})
+
+        # Act
+        with pytest.raises(MediaHavenException) as mhe:
+            retry_client._get(resource_path, AcceptFormat.JSON)
+
+        # Assert
+        # A retry before the time asked by MediaHaven would be throttled again
+        assert mhe.value.status_code == 429
+        assert len(responses.calls) == 1
+        assert retry_client.retry_stats.exhausted == 1
+
+    @responses.activate
+    def test_post_not_retried_by_default(self, retry_client):
+        # Arrange
+        resource_path = "post_resource/1"
+        url = urljoin(retry_client.mh_api_url, resource_path)
+        responses.post(url, status=503)
+
+        # Act
+        with pytest.raises(MediaHavenException):
+            retry_client._post(resource_path, json={"description": "description"})
+
+        # Assert
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    def test_post_retried_if_enabled(self, retry_client):
+        # Arrange
+        retry_client.retry_policy = RetryPolicy(backoff_factor=0, retry_post=True)
+        resource_path = "post_resource/1"
+        url = urljoin(retry_client.mh_api_url, resource_path)
+        responses.post(url, status=503)
+        responses.post(url, status=204)
+
+        # Act
+        resp = retry_client._post(resource_path, json={"description": "description"})
+
+        # Assert
+        assert resp is True
+        assert len(responses.calls) == 2
+
+    @patch(
+        "requests.sessions.Session.request",
+        side_effect=(ConnectionError, ConnectionError, ConnectionError),
+    )
+    def test_execute_request_connection_error_exhausted(
+        self, session_mock, retry_client
+    ):
+        # Act and Assert
+        with pytest.raises(ConnectionError):
+            retry_client._execute_request(method="GET")
+        assert session_mock.call_count == 3
+
+    @patch("requests.sessions.Session.request", side_effect=RequestException)
+    def test_execute_request_exception_not_retried(self, session_mock, retry_client):
+        # Act and Assert
+        with pytest.raises(RequestException):
+            retry_client._execute_request(method="GET")
+        assert session_mock.call_count == 1
+
+
+class TestMediahavenRateLimit:
+    @patch("requests.sessions.Session.request")
+    def test_execute_request_rate_limited(self, session_mock, mh_client):
+        # Arrange
+        mh_client.rate_limiter = RateLimiter(rate=1, write_rate=1)
+        read_bucket = mh_client.rate_limiter.read_bucket
+        write_bucket = mh_client.rate_limiter.write_bucket
+
+        # Act
+        mh_client._execute_request(method="GET")
+        mh_client._execute_request(method="PUT")
+
+        # Assert
+        assert session_mock.call_count == 2
+        assert read_bucket._tokens < 1
+        assert write_bucket._tokens < 1
+
+
+class TestMediahavenConcurrency:
+    @responses.activate
+    def test_get_overload_decreases_limit(self, mh_client):
+        # Arrange
+        mh_client.concurrency_limiter = AIMDLimiter(initial_limit=8)
+        resource_path = "get_resource/1"
+        url = urljoin(mh_client.mh_api_url, resource_path)
+        responses.get(url, status=429)
+
+        # Act
+        with pytest.raises(MediaHavenException):
+            mh_client._get(resource_path, AcceptFormat.JSON)
+
+        # Assert
+        assert mh_client.concurrency_limiter.limit == 4
+        assert mh_client.concurrency_limiter.in_flight == 0
+
+    @responses.activate
+    def test_get_success_records_latency(self, mh_client):
+        # Arrange
+        mh_client.concurrency_limiter = AIMDLimiter(initial_limit=8)
+        resource_path = "get_resource/1"
+        url = urljoin(mh_client.mh_api_url, resource_path)
+        responses.get(url, json={}, status=200)
+
+        # Act
+        mh_client._get(resource_path, AcceptFormat.JSON)
+
+        # Assert
+        assert list(mh_client.concurrency_limiter.baseline_latencies) == [
+            "GET get_resource/*"
+        ]
+        assert mh_client.concurrency_limiter.in_flight == 0
+
+    @patch("requests.sessions.Session.request", side_effect=ReadTimeout)
+    def test_execute_request_timeout_decreases_limit(self, session_mock, mh_client):
+        # Arrange
+        mh_client.concurrency_limiter = AIMDLimiter(initial_limit=8)
+
+        # Act
+        with pytest.raises(ReadTimeout):
+            mh_client._execute_request(method="GET")
+
+        # Assert
+        assert mh_client.concurrency_limiter.limit == 4
+        assert mh_client.concurrency_limiter.in_flight == 0
+
+
+class TestMediahavenTimeout:
+    @patch("requests.sessions.Session.request")
+    def test_execute_request_default_timeout(self, session_mock, mh_client):
+        # Act
+        mh_client._execute_request(method="GET")
+
+        # Assert
+        session_mock.assert_called_once_with(method="GET", timeout=DEFAULT_TIMEOUT)
+
+    @patch("requests.sessions.Session.request")
+    def test_execute_request_timeout_bounded_by_deadline(self, session_mock, mh_client):
+        # Arrange
+        mh_client.timeout = (5, 60)
+
+        # Act
+        with deadline(10):
+            mh_client._execute_request(method="GET")
+
+        # Assert
+        connect, read = session_mock.call_args.kwargs["timeout"]
+        assert connect == 5
+        assert 9 < read <= 10
+
+    @patch("requests.sessions.Session.request")
+    def test_execute_request_deadline_exceeded(self, session_mock, mh_client):
+        # Act
+        with pytest.raises(DeadlineExceededError):
+            with deadline(0):
+                mh_client._execute_request(method="GET")
+
+        # Assert
+        session_mock.assert_not_called()
+
+    @patch("requests.sessions.Session.request")
+    def test_execute_request_deadline_exceeded_while_rate_limited(
+        self, session_mock, mh_client
+    ):
+        # Arrange
+        mh_client.rate_limiter = RateLimiter(rate=0.5, burst=1)
+        mh_client._execute_request(method="GET")
+
+        # Act
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceededError):
+            with deadline(0.1):
+                mh_client._execute_request(method="GET")
+
+        # Assert
+        # Fails fast instead of sleeping for the next token
+        assert time.monotonic() - start < 0.5
+        assert session_mock.call_count == 1
+
+    @patch("requests.sessions.Session.request")
+    def test_execute_request_deadline_exceeded_while_throttled(
+        self, session_mock, mh_client
+    ):
+        # Arrange
+        mh_client.concurrency_limiter = AIMDLimiter(initial_limit=1)
+        mh_client.circuit_breakers = CircuitBreakerRegistry()
+        mh_client.concurrency_limiter.acquire()
+
+        # Act
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceededError):
+            with deadline(0.1):
+                mh_client._execute_request(method="GET", url=mh_client.mh_api_url)
+
+        # Assert
+        assert 0.09 <= time.monotonic() - start < 1
+        session_mock.assert_not_called()
+        assert mh_client.concurrency_limiter.in_flight == 1
+
+    @responses.activate
+    def test_get_no_retry_beyond_deadline(self, mh_client):
+        # Arrange
+        mh_client.retry_policy = RetryPolicy()
+        resource_path = "get_resource/1"
+        url = urljoin(mh_client.mh_api_url, resource_path)
+        responses.get(url, status=503, headers={"Retry-After": "5"})
+
+        # Act
+        with pytest.raises(MediaHavenException):
+            with deadline(1):
+                mh_client._get(resource_path, AcceptFormat.JSON)
+
+        # Assert
+        assert len(responses.calls) == 1
+
+
+class TestMediahavenCircuitBreaker:
+    @responses.activate
+    def test_get_circuit_opens(self, mh_client):
+        # Arrange
+        mh_client.circuit_breakers = CircuitBreakerRegistry(
+            per_resource=True, minimum_calls=2
+        )
+        url = urljoin(mh_client.mh_api_url, "records/1")
+        responses.get(url, status=503)
+
+        # Act
+        for _ in range(2):
+            with pytest.raises(MediaHavenException):
+                mh_client._get("records/1", AcceptFormat.JSON)
+        with pytest.raises(CircuitOpenError):
+            mh_client._get("records/1", AcceptFormat.JSON)
+
+        # Assert
+        assert len(responses.calls) == 2
+        breaker = mh_client.circuit_breakers.get(mh_client.mh_base_url, "records")
+        assert breaker.state == CircuitState.OPEN
+        other = mh_client.circuit_breakers.get(mh_client.mh_base_url, "organisations")
+        assert other.state == CircuitState.CLOSED
+
+    @patch("requests.sessions.Session.request", side_effect=ConnectionError)
+    def test_execute_request_connection_error_is_failure(self, session_mock, mh_client):
+        # Arrange
+        mh_client.circuit_breakers = CircuitBreakerRegistry(minimum_calls=1)
+
+        # Act
+        with pytest.raises(ConnectionError):
+            mh_client._execute_request(method="GET", url=mh_client.mh_api_url)
+
+        # Assert
+        breaker = mh_client.circuit_breakers.get(mh_client.mh_base_url)
+        assert breaker.state == CircuitState.OPEN
+
+    @responses.activate
+    def test_get_circuit_open_not_retried(self, mh_client):
+        # Arrange
+        mh_client.retry_policy = RetryPolicy(backoff_factor=0)
+        mh_client.circuit_breakers = CircuitBreakerRegistry(minimum_calls=1)
+        url = urljoin(mh_client.mh_api_url, "records/1")
+        responses.get(url, status=503)
+
+        # Act
+        with pytest.raises(CircuitOpenError):
+            mh_client._get("records/1", AcceptFormat.JSON)
+
+        # Assert
+        assert len(responses.calls) == 1
+
+
+class TestMediahavenHedging:
+    @pytest.fixture()
+    def hedging_client(self, mh_client):
+        mh_client.hedging_policy = HedgingPolicy(
+            initial_delay=0.02, max_hedge_rate=1, min_samples=1000
+        )
+        yield mh_client
+        mh_client.hedging_policy.shutdown()
+
+    def test_execute_request_fast_not_hedged(self, hedging_client):
+        # Arrange
+        response = MagicMock()
+
+        # Act
+        with patch.object(
+            hedging_client, "_send_request", return_value=response
+        ) as send_mock:
+            resp = hedging_client._execute_request(method="GET")
+
+        # Assert
+        assert resp is response
+        assert send_mock.call_count == 1
+        assert hedging_client.hedging_policy.hedge_rate == 0
+
+    def test_execute_request_slow_hedged(self, hedging_client):
+        # Arrange
+        slow, fast = MagicMock(), MagicMock()
+        closed = threading.Event()
+        slow.close.side_effect = closed.set
+        responses_to_send = [slow, fast]
+
+        def send_request(**kwargs):
+            response = responses_to_send.pop(0)
+            if response is slow:
+                time.sleep(0.2)
+            return response
+
+        # Act
+        with patch.object(
+            hedging_client, "_send_request", side_effect=send_request
+        ) as send_mock:
+            resp = hedging_client._execute_request(method="GET")
+
+        # Assert
+        assert resp is fast
+        assert send_mock.call_count == 2
+        assert closed.wait(1)
+
+    def test_execute_request_hedged_phases_of_winner(self, hedging_client):
+        # Arrange
+        slow, fast = MagicMock(status_code=200), MagicMock(status_code=200)
+        responses_to_send = [slow, fast]
+        events = []
+        hedging_client.hooks.register(REQUEST_END, events.append)
+
+        def send_request(**kwargs):
+            response = responses_to_send.pop(0)
+            if response is slow:
+                time.sleep(0.2)
+            current_request_event().add_phase("ttfb", 0.2 if response is slow else 0.01)
+            return response
+
+        # Act
+        with patch.object(hedging_client, "_send_request", side_effect=send_request):
+            resp = hedging_client._execute_request(method="GET")
+        time.sleep(0.3)
+
+        # Assert
+        # The phases of the concurrent requests are not summed
+        assert resp is fast
+        assert events[0].phases["ttfb"] == 0.01
+
+    def test_execute_request_hedge_failure_uses_primary(self, hedging_client):
+        # Arrange
+        primary = MagicMock()
+        calls = []
+
+        def send_request(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                time.sleep(0.1)
+                return primary
+            raise ConnectionError
+
+        # Act
+        with patch.object(hedging_client, "_send_request", side_effect=send_request):
+            resp = hedging_client._execute_request(method="GET")
+
+        # Assert
+        assert resp is primary
+        assert len(calls) == 2
+
+    def test_execute_request_post_not_hedged(self, hedging_client):
+        # Act
+        with patch.object(hedging_client, "_send_hedged_request") as hedged_mock:
+            with patch.object(hedging_client, "_send_request"):
+                hedging_client._execute_request(method="POST")
+
+        # Assert
+        hedged_mock.assert_not_called()
+
+
+class TestMediahavenCompression:
+    @responses.activate
+    def test_post_xml_compressed(self, mh_client):
+        # Arrange
+        mh_client.request_compression = CompressionPolicy(min_size=10)
+        url = urljoin(mh_client.mh_api_url, "records")
+        responses.post(url, status=204)
+        xml = "<Record>" + "<Title>title</Title>" * 100 + "</Record>"
+
+        # Act
+        mh_client._post("records", xml=xml)
+
+        # Assert
+        request = responses.calls[0].request
+        assert request.headers["Content-Encoding"] == "gzip"
+        assert request.headers["Content-Type"] == "application/xml"
+        assert gzip.decompress(request.body).decode() == xml
+        stats = mh_client.compression_stats.as_dict()
+        assert stats["request_bytes"] == len(xml)
+        assert stats["request_wire_bytes"] == len(request.body)
+        assert stats["compressed_requests"] == 1
+
+    @responses.activate
+    def test_put_json_small_not_compressed(self, mh_client):
+        # Arrange
+        mh_client.request_compression = CompressionPolicy(min_size=1024)
+        url = urljoin(mh_client.mh_api_url, "records/1")
+        responses.put(url, status=204)
+
+        # Act
+        mh_client._put("records/1", json={"title": "title"})
+
+        # Assert
+        request = responses.calls[0].request
+        assert "Content-Encoding" not in request.headers
+        assert request.headers["Content-Type"] == "application/json"
+        assert json.loads(request.body) == {"title": "title"}
+        assert mh_client.compression_stats.compressed_requests == 0
+
+    @responses.activate
+    def test_post_not_compressed_without_policy(self, mh_client):
+        # Arrange
+        url = urljoin(mh_client.mh_api_url, "records")
+        responses.post(url, status=204)
+        xml = "<Record>" + "<Title>title</Title>" * 100 + "</Record>"
+
+        # Act
+        mh_client._post("records", xml=xml)
+
+        # Assert
+        assert responses.calls[0].request.body == xml
+        assert mh_client.compression_stats.request_bytes == 0
+
+    @responses.activate
+    def test_get_compressed_response(self, mh_client):
+        # Arrange
+        url = urljoin(mh_client.mh_api_url, "records")
+        body = json.dumps({"Results": [{"Title": "title"}] * 100}).encode()
+        compressed = gzip.compress(body)
+        responses.get(
+            url,
+            body=compressed,
+            headers={"Content-Encoding": "gzip"},
+            content_type="application/json",
+        )
+
+        # Act
+        response = mh_client._get("records", AcceptFormat.JSON)
+
+        # Assert
+        assert response.content == body
+        stats = mh_client.compression_stats.as_dict()
+        assert stats["response_bytes"] == len(body)
+        assert stats["response_wire_bytes"] == len(compressed)
+        assert stats["saved_bytes"] == len(body) - len(compressed)
+
+
+class TestMediahavenValidatorCache:
+    @pytest.fixture()
+    def cache_client(self, mh_client):
+        mh_client.validator_cache = ValidatorCache()
+        return mh_client
+
+    @responses.activate
+    def test_get_not_modified(self, cache_client):
+        # Arrange
+        url = urljoin(cache_client.mh_api_url, "records/1")
+        record = {"Internal": {"RecordId": "1"}}
+        responses.get(url, json=record, headers={"ETag": '"v1"'})
+        responses.get(url, status=304, headers={"ETag": '"v1"'})
+
+        records = Records(cache_client)
+
+        # Act
+        first = records.get("1")
+        second = records.get("1")
+
+        # Assert
+        assert second.Internal.RecordId == "1"
+        assert second.raw_response == first.raw_response
+        assert "If-None-Match" not in responses.calls[0].request.headers
+        assert responses.calls[1].request.headers["If-None-Match"] == '"v1"'
+        assert cache_client.validator_cache.as_dict() == {
+            "entries": 1,
+            "hits": 1,
+            "misses": 1,
+        }
+
+    @responses.activate
+    def test_get_modified(self, cache_client):
+        # Arrange
+        url = urljoin(cache_client.mh_api_url, "records/1")
+        last_modified = "Wed, 21 Oct 2015 07:28:00 GMT"
+        responses.get(
+            url, json={"Title": "old"}, headers={"Last-Modified": last_modified}
+        )
+        responses.get(url, json={"Title": "new"}, headers={"ETag": '"v2"'})
+
+        # Act
+        cache_client._get("records/1", AcceptFormat.JSON)
+        response = cache_client._get("records/1", AcceptFormat.JSON)
+
+        # Assert
+        assert response.json() == {"Title": "new"}
+        headers = responses.calls[1].request.headers
+        assert headers["If-Modified-Since"] == last_modified
+        cached = cache_client.validator_cache.get((f"{url}?", AcceptFormat.JSON.value))
+        assert cached.etag == '"v2"'
+
+    @responses.activate
+    def test_get_cached_per_accept_format(self, cache_client):
+        # Arrange
+        url = urljoin(cache_client.mh_api_url, "records/1")
+        responses.get(url, json={}, headers={"ETag": '"json"'})
+        responses.get(url, body="<Record/>", headers={"ETag": '"xml"'})
+
+        # Act
+        cache_client._get("records/1", AcceptFormat.JSON)
+        cache_client._get("records/1", AcceptFormat.XML)
+
+        # Assert
+        assert "If-None-Match" not in responses.calls[1].request.headers
+        assert len(cache_client.validator_cache) == 2
+
+    @responses.activate
+    def test_get_without_validators_not_cached(self, cache_client):
+        # Arrange
+        url = urljoin(cache_client.mh_api_url, "records/1")
+        responses.get(url, json={})
+
+        # Act
+        cache_client._get("records/1", AcceptFormat.JSON)
+        cache_client._get("records/1", AcceptFormat.JSON)
+
+        # Assert
+        assert "If-None-Match" not in responses.calls[1].request.headers
+        assert len(cache_client.validator_cache) == 0
+
+
+class TestMediahavenHooks:
+    @pytest.fixture()
+    def events(self, mh_client):
+        events = []
+        for event_type in (REQUEST_START, REQUEST_END, OBJECT_CREATED):
+            mh_client.hooks.register(
+                event_type, lambda event, t=event_type: events.append((t, event))
+            )
+        return events
+
+    @responses.activate
+    def test_get_events(self, mh_client, events):
+        # Arrange
+        mh_client.retry_policy = RetryPolicy(max_retries=2, backoff_factor=0)
+        url = urljoin(mh_client.mh_api_url, "records/1")
+        responses.get(url, status=503)
+        responses.get(url, json={"Internal": {"RecordId": "1"}})
+
+        # Act
+        record = Records(mh_client).get("1")
+
+        # Assert
+        assert record.Internal.RecordId == "1"
+        assert [event_type for event_type, _ in events] == [
+            REQUEST_START,
+            REQUEST_END,
+            OBJECT_CREATED,
+        ]
+        event = events[0][1]
+        assert all(e is event for _, e in events)
+        assert event.method == "GET"
+        assert event.resource == "records"
+        assert event.path == "records/1"
+        assert event.status_code == 200
+        assert event.retries == 1
+        assert event.response_bytes == len(b'{"Internal": {"RecordId": "1"}}')
+        assert event.object_type == "MediaHavenSingleObjectJSON"
+        assert event.results == 1
+        assert {"auth", "ttfb", "download", "backoff", "decode", "build"} <= set(
+            event.phases
+        )
+        assert event.duration >= sum(
+            event.phases[phase] for phase in ("auth", "ttfb", "download", "backoff")
+        )
+
+    @responses.activate
+    def test_search_events(self, mh_client, events):
+        # Arrange
+        url = urljoin(mh_client.mh_api_url, "records")
+        page = {
+            "NrOfResults": 2,
+            "StartIndex": 0,
+            "TotalNrOfResults": 2,
+            "Results": [{"RecordId": "1"}, {"RecordId": "2"}],
+        }
+        responses.get(url, json=page)
+
+        # Act
+        Records(mh_client).search(q="*")
+
+        # Assert
+        event = events[-1][1]
+        assert events[-1][0] == OBJECT_CREATED
+        assert event.object_type == "MediaHavenPageObjectJSON"
+        assert event.results == 2
+
+    @responses.activate
+    def test_error_event(self, mh_client, events):
+        # Arrange
+        url = urljoin(mh_client.mh_api_url, "records/1")
+        responses.get(url, body=ConnectionError("refused"))
+
+        # Act
+        with pytest.raises(ConnectionError):
+            mh_client._get("records/1", AcceptFormat.JSON)
+
+        # Assert
+        assert [event_type for event_type, _ in events] == [REQUEST_START, REQUEST_END]
+        event = events[-1][1]
+        assert isinstance(event.error, ConnectionError)
+        assert event.status_code is None
+        assert event.duration is not None
@@ -0,0 +1,228 @@
+import gc
+
+import pytest
+
+from mediahaven import MediaHaven
+from mediahaven.compression import CompressionPolicy
+from mediahaven.concurrency import AIMDLimiter
+from mediahaven.mediahaven import MediaHavenException
+from mediahaven.metrics import (
+    ClientMetrics,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+)
+from mediahaven.mocks.backend import FakeMediaHaven
+from mediahaven.oauth2 import ROPCGrant
+
+URL = "https://mediahaven.test/"
+
+
+class TestCounter:
+    def test_inc(self):
+        # Arrange
+        counter = Counter("requests_total", "Requests.", ("method",))
+
+        # Act
+        counter.inc(("GET",))
+        counter.inc(("GET",), 2)
+        counter.inc(("PUT",))
+
+        # Assert
+        assert counter.value(("GET",)) == 3
+        assert counter.value(("POST",)) == 0
+        assert counter.snapshot() == [
+            {"labels": {"method": "GET"}, "value": 3},
+            {"labels": {"method": "PUT"}, "value": 1},
+        ]
+
+
+class TestGauge:
+    def test_set(self):
+        # Arrange
+        gauge = Gauge("limit", "The limit.")
+
+        # Act
+        gauge.set((), 8)
+        gauge.set((), 4)
+
+        # Assert
+        assert gauge.value() == 4
+        assert gauge.samples() == [("", (), 4)]
+
+
+class TestHistogram:
+    def test_observe(self):
+        # Arrange
+        histogram = Histogram("latency", "Latency.", buckets=(0.1, 1))
+
+        # Act
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.observe(value)
+
+        # Assert
+        assert histogram.count() == 4
+        assert histogram.snapshot() == [
+            {"labels": {}, "count": 4, "sum": 2.65, "buckets": {0.1: 2, 1: 3}}
+        ]
+
+
+class TestMetricsRegistry:
+    def test_register_existing(self):
+        # Arrange
+        registry = MetricsRegistry()
+        counter = registry.counter("total", "Total.")
+
+        # Act and Assert
+        assert registry.counter("total", "Total.") is counter
+        with pytest.raises(ValueError):
+            registry.histogram("total", "Total.")
+
+    def test_to_prometheus(self):
+        # Arrange
+        registry = MetricsRegistry()
+        registry.counter("errors_total", "Errors.", ("status",)).inc(('5"03',))
+        histogram = registry.histogram("latency_seconds", "Latency.", (), (0.1, 1))
+        histogram.observe(0.5)
+
+        # Act
+        exposition = registry.to_prometheus()
+
+        # Assert
+        assert exposition == (
+            "# HELP errors_total Errors.\n"
+            "# TYPE errors_total counter\n"
+            'errors_total{status="5\\"03"} 1\n'
+            "# HELP latency_seconds Latency.\n"
+            "# TYPE latency_seconds histogram\n"
+            'latency_seconds_bucket{le="0.1"} 0\n'
+            'latency_seconds_bucket{le="1"} 1\n'
+            'latency_seconds_bucket{le="+Inf"} 1\n'
+            "latency_seconds_sum 0.5\n"
+            "latency_seconds_count 1\n"
+        )
+
+
+class TestClientMetrics:
+    @pytest.fixture()
+    def client(self):
+        fake = FakeMediaHaven(
+            records=[{"Dynamic": {"PID": f"pid{i}"}} for i in range(5)]
+        )
+        grant = ROPCGrant(URL, "id", "secret", transport=fake.transport())
+        grant.request_token("user", "password")
+        return MediaHaven(URL, grant)
+
+    def test_requests(self, client):
+        # Act
+        page = client.records.search(q="*", nrOfResults=2)
+        results = list(page.as_generator())
+        with pytest.raises(MediaHavenException):
+            client.records.get("unknown")
+        client.grant.refresh_token()
+
+        # Assert
+        metrics = client.metrics
+        assert len(results) == 5
+        assert metrics.requests.value(("records", "GET", "200")) == 3
+        assert metrics.errors.value(("records", "GET", "404")) == 1
+        assert metrics.pages.value(("records",)) == 3
+        assert metrics.records_yielded.value(("records",)) == 5
+        assert metrics.latency.count(("records", "GET")) == 4
+        assert metrics.response_size.count(("records", "GET")) == 4
+        assert metrics.phases.value(("records", "decode")) > 0
+        snapshot = metrics.snapshot()
+        assert snapshot["mediahaven_token_refreshes_total"] == [
+            {"labels": {}, "value": 1}
+        ]
+        exposition = metrics.to_prometheus()
+        assert (
+            'mediahaven_requests_total{resource="records",method="GET",status="200"} 3'
+            in exposition
+        )
+        assert "mediahaven_token_refreshes_total 1" in exposition
+
+    def test_shared_between_clients(self, client):
+        # Arrange
+        metrics = ClientMetrics()
+        first = MediaHaven(URL, client.grant, metrics=metrics)
+        second = MediaHaven(URL, client.grant, metrics=metrics)
+
+        # Act
+        first.records.count("*")
+        second.records.count("*")
+
+        # Assert
+        assert metrics.requests.value(("records", "HEAD", "200")) == 2
+
+    def test_concurrency_limiter(self, client):
+        # Arrange
+        limiter = AIMDLimiter(initial_limit=8)
+        metrics = ClientMetrics()
+        limited = MediaHaven(
+            URL, client.grant, concurrency_limiter=limiter, metrics=metrics
+        )
+        limiter.acquire()
+
+        # Act
+        limited.records.count("*")
+
+        # Assert
+        exposition = metrics.to_prometheus()
+        assert "# TYPE mediahaven_concurrency_limit gauge" in exposition
+        assert f"mediahaven_concurrency_limit {limiter.limit}" in exposition
+        assert "mediahaven_requests_in_flight 1" in exposition
+        assert "mediahaven_concurrency_limit" not in client.metrics.to_prometheus()
+
+    def test_collected_client_not_exported(self, client):
+        # Arrange
+        metrics = ClientMetrics()
+        limited = MediaHaven(
+            URL,
+            client.grant,
+            concurrency_limiter=AIMDLimiter(initial_limit=8),
+            metrics=metrics,
+        )
+        assert "mediahaven_concurrency_limit 8" in metrics.to_prometheus()
+
+        # Act
+        del limited
+        gc.collect()
+
+        # Assert
+        assert "mediahaven_concurrency_limit" not in metrics.to_prometheus()
+        assert len(metrics._clients) == 0
+
+    def test_compression(self, client):
+        # Arrange
+        metrics = ClientMetrics()
+        compressing = MediaHaven(
+            URL,
+            client.grant,
+            request_compression=CompressionPolicy(min_size=0),
+            metrics=metrics,
+        )
+        record_id = (
+            client.records.search(q="*").page_result.Results[0].Internal.RecordId
+        )
+
+        # Act
+        compressing.records.update(record_id, json={"Description": "text " * 1000})
+        compressing.compression_stats.record_response(5000, 500)
+
+        # Assert
+        stats = compressing.compression_stats.as_dict()
+        request_saved = stats["request_bytes"] - stats["request_wire_bytes"]
+        assert request_saved > 4000
+        exposition = metrics.to_prometheus()
+        assert "# TYPE mediahaven_compression_saved_bytes_total counter" in exposition
+        assert (
+            f'mediahaven_compression_saved_bytes_total{{direction="request"}} '
+            f"{request_saved}" in exposition
+        )
+        assert (
+            'mediahaven_compression_saved_bytes_total{direction="response"} 4500'
+            in exposition
+        )
+        assert 'mediahaven_compression_ratio{direction="response"} 10.0' in exposition
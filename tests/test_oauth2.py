@@ -0,0 +1,383 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from oauthlib.oauth2.rfc6749.errors import InvalidGrantError
+
+from requests.adapters import HTTPAdapter
+
+from mediahaven.deadline import DEFAULT_TIMEOUT
+from mediahaven.oauth2 import (
+    MAX_REFRESH_COOLDOWN,
+    NoTokenError,
+    ROPCGrant,
+    refresh_cooldown,
+    token_refresh_margin,
+)
+from mediahaven.token_store import MemoryTokenStore
+
+TOKEN = {
+    "refresh_token": "refresh_token",
+    "token_type": "bearer",
+    "access_token": "access_token",
+    "expires_in": 7200,
+}
+
+REFRESHED_TOKEN = {
+    "refresh_token": "refresh_token_after_refresh",
+    "token_type": "bearer",
+    "access_token": "access_token_after_refresh",
+    "expires_in": 7200,
+}
+
+
+class TestOAuth2Grant:
+    @pytest.fixture()
+    def grant(self):
+        return ROPCGrant("https://localhost/", "id", "secret")
+
+    def test_get_session_no_token(self, grant: ROPCGrant):
+        with pytest.raises(NoTokenError):
+            grant._get_session()
+
+    def test_get_session_reused(self, grant: ROPCGrant):
+        # Arrange
+        grant.token = TOKEN
+
+        # Act
+        session = grant._get_session()
+
+        # Assert
+        assert grant._get_session() is session
+        assert session.access_token == "access_token"
+
+    def test_session_pool_config(self):
+        # Arrange
+        grant = ROPCGrant(
+            "https://localhost/",
+            "id",
+            "secret",
+            pool_connections=2,
+            pool_maxsize=20,
+            pool_block=True,
+            keep_alive=False,
+        )
+
+        # Act
+        session = grant.session
+        adapter = session.get_adapter("https://localhost/")
+
+        # Assert
+        assert isinstance(adapter, HTTPAdapter)
+        assert adapter._pool_connections == 2
+        assert adapter._pool_maxsize == 20
+        assert adapter._pool_block is True
+        assert session.headers["Connection"] == "close"
+
+    @patch(
+        "requests_oauthlib.OAuth2Session.refresh_token", return_value=REFRESHED_TOKEN
+    )
+    def test_refresh_token_updates_session_in_place(self, refresh_mock, grant):
+        # Arrange
+        grant.token = TOKEN
+        session = grant._get_session()
+
+        # Act
+        grant.refresh_token()
+
+        # Assert
+        refresh_mock.assert_called_once_with(
+            grant.refresh_url,
+            timeout=DEFAULT_TIMEOUT,
+            client_id="id",
+            client_secret="secret",
+        )
+        assert grant.token == REFRESHED_TOKEN
+        assert grant._get_session() is session
+        assert session.access_token == "access_token_after_refresh"
+
+    @patch("requests_oauthlib.OAuth2Session.refresh_token")
+    def test_refresh_token_single_flight(self, refresh_mock, grant: ROPCGrant):
+        # Arrange
+        def slow_refresh(*args, **kwargs):
+            time.sleep(0.05)
+            return dict(REFRESHED_TOKEN)
+
+        refresh_mock.side_effect = slow_refresh
+        grant.token = TOKEN
+        expired_token = grant.token
+        threads = [
+            threading.Thread(target=grant.refresh_token, args=(expired_token,))
+            for _ in range(10)
+        ]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        assert refresh_mock.call_count == 1
+        assert grant.token == REFRESHED_TOKEN
+
+    @patch("requests_oauthlib.OAuth2Session.refresh_token", return_value=TOKEN)
+    def test_refresh_token_without_expired_token(self, refresh_mock, grant):
+        # Arrange
+        grant.token = TOKEN
+
+        # Act
+        grant.refresh_token()
+        grant.refresh_token()
+
+        # Assert
+        assert refresh_mock.call_count == 2
+
+    @patch("requests_oauthlib.OAuth2Session.refresh_token")
+    def test_get_session_refresh_within_margin(self, refresh_mock):
+        # Arrange
+        grant = ROPCGrant("https://localhost/", "id", "secret", refresh_margin=30)
+        grant.token = {**TOKEN, "expires_at": time.time() + 10}
+        refresh_mock.return_value = {
+            **REFRESHED_TOKEN,
+            "expires_at": time.time() + 7200,
+        }
+
+        # Act
+        session = grant._get_session()
+
+        # Assert
+        assert refresh_mock.call_count == 1
+        assert session.access_token == "access_token_after_refresh"
+
+    @patch("requests_oauthlib.OAuth2Session.refresh_token")
+    def test_get_session_no_refresh_outside_margin(self, refresh_mock):
+        # Arrange
+        grant = ROPCGrant("https://localhost/", "id", "secret", refresh_margin=30)
+        grant.token = {**TOKEN, "expires_at": time.time() + 3600}
+
+        # Act
+        grant._get_session()
+
+        # Assert
+        refresh_mock.assert_not_called()
+
+    @patch("requests_oauthlib.OAuth2Session.refresh_token")
+    def test_get_session_refresh_failure_within_margin(self, refresh_mock):
+        # Arrange
+        grant = ROPCGrant("https://localhost/", "id", "secret", refresh_margin=30)
+        grant.token = {**TOKEN, "expires_at": time.time() + 10}
+        refresh_mock.side_effect = InvalidGrantError
+
+        # Act
+        session = grant._get_session()
+
+        # Assert
+        assert refresh_mock.call_count == 1
+        assert session.access_token == "access_token"
+
+    @patch("requests_oauthlib.OAuth2Session.refresh_token")
+    def test_get_session_refresh_failure_cooldown(self, refresh_mock, caplog):
+        # Arrange
+        grant = ROPCGrant("https://localhost/", "id", "secret", refresh_margin=30)
+        grant.token = {**TOKEN, "expires_at": time.time() + 10}
+        refresh_mock.side_effect = InvalidGrantError
+
+        # Act
+        for _ in range(3):
+            grant._get_session()
+        # The cooldown is over
+        grant._refresh_retry_at = time.monotonic()
+        grant._get_session()
+
+        # Assert
+        # The failed refresh is not retried by every request within the margin
+        assert refresh_mock.call_count == 2
+        assert "Ahead-of-expiry token refresh failed" in caplog.text
+        assert refresh_cooldown(30) == 7.5
+        assert refresh_cooldown(3600) == MAX_REFRESH_COOLDOWN
+
+    @patch("requests_oauthlib.OAuth2Session.refresh_token")
+    def test_get_session_lifetime_shorter_than_margin(self, refresh_mock):
+        # Arrange
+        grant = ROPCGrant("https://localhost/", "id", "secret", refresh_margin=60)
+        grant.token = {**TOKEN, "expires_in": 30, "expires_at": time.time() + 30}
+        refresh_mock.return_value = {
+            **REFRESHED_TOKEN,
+            "expires_in": 30,
+            "expires_at": time.time() + 30,
+        }
+
+        # Act
+        for _ in range(10):
+            grant._get_session()
+        # More than half of the lifetime has passed
+        grant.token = {**grant.token, "expires_at": time.time() + 10}
+        for _ in range(10):
+            grant._get_session()
+
+        # Assert
+        # The just issued tokens are not renewed, only the half expired one
+        assert refresh_mock.call_count == 1
+        assert grant.token["access_token"] == "access_token_after_refresh"
+        assert token_refresh_margin(grant.token, 60) == 15
+        assert token_refresh_margin(grant.token, 10) == 10
+        assert token_refresh_margin({}, 60) == 60
+
+    @patch("requests_oauthlib.OAuth2Session.refresh_token")
+    def test_background_refresh_lifetime_shorter_than_margin(self, refresh_mock):
+        # Arrange
+        grant = ROPCGrant("https://localhost/", "id", "secret")
+        grant.token = {**TOKEN, "expires_in": 30, "expires_at": time.time() + 30}
+
+        # Act
+        grant.start_background_refresh()
+        time.sleep(0.2)
+        grant.stop_background_refresh()
+
+        # Assert
+        # The default margin of 60 seconds is capped at half of the lifetime
+        refresh_mock.assert_not_called()
+
+    @patch("requests_oauthlib.OAuth2Session.refresh_token")
+    def test_background_refresh_min_interval(self, refresh_mock):
+        # Arrange
+        grant = ROPCGrant("https://localhost/", "id", "secret")
+        grant.token = {**TOKEN, "expires_in": 2, "expires_at": time.time() + 0.5}
+        # Every refreshed token is already within its margin
+        refresh_mock.side_effect = lambda *args, **kwargs: {
+            **REFRESHED_TOKEN,
+            "expires_in": 2,
+            "expires_at": time.time() + 0.5,
+        }
+
+        # Act
+        grant.start_background_refresh()
+        time.sleep(0.5)
+        grant.stop_background_refresh()
+
+        # Assert
+        assert refresh_mock.call_count == 1
+
+    @patch("requests_oauthlib.OAuth2Session.refresh_token")
+    def test_background_refresh(self, refresh_mock):
+        # Arrange
+        grant = ROPCGrant("https://localhost/", "id", "secret", refresh_margin=30)
+        grant.token = {**TOKEN, "expires_at": time.time() + 30.05}
+        refreshed = threading.Event()
+
+        def refresh(*args, **kwargs):
+            refreshed.set()
+            return {**REFRESHED_TOKEN, "expires_at": time.time() + 7200}
+
+        refresh_mock.side_effect = refresh
+
+        # Act
+        grant.start_background_refresh()
+        assert refreshed.wait(2)
+        grant.stop_background_refresh()
+
+        # Assert
+        assert refresh_mock.call_count == 1
+        assert grant.token["access_token"] == "access_token_after_refresh"
+        assert grant._refresh_thread is None
+
+    def test_close(self, grant: ROPCGrant):
+        # Arrange
+        grant.token = TOKEN
+        session = grant._get_session()
+
+        # Act
+        grant.close()
+
+        # Assert
+        assert grant._get_session() is not session
+
+
+class TestOAuth2GrantTokenStore:
+    @pytest.fixture()
+    def store(self):
+        return MemoryTokenStore()
+
+    @pytest.fixture()
+    def grant(self, store):
+        return ROPCGrant("https://localhost/", "id", "secret", token_store=store)
+
+    @patch("requests_oauthlib.OAuth2Session.fetch_token")
+    def test_request_token_uses_stored_token(self, fetch_mock, store, grant):
+        # Arrange
+        store.save({**TOKEN, "expires_at": time.time() + 3600})
+
+        # Act
+        grant.request_token("user", "password")
+
+        # Assert
+        fetch_mock.assert_not_called()
+        assert grant.token["access_token"] == "access_token"
+
+    @patch("requests_oauthlib.OAuth2Session.fetch_token")
+    def test_request_token_stored_token_expired(self, fetch_mock, store, grant):
+        # Arrange
+        store.save({**TOKEN, "expires_at": time.time() - 1})
+        fetch_mock.return_value = {**REFRESHED_TOKEN, "expires_at": time.time() + 60}
+
+        # Act
+        grant.request_token("user", "password")
+
+        # Assert
+        assert fetch_mock.call_count == 1
+        assert grant.token["access_token"] == "access_token_after_refresh"
+        assert store.load() == grant.token
+
+    @patch("requests_oauthlib.OAuth2Session.refresh_token")
+    def test_refresh_token_uses_token_refreshed_by_other_grant(
+        self, refresh_mock, store, grant
+    ):
+        # Arrange
+        grant.token = TOKEN
+        store.save({**REFRESHED_TOKEN, "expires_at": time.time() + 3600})
+
+        # Act
+        grant.refresh_token(grant.token)
+
+        # Assert
+        refresh_mock.assert_not_called()
+        assert grant.token["access_token"] == "access_token_after_refresh"
+
+    @patch("requests_oauthlib.OAuth2Session.refresh_token", autospec=True)
+    def test_refresh_token_uses_rotated_refresh_token(self, refresh_mock, store, grant):
+        # Arrange
+        grant.token = {**TOKEN, "expires_at": time.time() - 2}
+        # Another grant refreshed the token, which has expired since
+        store.save({**REFRESHED_TOKEN, "expires_at": time.time() - 1})
+        refresh_tokens = []
+
+        def refresh(session, *args, **kwargs):
+            refresh_tokens.append(session.token["refresh_token"])
+            return {**REFRESHED_TOKEN, "access_token": "access_token_after_refresh_2"}
+
+        refresh_mock.side_effect = refresh
+
+        # Act
+        grant.refresh_token(grant.token)
+
+        # Assert
+        # The refresh token of the grant was revoked by the rotation
+        assert refresh_tokens == ["refresh_token_after_refresh"]
+        assert grant.token["access_token"] == "access_token_after_refresh_2"
+        assert store.load() == grant.token
+
+    @patch("requests_oauthlib.OAuth2Session.refresh_token")
+    def test_refresh_token_saves_token(self, refresh_mock, store, grant):
+        # Arrange
+        grant.token = TOKEN
+        store.save(TOKEN)
+        refresh_mock.return_value = REFRESHED_TOKEN
+
+        # Act
+        grant.refresh_token(grant.token)
+
+        # Assert
+        assert refresh_mock.call_count == 1
+        assert store.load() == REFRESHED_TOKEN
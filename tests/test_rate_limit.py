@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from mediahaven.deadline import DeadlineExceededError, deadline
+from mediahaven.rate_limit import RateLimiter, TokenBucket
+
+
+class TestTokenBucket:
+    def test_invalid_rate(self):
+        with pytest.raises(ValueError):
+            TokenBucket(0)
+
+    def test_burst_is_not_limited(self):
+        # Arrange
+        bucket = TokenBucket(rate=1, burst=5)
+
+        # Act
+        start = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+
+        # Assert
+        assert time.monotonic() - start < 0.1
+
+    def test_rate_is_limited(self):
+        # Arrange
+        bucket = TokenBucket(rate=20, burst=1)
+
+        # Act
+        start = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+
+        # Assert
+        assert time.monotonic() - start >= 0.19
+
+    def test_rate_is_limited_across_threads(self):
+        # Arrange
+        bucket = TokenBucket(rate=50, burst=1)
+        threads = [threading.Thread(target=bucket.acquire) for _ in range(11)]
+
+        # Act
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        assert time.monotonic() - start >= 0.19
+
+    def test_acquire_async(self):
+        # Arrange
+        bucket = TokenBucket(rate=20, burst=1)
+
+        async def acquire_all():
+            await asyncio.gather(*(bucket.acquire_async() for _ in range(5)))
+
+        # Act
+        start = time.monotonic()
+        asyncio.run(acquire_all())
+
+        # Assert
+        assert time.monotonic() - start >= 0.19
+
+    def test_acquire_deadline_exceeded(self):
+        # Arrange
+        bucket = TokenBucket(rate=2, burst=1)
+        bucket.acquire()
+
+        # Act
+        with pytest.raises(DeadlineExceededError):
+            with deadline(0.1):
+                bucket.acquire()
+
+        # Assert
+        # The tokens are returned, only one token is owed
+        assert bucket._reserve(0) <= 0.5
+
+    def test_acquire_async_deadline_exceeded(self):
+        # Arrange
+        bucket = TokenBucket(rate=2, burst=1)
+        bucket.acquire()
+
+        async def acquire():
+            with deadline(0.1):
+                await bucket.acquire_async()
+
+        # Act and Assert
+        with pytest.raises(DeadlineExceededError):
+            asyncio.run(acquire())
+
+
+class TestRateLimiter:
+    def test_shared_bucket(self):
+        # Arrange
+        rate_limiter = RateLimiter(10)
+
+        # Act and Assert
+        assert rate_limiter.bucket("GET") is rate_limiter.bucket("POST")
+
+    def test_separate_write_bucket(self):
+        # Arrange
+        rate_limiter = RateLimiter(10, write_rate=2)
+
+        # Act and Assert
+        assert rate_limiter.bucket("get") is rate_limiter.read_bucket
+        assert rate_limiter.bucket("HEAD") is rate_limiter.read_bucket
+        for method in ("POST", "PUT", "DELETE"):
+            assert rate_limiter.bucket(method) is rate_limiter.write_bucket
+        assert rate_limiter.write_bucket.rate == 2
@@ -0,0 +1,105 @@
+from email.utils import formatdate
+import time
+
+import pytest
+from requests.exceptions import ConnectionError, HTTPError, ReadTimeout
+from requests.models import Response
+
+from mediahaven.retry import RetryPolicy, RetryStats
+
+
+def _response(status: int, headers: dict = None) -> Response:
+    response = Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return response
+
+
+class TestRetryPolicy:
+    @pytest.mark.parametrize(
+        "method,retry_post,result",
+        [
+            ("GET", False, True),
+            ("head", False, True),
+            ("PUT", False, True),
+            ("DELETE", False, True),
+            ("POST", False, False),
+            ("POST", True, True),
+        ],
+    )
+    def test_is_retryable_method(self, method, retry_post, result):
+        assert RetryPolicy(retry_post=retry_post).is_retryable_method(method) is result
+
+    @pytest.mark.parametrize(
+        "status,result",
+        [(429, True), (502, True), (503, True), (504, True), (500, False)],
+    )
+    def test_is_retryable_response(self, status, result):
+        assert RetryPolicy().is_retryable_response(_response(status)) is result
+
+    @pytest.mark.parametrize(
+        "exception,result",
+        [(ConnectionError(), True), (ReadTimeout(), True), (HTTPError(), False)],
+    )
+    def test_is_retryable_exception(self, exception, result):
+        assert RetryPolicy().is_retryable_exception(exception) is result
+
+    def test_get_backoff_exponential(self):
+        # Arrange
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+
+        # Act and Assert
+        assert [policy.get_backoff(retry) for retry in range(1, 5)] == [1, 2, 4, 5]
+
+    def test_get_backoff_jitter(self):
+        # Arrange
+        policy = RetryPolicy(backoff_factor=1)
+
+        # Act and Assert
+        assert all(0 <= policy.get_backoff(3) <= 4 for _ in range(100))
+
+    def test_get_backoff_retry_after_seconds(self):
+        # Arrange
+        policy = RetryPolicy(max_backoff=10)
+
+        # Act and Assert
+        assert policy.get_backoff(1, _response(429, {"Retry-After": "3"})) == 3
+        # The delay asked by MediaHaven is not shortened
+        assert policy.get_backoff(1, _response(429, {"Retry-After": "60"})) == 60
+        assert policy.exceeds_max_backoff(60)
+        assert not policy.exceeds_max_backoff(10)
+
+    def test_get_backoff_retry_after_date(self):
+        # Arrange
+        policy = RetryPolicy()
+        retry_at = formatdate(time.time() + 5, usegmt=True)
+
+        # Act
+        backoff = policy.get_backoff(1, _response(503, {"Retry-After": retry_at}))
+
+        # Assert
+        assert 3 <= backoff <= 5
+
+    def test_get_backoff_retry_after_ignored(self):
+        # Arrange
+        policy = RetryPolicy(backoff_factor=1, jitter=False, respect_retry_after=False)
+
+        # Act and Assert
+        assert policy.get_backoff(1, _response(429, {"Retry-After": "3"})) == 1
+
+    @pytest.mark.parametrize("value", [None, "", "soon"])
+    def test_parse_retry_after_invalid(self, value):
+        assert RetryPolicy.parse_retry_after(value) is None
+
+
+def test_retry_stats():
+    # Arrange
+    stats = RetryStats()
+
+    # Act
+    stats.record(0)
+    stats.record(2)
+    stats.record(3, exhausted=True)
+
+    # Assert
+    assert stats.as_dict() == {"retries": 5, "retried_requests": 2, "exhausted": 1}
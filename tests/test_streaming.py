@@ -0,0 +1,319 @@
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from mediahaven import MediaHaven
+from mediahaven.mediahaven import AcceptFormat
+from mediahaven.mocks.backend import FakeMediaHaven
+from mediahaven.oauth2 import ROPCGrant
+from mediahaven.resources.base_resource import (
+    MediaHavenPageObjectJSONStream,
+    MediaHavenPageObjectXML,
+)
+from mediahaven.resources.streaming import (
+    StreamingPageParser,
+    StreamingXMLPageParser,
+    iter_text,
+)
+
+URL = "https://mediahaven.test/"
+
+RESULTS = [
+    {"Dynamic": {"PID": f"pid{i}", "dc_title": 'Één "titel"', "Size": 10**i}}
+    for i in range(5)
+]
+
+
+def _chunks(document: str, size: int):
+    return [document[i : i + size] for i in range(0, len(document), size)]
+
+
+def _parse(chunks):
+    parser = StreamingPageParser(chunks)
+    parser.start()
+    return parser, list(parser)
+
+
+class TestStreamingPageParser:
+    @pytest.mark.parametrize("size", [1, 3, 7, 1000])
+    def test_chunk_boundaries(self, size):
+        # Arrange
+        page = {
+            "NrOfResults": 5,
+            "StartIndex": 0,
+            "TotalNrOfResults": 12345,
+            "Results": RESULTS,
+        }
+        document = json.dumps(page, indent=1, ensure_ascii=False)
+
+        # Act
+        parser, results = _parse(_chunks(document, size))
+
+        # Assert
+        assert results == RESULTS
+        assert parser.fields == {
+            "NrOfResults": 5,
+            "StartIndex": 0,
+            "TotalNrOfResults": 12345,
+        }
+        assert parser.done
+
+    def test_fields_after_results(self):
+        # Arrange
+        document = '{"Results": [{"Id": 1}, {"Id": 2}], "TotalNrOfResults": 20}'
+
+        # Act
+        parser = StreamingPageParser(_chunks(document, 4))
+        parser.start()
+
+        # Assert
+        assert parser.fields == {}
+        assert list(parser) == [{"Id": 1}, {"Id": 2}]
+        assert parser.fields == {"TotalNrOfResults": 20}
+
+    @pytest.mark.parametrize(
+        "document", ['{"Results": []}', "{}", '{"NrOfResults": 0, "Results": [ ] }']
+    )
+    def test_empty(self, document):
+        # Act
+        parser, results = _parse(_chunks(document, 2))
+
+        # Assert
+        assert results == []
+        assert parser.done
+
+    @pytest.mark.parametrize(
+        "document",
+        ['{"Results": [{"Id": 1} {"Id": 2}]}', '{"Results": [{"Id": 1', "[]"],
+    )
+    def test_invalid(self, document):
+        with pytest.raises(ValueError):
+            _parse(_chunks(document, 3))
+
+    def test_iter_text(self):
+        # Arrange
+        data = "Één".encode("utf-8")
+
+        # Act and Assert
+        assert "".join(iter_text([data[:1], data[1:3], data[3:]])) == "Één"
+
+
+XML_PAGE = """<?xml version="1.0" encoding="UTF-8"?>
+<mhs:Response xmlns:mhs="https://zeticon.mediahaven.com/metadata/20.3/mhs/">
+  <mhs:TotalNrOfResults>12345</mhs:TotalNrOfResults>
+  <mhs:StartIndex>0</mhs:StartIndex>
+  <mhs:Results>
+    <mhs:Sidecar><mhs:Dynamic><PID>pid0</PID><dc_title>Één</dc_title></mhs:Dynamic></mhs:Sidecar>
+    <mhs:Sidecar><mhs:Dynamic><PID>pid1</PID></mhs:Dynamic></mhs:Sidecar>
+  </mhs:Results>
+  <mhs:NrOfResults>2</mhs:NrOfResults>
+</mhs:Response>
+"""
+
+
+def _pid(element: ET.Element) -> str:
+    return element.find("{*}Dynamic/PID").text
+
+
+class TestStreamingXMLPageParser:
+    @pytest.mark.parametrize("size", [1, 3, 7, 1000])
+    def test_chunk_boundaries(self, size):
+        # Arrange
+        parser = StreamingXMLPageParser(_chunks(XML_PAGE.encode("utf-8"), size))
+
+        # Act
+        parser.start()
+        fields = dict(parser.fields)
+        results = list(parser)
+
+        # Assert
+        assert fields == {"TotalNrOfResults": 12345, "StartIndex": 0}
+        assert [_pid(result) for result in results] == ["pid0", "pid1"]
+        assert results[0].find("{*}Dynamic/dc_title").text == "Één"
+        assert parser.fields["NrOfResults"] == 2
+        assert parser.done
+
+    def test_results_detached(self):
+        # Arrange
+        parser = StreamingXMLPageParser(_chunks(XML_PAGE.encode("utf-8"), 16))
+        parser.start()
+
+        # Act
+        result = parser.next_result()
+
+        # Assert
+        # Only the open elements are left in the tree, without processed children
+        root, results = parser._path
+        assert list(root) == [results]
+        assert list(results) == []
+        assert _pid(result) == "pid0"
+
+    def test_results_without_container(self):
+        # Arrange
+        document = b"<Page><NrOfResults>2</NrOfResults><A/><B><C/></B></Page>"
+
+        # Act
+        parser = StreamingXMLPageParser([document])
+        parser.start()
+        results = list(parser)
+
+        # Assert
+        assert [result.tag for result in results] == ["A", "B"]
+        assert len(results[1]) == 1
+        assert parser.fields == {"NrOfResults": 2}
+
+    @pytest.mark.parametrize(
+        "document", [b"<Response><Results><Result>", b"<Response></Results>", b""]
+    )
+    def test_invalid(self, document):
+        # Arrange
+        parser = StreamingXMLPageParser([document])
+
+        # Act and Assert
+        with pytest.raises(ET.ParseError):
+            parser.start()
+            list(parser)
+
+
+class TestStreamedSearch:
+    @pytest.fixture()
+    def fake(self):
+        return FakeMediaHaven(
+            records=[{"Dynamic": {"PID": f"pid{i}"}} for i in range(7)]
+        )
+
+    @pytest.fixture()
+    def client(self, fake):
+        grant = ROPCGrant(URL, "id", "secret", transport=fake.transport())
+        grant.request_token("user", "password")
+        return MediaHaven(URL, grant)
+
+    def test_as_generator(self, client):
+        # Act
+        page = client.records.search(q="*", nrOfResults=3, stream=True)
+        pids = [record.Dynamic.PID for record in page.as_generator()]
+
+        # Assert
+        assert isinstance(page, MediaHavenPageObjectJSONStream)
+        assert page.total_nr_of_results == 7
+        assert page.start_index == 0
+        assert page.raw_response is None
+        assert pids == [f"pid{i}" for i in range(7)]
+        assert client.metrics.pages.value(("records",)) == 3
+
+    def test_iter_results(self, client):
+        # Arrange
+        page = client.records.search(q="*", nrOfResults=3, stream=True)
+
+        # Act
+        results = page.iter_results()
+        first = next(results)
+
+        # Assert
+        assert first.Dynamic.PID == "pid0"
+        assert page.has_more
+        assert [record.Dynamic.PID for record in results] == ["pid1", "pid2"]
+        assert list(page.iter_results()) == []
+        with pytest.raises(TypeError):
+            page[0]
+
+    def test_closed_when_generator_closed(self, client):
+        # Arrange
+        page = client.records.search(q="*", nrOfResults=3, stream=True)
+        generator = page.as_generator()
+        next(generator)
+
+        # Act
+        generator.close()
+
+        # Assert
+        assert page._response.raw.closed
+
+
+class TestXMLSearch:
+    @pytest.fixture()
+    def fake(self):
+        return FakeMediaHaven(
+            records=[{"Dynamic": {"PID": f"pid{i}"}} for i in range(7)],
+            organisations=[{"Id": i, "Name": f"org{i}"} for i in range(3)],
+        )
+
+    @pytest.fixture()
+    def client(self, fake):
+        grant = ROPCGrant(URL, "id", "secret", transport=fake.transport())
+        grant.request_token("user", "password")
+        return MediaHaven(URL, grant)
+
+    def test_as_generator(self, client):
+        # Act
+        page = client.records.search(
+            accept_format=AcceptFormat.METS, q="*", nrOfResults=3
+        )
+        pids = [_pid(record) for record in page.as_generator()]
+
+        # Assert
+        assert isinstance(page, MediaHavenPageObjectXML)
+        assert page.total_nr_of_results == 7
+        assert page.page_result.StartIndex == 0
+        assert pids == [f"pid{i}" for i in range(7)]
+        assert client.metrics.pages.value(("records",)) == 3
+        assert client.metrics.records_yielded.value(("records",)) == 7
+
+    def test_next_page(self, client):
+        # Arrange
+        page = client.records.search(
+            accept_format=AcceptFormat.METS, q="*", nrOfResults=5
+        )
+
+        # Act
+        next_page = page.next_page()
+
+        # Assert
+        # The format is kept and the pages are streamed
+        assert next_page._accept_format == AcceptFormat.METS
+        assert next_page._stream
+        assert next_page.start_index == 5
+        assert [_pid(record) for record in next_page.iter_results()] == [
+            "pid5",
+            "pid6",
+        ]
+        assert not next_page.has_more
+
+    def test_not_streamed(self, client):
+        # Act
+        page = client.organisations.search(
+            accept_format=AcceptFormat.XML, nrOfResults=2
+        )
+        names = [org.find("Name").text for org in page.as_generator()]
+
+        # Assert
+        assert not page._stream
+        assert names == ["org0", "org1", "org2"]
+
+    def test_raw_response(self, client):
+        # Act
+        page = client.organisations.search(accept_format=AcceptFormat.XML)
+        streamed = client.records.search(accept_format=AcceptFormat.XML)
+
+        # Assert
+        # The body of a page which wasn't streamed is kept
+        assert ET.fromstring(page.raw_response).find("TotalNrOfResults").text == "3"
+        assert [org.find("Name").text for org in page.iter_results()] == [
+            "org0",
+            "org1",
+            "org2",
+        ]
+        assert streamed.raw_response is None
+
+    def test_raw_response_not_kept(self, fake):
+        # Arrange
+        grant = ROPCGrant(URL, "id", "secret", transport=fake.transport())
+        grant.request_token("user", "password")
+        client = MediaHaven(URL, grant, keep_raw_response=False)
+
+        # Act
+        page = client.organisations.search(accept_format=AcceptFormat.XML)
+
+        # Assert
+        assert page.raw_response is None
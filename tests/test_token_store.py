@@ -0,0 +1,90 @@
+import os
+import stat
+import subprocess
+import sys
+import time
+
+from mediahaven.token_store import FileTokenStore, MemoryTokenStore
+
+TOKEN = {"access_token": "access_token", "refresh_token": "refresh_token"}
+
+
+def test_memory_token_store():
+    # Arrange
+    store = MemoryTokenStore()
+
+    # Act
+    with store.lock():
+        empty = store.load()
+        store.save(TOKEN)
+
+    # Assert
+    assert empty is None
+    assert store.load() == TOKEN
+
+
+def test_file_token_store_save_load(tmp_path):
+    # Arrange
+    path = tmp_path / "token.json"
+    store = FileTokenStore(str(path))
+
+    # Act
+    empty = store.load()
+    store.save(TOKEN)
+
+    # Assert
+    assert empty is None
+    assert store.load() == TOKEN
+    assert FileTokenStore(str(path)).load() == TOKEN
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_file_token_store_corrupt_file(tmp_path):
+    # Arrange
+    path = tmp_path / "token.json"
+    path.write_text("{")
+
+    # Act and Assert
+    assert FileTokenStore(str(path)).load() is None
+
+
+def test_file_token_store_lock_reentrant(tmp_path):
+    # Arrange
+    store = FileTokenStore(str(tmp_path / "token.json"))
+
+    # Act
+    with store.lock():
+        with store.lock():
+            store.save(TOKEN)
+
+    # Assert
+    assert store._lock_file is None
+    assert store.load() == TOKEN
+
+
+def test_file_token_store_lock_across_processes(tmp_path):
+    # Arrange
+    path = str(tmp_path / "token.json")
+    store = FileTokenStore(path)
+    script = (
+        "import sys, time;"
+        "from mediahaven.token_store import FileTokenStore;"
+        "store = FileTokenStore(sys.argv[1]);"
+        "print('ready', flush=True);"
+        "start = time.time();"
+        "store.lock().__enter__();"
+        "print(time.time() - start)"
+    )
+
+    # Act
+    with store.lock():
+        process = subprocess.Popen(
+            [sys.executable, "-c", script, path], stdout=subprocess.PIPE, text=True
+        )
+        # Wait until the process is about to lock, importing can be slow
+        assert process.stdout.readline().strip() == "ready"
+        time.sleep(0.5)
+    waited = float(process.communicate(timeout=10)[0])
+
+    # Assert
+    assert waited >= 0.2
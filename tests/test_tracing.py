@@ -0,0 +1,132 @@
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import SpanKind, StatusCode
+
+from mediahaven import MediaHaven
+from mediahaven.mediahaven import MediaHavenException
+from mediahaven.mocks.backend import FakeMediaHaven
+from mediahaven.oauth2 import ROPCGrant
+from mediahaven.tracing import Tracing
+from mediahaven.transport import InMemoryTransport
+
+URL = "https://mediahaven.test/"
+
+
+@pytest.fixture()
+def exporter():
+    return InMemorySpanExporter()
+
+
+@pytest.fixture()
+def tracing(exporter):
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    return Tracing(tracer_provider=provider)
+
+
+@pytest.fixture()
+def requests():
+    """The headers of the requests to the API, in order."""
+    return []
+
+
+@pytest.fixture()
+def grant(requests):
+    fake = FakeMediaHaven(records=[{"Dynamic": {"PID": f"pid{i}"}} for i in range(5)])
+
+    def app(method, url, headers, body):
+        if "/mediahaven-rest-api/" in url:
+            requests.append({key.lower(): value for key, value in headers.items()})
+        return fake(method, url, headers, body)
+
+    grant = ROPCGrant(URL, "id", "secret", transport=InMemoryTransport(app))
+    grant.request_token("user", "password")
+    return grant
+
+
+def _by_name(exporter) -> dict:
+    spans = {}
+    for span in exporter.get_finished_spans():
+        spans.setdefault(span.name, []).append(span)
+    return spans
+
+
+class TestTracing:
+    def test_operation_spans(self, grant, tracing, exporter, requests):
+        # Arrange
+        client = MediaHaven(URL, grant, tracing=tracing)
+
+        # Act
+        page = client.records.search(q="*", nrOfResults=2)
+        results = list(page.as_generator())
+
+        # Assert
+        assert len(results) == 5
+        spans = _by_name(exporter)
+        search, *page_searches = spans["mediahaven.records.search"]
+        (scan,) = spans["mediahaven.records.scan"]
+        http_spans = spans["GET"]
+        assert len(http_spans) == 3
+        assert search.parent is None
+        # The subsequent pages are searched within the scan
+        assert len(page_searches) == 2
+        assert all(
+            span.parent.span_id == scan.context.span_id for span in page_searches
+        )
+        for http_span, search_span in zip(http_spans, [search] + page_searches):
+            assert http_span.parent.span_id == search_span.context.span_id
+        assert http_spans[0].kind == SpanKind.CLIENT
+        assert http_spans[0].attributes["http.response.status_code"] == 200
+        assert http_spans[0].attributes["server.address"] == "mediahaven.test"
+        assert scan.attributes["mediahaven.results"] == 5
+        # The trace context of the HTTP span is propagated
+        for headers, http_span in zip(requests, http_spans):
+            context = http_span.context
+            assert headers["traceparent"].startswith(
+                f"00-{context.trace_id:032x}-{context.span_id:016x}-"
+            )
+
+    def test_error_status(self, grant, tracing, exporter):
+        # Arrange
+        client = MediaHaven(URL, grant, tracing=tracing)
+
+        # Act
+        with pytest.raises(MediaHavenException):
+            client.records.get("unknown")
+
+        # Assert
+        spans = _by_name(exporter)
+        (request,) = spans["GET"]
+        (get,) = spans["mediahaven.records.get"]
+        assert request.status.status_code == StatusCode.ERROR
+        assert request.attributes["http.response.status_code"] == 404
+        assert get.status.status_code == StatusCode.ERROR
+
+    def test_token_refresh(self, grant, tracing, exporter):
+        # Arrange
+        client = MediaHaven(URL, grant, tracing=tracing)
+
+        # Act
+        with client.tracing.span("bulk update"):
+            client.grant.refresh_token()
+
+        # Assert
+        spans = _by_name(exporter)
+        (refresh,) = spans["mediahaven.token_refresh"]
+        (parent,) = spans["bulk update"]
+        assert refresh.parent.span_id == parent.context.span_id
+
+    def test_disabled(self, grant, requests):
+        # Arrange
+        client = MediaHaven(URL, grant)
+
+        # Act
+        client.records.count("*")
+
+        # Assert
+        assert client.tracing is None
+        assert "traceparent" not in requests[0]
@@ -0,0 +1,105 @@
+import gzip
+import json
+
+import pytest
+import requests
+import responses
+from requests.exceptions import ConnectionError
+
+from mediahaven.transport import (
+    InMemoryTransport,
+    RecordingTransport,
+    ReplayTransport,
+)
+
+URL = "https://localhost/mediahaven-rest-api/v2/records"
+
+
+def _session(transport) -> requests.Session:
+    session = requests.Session()
+    session.mount("https://localhost/", transport)
+    return session
+
+
+class TestInMemoryTransport:
+    def test_send(self):
+        # Arrange
+        calls = []
+
+        def handler(method, url, headers, body):
+            calls.append((method, url, headers["Content-Type"], body))
+            return 201, {"Content-Type": "application/json"}, b'{"RecordId": "1"}'
+
+        # Act
+        response = _session(InMemoryTransport(handler)).post(
+            URL, json={"Title": "title"}
+        )
+
+        # Assert
+        assert response.status_code == 201
+        assert response.reason == "Created"
+        assert response.json() == {"RecordId": "1"}
+        assert calls == [("POST", URL, "application/json", b'{"Title": "title"}')]
+
+    def test_send_decodes_body(self):
+        # Arrange
+        body = gzip.compress(b"<Record/>")
+
+        def handler(method, url, headers, request_body):
+            return 200, {"Content-Encoding": "gzip"}, body
+
+        # Act
+        response = _session(InMemoryTransport(handler)).get(URL, stream=True)
+
+        # Assert
+        assert b"".join(response.iter_content(2)) == b"<Record/>"
+        assert response.raw.tell() == len(body)
+
+
+class TestRecordingTransport:
+    @responses.activate
+    def test_record_and_replay(self, tmp_path):
+        # Arrange
+        path = tmp_path / "recordings.jsonl"
+        responses.get(URL, json={"NrOfResults": 1}, headers={"ETag": '"1"'})
+        responses.get(URL, json={"NrOfResults": 2})
+        recorder = RecordingTransport(path=path)
+        session = _session(recorder)
+
+        # Act
+        first = session.get(URL)
+        second = session.get(URL)
+        replay = _session(ReplayTransport(path))
+
+        # Assert
+        assert first.json() == {"NrOfResults": 1}
+        assert second.json() == {"NrOfResults": 2}
+        assert len(recorder.recordings) == 2
+        assert [json.loads(line)["url"] for line in path.open()] == [URL, URL]
+        assert replay.get(URL).headers["ETag"] == '"1"'
+        assert replay.get(URL).json() == {"NrOfResults": 2}
+        # The last recording is repeated
+        assert replay.get(URL).json() == {"NrOfResults": 2}
+
+    def test_record_preloaded_response(self):
+        # Arrange
+        def handler(method, url, headers, body):
+            return 200, {"Content-Type": "application/json"}, b'{"NrOfResults": 1}'
+
+        recorder = RecordingTransport(InMemoryTransport(handler))
+
+        # Act
+        response = _session(recorder).get(URL)
+        replay = _session(ReplayTransport(recorder.recordings))
+
+        # Assert
+        assert response.json() == {"NrOfResults": 1}
+        assert replay.get(URL).json() == {"NrOfResults": 1}
+
+
+class TestReplayTransport:
+    def test_replay_unknown_request(self):
+        session = _session(ReplayTransport([]))
+
+        with pytest.raises(ConnectionError):
+            session.get(URL)
@@ -0,0 +1,66 @@
+import copy
+import pickle
+
+import pytest
+
+from mediahaven.resources.views import DictView, ListView
+
+RECORD = {
+    "Internal": {"RecordId": "1", "ArchiveStatus": "on_disk"},
+    "Dynamic": {"PID": "pid1", "dc_title-nl": "Titel"},
+    "Descriptive": {"Keywords": [{"Value": "news"}, "archive"]},
+}
+
+
+class TestDictView:
+    @pytest.fixture()
+    def record(self):
+        return DictView(copy.deepcopy(RECORD))
+
+    def test_attribute_access(self, record):
+        # Act and Assert
+        assert record.Internal.ArchiveStatus == "on_disk"
+        assert record.Dynamic["dc_title-nl"] == "Titel"
+        assert record.Descriptive.Keywords[0].Value == "news"
+        assert record.Descriptive.Keywords[1] == "archive"
+        assert "Dynamic" in record
+        assert "PID" in dir(record.Dynamic)
+        with pytest.raises(AttributeError):
+            record.Unknown
+        assert not hasattr(record, "Unknown")
+
+    def test_to_dict(self, record):
+        # Act and Assert
+        assert record.to_dict() == RECORD
+        assert record.Descriptive.Keywords.to_list() == [{"Value": "news"}, "archive"]
+
+    def test_set_attribute(self, record):
+        # Act
+        record.Dynamic.PID = "pid2"
+        record.Administrative = DictView({"Type": "video"})
+        record.Descriptive.Keywords.append(DictView({"Value": "sport"}))
+        del record.Internal
+
+        # Assert
+        assert record.to_dict() == {
+            "Dynamic": {"PID": "pid2", "dc_title-nl": "Titel"},
+            "Descriptive": {
+                "Keywords": [{"Value": "news"}, "archive", {"Value": "sport"}]
+            },
+            "Administrative": {"Type": "video"},
+        }
+
+    def test_equality(self, record):
+        # Act and Assert
+        assert record == DictView(copy.deepcopy(RECORD))
+        assert record.Internal != record.Dynamic
+        assert record.Descriptive.Keywords == [DictView({"Value": "news"}), "archive"]
+        assert record.Descriptive.Keywords[:1] == ListView([{"Value": "news"}])
+
+    def test_pickle(self, record):
+        # Act
+        unpickled = pickle.loads(pickle.dumps(record))
+
+        # Assert
+        assert unpickled == record
+        assert copy.deepcopy(record).to_dict() == RECORD